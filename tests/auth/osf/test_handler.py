@@ -0,0 +1,114 @@
+import time
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import exceptions
+from waterbutler.auth.osf import handler
+
+
+def make_request(method='GET', authorization='Bearer token', query=None):
+    request = mock.Mock()
+    request.method = method
+    request.headers = {'Authorization': authorization} if authorization else {}
+    request.query_arguments = query or {}
+    request.cookies = {}
+    return request
+
+
+def osf_response(exp=None):
+    return {
+        'auth': {'id': 'cat'},
+        'credentials': {'token': 'secret'},
+        'settings': {'folder': '/'},
+        'callback_url': 'https://osf.io/callback',
+    }, exp or time.time() + 60
+
+
+@pytest.fixture
+def auth_handler(monkeypatch):
+    handler._CACHE.clear()
+    monkeypatch.setattr(handler.settings, 'CACHE_TTL', 10)
+    auth_handler = handler.OsfAuthHandler()
+
+    async def _request(params, headers, cookies):
+        await asyncio.sleep(0.01)
+        return osf_response()
+
+    auth_handler._request = mock.Mock(side_effect=_request)
+    return auth_handler
+
+
+class TestAuthCache:
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self, auth_handler, monkeypatch):
+        monkeypatch.setattr(handler.settings, 'CACHE_TTL', 0)
+
+        await auth_handler.get('nid', 'osfstorage', make_request())
+        await auth_handler.get('nid', 'osfstorage', make_request())
+
+        assert auth_handler._request.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_reuses_response(self, auth_handler):
+        first = await auth_handler.get('nid', 'osfstorage', make_request())
+        first['auth']['id'] = 'dog'
+        second = await auth_handler.get('nid', 'osfstorage', make_request())
+
+        assert auth_handler._request.call_count == 1
+        # Callers get their own copy
+        assert second['auth']['id'] == 'cat'
+        assert second['auth']['callback_url'] == 'https://osf.io/callback'
+
+    @pytest.mark.asyncio
+    async def test_keyed_on_action_resource_and_credentials(self, auth_handler):
+        await auth_handler.get('nid', 'osfstorage', make_request())
+        await auth_handler.get('nid', 'osfstorage', make_request(method='DELETE'))
+        await auth_handler.get('other', 'osfstorage', make_request())
+        await auth_handler.get('nid', 'github', make_request())
+        await auth_handler.get('nid', 'osfstorage', make_request(authorization='Bearer other'))
+        await auth_handler.get('nid', 'osfstorage', make_request(query={'view_only': [b'key']}))
+
+        assert auth_handler._request.call_count == 6
+
+    @pytest.mark.asyncio
+    async def test_single_flight(self, auth_handler):
+        results = await asyncio.gather(*[
+            auth_handler.get('nid', 'osfstorage', make_request())
+            for _ in range(5)
+        ])
+
+        assert auth_handler._request.call_count == 1
+        assert len(results) == 5
+
+    @pytest.mark.asyncio
+    async def test_never_outlives_jwt(self, auth_handler):
+        async def _request(params, headers, cookies):
+            return osf_response(exp=time.time() - 1)
+
+        auth_handler._request = mock.Mock(side_effect=_request)
+
+        await auth_handler.get('nid', 'osfstorage', make_request())
+        await auth_handler.get('nid', 'osfstorage', make_request())
+
+        assert auth_handler._request.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, auth_handler):
+        responses = [exceptions.AuthError('Forbidden', code=403), osf_response()]
+
+        async def _request(params, headers, cookies):
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        auth_handler._request = mock.Mock(side_effect=_request)
+
+        with pytest.raises(exceptions.AuthError):
+            await auth_handler.get('nid', 'osfstorage', make_request())
+
+        assert (await auth_handler.get('nid', 'osfstorage', make_request()))['auth']['id'] == 'cat'
+        assert auth_handler._request.call_count == 2
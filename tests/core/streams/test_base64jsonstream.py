@@ -0,0 +1,95 @@
+import os
+import json
+import base64
+
+import pytest
+
+from waterbutler.core import streams
+
+
+class ChunkedStream(streams.StringStream):
+    """Returns at most ``chunk_size`` bytes per read, as a request body arriving in pieces would"""
+
+    def __init__(self, data, chunk_size):
+        super().__init__(data)
+        self.chunk_size = chunk_size
+
+    async def _read(self, n=-1):
+        if n < 0 or n > self.chunk_size:
+            n = self.chunk_size
+        return await super()._read(n)
+
+
+async def read_all(stream, n):
+    chunks = []
+    chunk = await stream.read(n)
+    while chunk:
+        chunks.append(chunk)
+        chunk = await stream.read(n)
+    return b''.join(chunks)
+
+
+class TestBase64JSONStream:
+
+    @pytest.mark.asyncio
+    async def test_read(self):
+        data = b'this is a test'
+        stream = streams.Base64JSONStream(streams.StringStream(data), fields={'encoding': 'base64'})
+
+        body = await stream.read()
+
+        assert json.loads(body.decode('utf-8')) == {
+            'encoding': 'base64',
+            'content': base64.b64encode(data).decode('utf-8'),
+        }
+        assert len(body) == stream.size
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('length', [0, 1, 2, 3, 299, 300, 301])
+    async def test_size(self, length):
+        stream = streams.Base64JSONStream(streams.StringStream(os.urandom(length)), block_size=30)
+
+        assert len(await stream.read()) == stream.size
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('chunk_size', [1, 2, 4, 7, 100])
+    @pytest.mark.parametrize('n', [1, 5, 64, 65536])
+    async def test_uneven_reads(self, chunk_size, n):
+        data = os.urandom(1000)
+        stream = streams.Base64JSONStream(ChunkedStream(data, chunk_size), key='data', block_size=32)
+
+        body = await read_all(stream, n)
+
+        assert json.loads(body.decode('utf-8')) == {'data': base64.b64encode(data).decode('utf-8')}
+        assert len(body) == stream.size
+
+    @pytest.mark.asyncio
+    async def test_blocks_handed_over_whole(self):
+        data = os.urandom(3 * 2 ** 14 * 2 + 10)
+        stream = streams.Base64JSONStream(streams.StringStream(data))
+
+        head = await stream.read(65536)
+        blocks = [await stream.read(65536) for _ in range(3)]
+        tail = await stream.read(65536)
+
+        assert head == b'{"content":"'
+        assert [len(block) for block in blocks] == [65536, 65536, 16]
+        assert tail == b'"}'
+        assert stream.at_eof()
+        assert await stream.read(65536) == b''
+
+    @pytest.mark.asyncio
+    async def test_escapes_fields(self):
+        stream = streams.Base64JSONStream(streams.StringStream(b'data'), key='c"k', fields={'m': 'a "quote"\n'})
+
+        assert json.loads((await stream.read()).decode('utf-8')) == {
+            'm': 'a "quote"\n',
+            'c"k': base64.b64encode(b'data').decode('utf-8'),
+        }
+
+    def test_size_unknown(self):
+        source = streams.StringStream(b'data')
+        source._size = None
+
+        assert streams.Base64JSONStream(source).size is None
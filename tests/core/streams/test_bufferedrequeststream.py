@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import streams
+
+
+def make_stream(length, **kwargs):
+    request = mock.Mock()
+    request.headers = {'Content-Length': str(length)}
+    return streams.BufferedRequestStreamReader(request, **kwargs)
+
+
+class TestBufferedRequestStreamReader:
+
+    @pytest.mark.asyncio
+    async def test_size(self):
+        assert make_stream(1337).size == 1337
+
+    @pytest.mark.asyncio
+    async def test_read_all(self):
+        stream = make_stream(6)
+        await stream.write(b'foo')
+        await stream.write(b'bar')
+        stream.write_eof()
+
+        assert (await stream.read()) == b'foobar'
+        assert stream.at_eof()
+        assert (await stream.read()) == b''
+
+    @pytest.mark.asyncio
+    async def test_aligned_reads_are_not_copied(self):
+        stream = make_stream(6)
+        chunk = b'foobar'
+        await stream.write(chunk)
+        stream.write_eof()
+
+        assert (await stream.read(6)) is chunk
+
+    @pytest.mark.asyncio
+    async def test_read_waits_for_full_chunk(self):
+        stream = make_stream(6)
+        await stream.write(b'fo')
+
+        reader = asyncio.ensure_future(stream.read(4))
+        await asyncio.sleep(0)
+        assert not reader.done()
+
+        await stream.write(b'obar')
+        assert (await reader) == b'foob'
+
+        stream.write_eof()
+        assert (await stream.read(4)) == b'ar'
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_backpressure(self):
+        stream = make_stream(8, max_buffer_size=4)
+        await stream.write(b'abcd')
+
+        writer = asyncio.ensure_future(stream.write(b'efgh'))
+        await asyncio.sleep(0)
+        assert not writer.done()
+
+        assert (await stream.read(2)) == b'ab'
+        await writer
+        stream.write_eof()
+
+        assert (await stream.read()) == b'cdefgh'
+
+    @pytest.mark.asyncio
+    async def test_abort_releases_writer(self):
+        stream = make_stream(8, max_buffer_size=4)
+        await stream.write(b'abcd')
+
+        writer = asyncio.ensure_future(stream.write(b'efgh'))
+        await asyncio.sleep(0)
+        stream.abort()
+        await writer
+
+        assert stream.at_eof()
+        assert (await stream.read()) == b''
+
+    @pytest.mark.asyncio
+    async def test_writers_see_everything(self):
+        data = b'x' * 1000
+        stream = make_stream(len(data), max_buffer_size=64)
+        stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
+
+        async def produce():
+            for i in range(0, len(data), 30):
+                await stream.write(data[i:i + 30])
+            stream.write_eof()
+
+        producer = asyncio.ensure_future(produce())
+        read = b''
+        while not stream.at_eof():
+            read += await stream.read(64)
+        await producer
+
+        assert read == data
+        assert stream.writers['md5'].hexdigest == hashlib.md5(data).hexdigest()
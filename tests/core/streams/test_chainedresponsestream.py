@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from waterbutler.core import streams
+
+
+class FakeResponse:
+
+    def __init__(self, body):
+        self.content = asyncio.StreamReader()
+        self.content.feed_data(body)
+        self.content.feed_eof()
+        self.released = False
+        self.closed = False
+
+    async def release(self):
+        self.released = True
+
+    def close(self):
+        self.closed = True
+
+
+async def respond(response, delay=0):
+    await asyncio.sleep(delay)
+    return response
+
+
+class TestChainedResponseStreamReader:
+
+    @pytest.mark.asyncio
+    async def test_reads_everything_in_order(self):
+        first, rest = FakeResponse(b'deli'), FakeResponse(b'cious')
+        stream = streams.ChainedResponseStreamReader([first, respond(rest)], 9)
+
+        assert stream.size == 9
+        assert stream.content_type == 'application/octet-stream'
+        assert (await stream.read()) == b'delicious'
+        assert stream.at_eof()
+        assert first.released and rest.released
+
+    @pytest.mark.asyncio
+    async def test_reads_in_chunks(self):
+        stream = streams.ChainedResponseStreamReader([FakeResponse(b'deli'), respond(FakeResponse(b'cious'))], 9)
+
+        chunks = []
+        chunk = await stream.read(3)
+        while chunk:
+            assert len(chunk) <= 3
+            chunks.append(chunk)
+            chunk = await stream.read(3)
+
+        assert b''.join(chunks) == b'delicious'
+
+    @pytest.mark.asyncio
+    async def test_later_responses_requested_up_front(self):
+        requested = []
+
+        async def request():
+            requested.append(True)
+            return FakeResponse(b'cious')
+
+        stream = streams.ChainedResponseStreamReader([FakeResponse(b'deli'), request()], 9)
+
+        await asyncio.sleep(0)
+        assert requested == [True]
+        assert (await stream.read(4)) == b'deli'
+
+    @pytest.mark.asyncio
+    async def test_failed_response_is_raised(self):
+        async def fail():
+            raise ValueError('boom')
+
+        stream = streams.ChainedResponseStreamReader([FakeResponse(b'deli'), fail()], 9)
+
+        with pytest.raises(ValueError):
+            await stream.read()
+
+    @pytest.mark.asyncio
+    async def test_close(self):
+        first, rest = FakeResponse(b'deli'), FakeResponse(b'cious')
+        late = asyncio.ensure_future(respond(FakeResponse(b'!'), delay=10))
+        stream = streams.ChainedResponseStreamReader([first, respond(rest), late], 10)
+
+        assert (await stream.read(2)) == b'de'
+        await asyncio.sleep(0.01)
+        stream.close()
+        await asyncio.sleep(0)
+
+        assert first.closed
+        assert rest.closed
+        assert late.cancelled()
@@ -0,0 +1,101 @@
+import io
+import tempfile
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import streams
+
+
+DATA = b'This here be a file yar'
+
+
+@pytest.fixture
+def real_file(tmpdir):
+    path = tmpdir.join('file.txt')
+    path.write_binary(DATA)
+    return path.open('rb')
+
+
+class TestFileStreamReader:
+
+    @pytest.mark.asyncio
+    async def test_reads_file(self, real_file):
+        stream = streams.FileStreamReader(real_file)
+
+        assert stream.size == len(DATA)
+        assert (await stream.read()) == DATA
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_reads_unflushed_writes(self):
+        with tempfile.TemporaryFile() as fp:
+            fp.write(DATA)
+            stream = streams.FileStreamReader(fp)
+
+            assert stream.size == len(DATA)
+            assert (await stream.read()) == DATA
+
+    @pytest.mark.asyncio
+    async def test_reads_in_chunks(self, real_file):
+        stream = streams.FileStreamReader(real_file)
+
+        chunks = []
+        chunk = await stream.read(5)
+        while chunk:
+            chunks.append(chunk)
+            chunk = await stream.read(5)
+
+        assert b''.join(chunks) == DATA
+        assert all(len(chunk) == 5 for chunk in chunks[:-1])
+
+    @pytest.mark.asyncio
+    async def test_reads_off_the_event_loop(self, real_file):
+        stream = streams.FileStreamReader(real_file)
+
+        with mock.patch('asyncio.BaseEventLoop.run_in_executor', side_effect=AssertionError) as executor:
+            with pytest.raises(AssertionError):
+                await stream.read()
+
+        assert executor.called
+
+    @pytest.mark.asyncio
+    async def test_reads_in_memory_files(self):
+        stream = streams.FileStreamReader(io.BytesIO(DATA))
+
+        assert stream.size == len(DATA)
+        assert (await stream.read(4)) == DATA[:4]
+        assert (await stream.read()) == DATA[4:]
+        assert (await stream.read()) == b''
+
+    @pytest.mark.asyncio
+    async def test_range(self, real_file):
+        stream = streams.FileStreamReader(real_file, range=(5, 9))
+
+        assert stream.partial
+        assert stream.size == 4
+        assert stream.content_range == 'bytes 5-8/{}'.format(len(DATA))
+        assert (await stream.read(2)) == b'he'
+        assert (await stream.read()) == b're'
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_open_ended_range(self):
+        stream = streams.FileStreamReader(io.BytesIO(DATA), range=(19, None))
+
+        assert (await stream.read()) == b' yar'
+        assert stream.content_range == 'bytes 19-22/{}'.format(len(DATA))
+
+    @pytest.mark.asyncio
+    async def test_range_past_end(self):
+        stream = streams.FileStreamReader(io.BytesIO(DATA), range=(30, None))
+
+        assert not stream.satisfiable
+        assert stream.size == 0
+        assert stream.content_range == 'bytes */{}'.format(len(DATA))
+
+    def test_not_partial_without_range(self):
+        stream = streams.FileStreamReader(io.BytesIO(DATA))
+
+        assert not stream.partial
+        assert stream.satisfiable
@@ -0,0 +1,99 @@
+import os
+import time
+import hashlib
+import threading
+
+import pytest
+
+from waterbutler.core import streams
+
+
+def read_through(spool, data, chunk_size=1000):
+    stream = streams.StringStream(data)
+    stream.add_writer('spool', spool)
+
+    async def read():
+        while not stream.at_eof():
+            await stream.read(chunk_size)
+        await spool.close()
+
+    return read()
+
+
+class SlowSpoolWriter(streams.HashSpoolWriter):
+    """Records how many blocks were queued but not yet processed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.lock = threading.Lock()
+
+    async def _put(self, block):
+        if block is not None:
+            with self.lock:
+                self.outstanding += 1
+                self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        await super()._put(block)
+
+    def _process(self, block):
+        time.sleep(0.005)
+        super()._process(block)
+        with self.lock:
+            self.outstanding -= 1
+
+
+class TestHashSpoolWriter:
+
+    @pytest.mark.asyncio
+    async def test_hashes_and_spools(self, tmpdir):
+        data = os.urandom(100000)
+        path = str(tmpdir.join('pending'))
+        spool = streams.HashSpoolWriter(path, 'md5', 'sha1', 'sha256', block_size=4096)
+
+        await read_through(spool, data)
+
+        assert spool.hexdigests == {
+            'md5': hashlib.md5(data).hexdigest(),
+            'sha1': hashlib.sha1(data).hexdigest(),
+            'sha256': hashlib.sha256(data).hexdigest(),
+        }
+        with open(path, 'rb') as fp:
+            assert fp.read() == data
+
+    @pytest.mark.asyncio
+    async def test_empty(self, tmpdir):
+        path = str(tmpdir.join('pending'))
+        spool = streams.HashSpoolWriter(path, 'sha256')
+
+        await spool.close()
+
+        assert spool.hexdigests == {'sha256': hashlib.sha256(b'').hexdigest()}
+        assert os.path.getsize(path) == 0
+
+    @pytest.mark.asyncio
+    async def test_hash_only(self):
+        data = os.urandom(10000)
+        spool = streams.HashSpoolWriter(None, 'md5', block_size=1024)
+
+        await read_through(spool, data)
+
+        assert spool.hexdigests == {'md5': hashlib.md5(data).hexdigest()}
+
+    @pytest.mark.asyncio
+    async def test_bounded_queue(self, tmpdir):
+        data = os.urandom(64 * 1024)
+        spool = SlowSpoolWriter(str(tmpdir.join('pending')), 'md5', block_size=1024, max_buffered=2048)
+
+        await read_through(spool, data, chunk_size=1024)
+
+        # Two queued, one being processed and one waiting for room, the read waited for the rest
+        assert spool.max_outstanding <= 4
+        assert spool.hexdigests['md5'] == hashlib.md5(data).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_errors_are_raised(self, tmpdir):
+        spool = streams.HashSpoolWriter(str(tmpdir.join('missing', 'pending')), 'md5', block_size=1024)
+
+        with pytest.raises(FileNotFoundError):
+            await read_through(spool, os.urandom(64 * 1024))
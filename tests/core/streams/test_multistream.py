@@ -43,3 +43,18 @@ class TestMultiStream:
         for _ in range(count):
             for i in range(len(blob)):
                 assert blob[i:i + 1] == (await stream.read(1))
+
+    @pytest.mark.asyncio
+    async def test_many_small_streams_in_one_read(self, blob):
+        count = 10000
+        stream = streams.MultiStream(*[streams.StringStream(blob) for _ in range(count)])
+
+        assert (await stream.read(len(blob) * count + 1)) == blob * count
+        assert (await stream.read(1)) == b''
+
+    @pytest.mark.asyncio
+    async def test_read_spans_streams(self, blob):
+        stream = streams.MultiStream(*[streams.StringStream(blob) for _ in range(3)])
+
+        assert (await stream.read(75)) == (blob * 3)[:75]
+        assert (await stream.read(75)) == (blob * 3)[75:]
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from waterbutler.core import streams
+
+
+DATA = bytes(range(256)) * 40
+
+
+class RangeSource:
+    """Serves ranges of DATA, recording how many fetches are in flight at once"""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch(self, start, end):
+        self.calls.append((start, end))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later ranges finish first, the stream must still hand them out in order
+            await asyncio.sleep(0.01 * (1 + 5000 - start) / 5000)
+            if start == self.fail_at:
+                raise ValueError('boom')
+            return DATA[start:end]
+        finally:
+            self.in_flight -= 1
+
+
+class TestParallelRangeStreamReader:
+
+    @pytest.mark.asyncio
+    async def test_reads_everything_in_order(self):
+        source = RangeSource()
+        stream = streams.ParallelRangeStreamReader(source.fetch, len(DATA), 1000, 4)
+
+        assert stream.size == len(DATA)
+        assert (await stream.read()) == DATA
+        assert stream.at_eof()
+        assert len(source.calls) == 11
+
+    @pytest.mark.asyncio
+    async def test_reads_in_chunks(self):
+        source = RangeSource()
+        stream = streams.ParallelRangeStreamReader(source.fetch, len(DATA), 1000, 4)
+
+        chunks = []
+        chunk = await stream.read(300)
+        while chunk:
+            assert len(chunk) <= 300
+            chunks.append(chunk)
+            chunk = await stream.read(300)
+
+        assert b''.join(chunks) == DATA
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency(self):
+        source = RangeSource()
+        stream = streams.ParallelRangeStreamReader(source.fetch, len(DATA), 1000, 3)
+
+        await stream.read(10)
+        await asyncio.sleep(0)
+
+        assert source.max_in_flight > 1
+        assert source.max_in_flight <= 3
+        # Only the window is fetched ahead of the reader
+        assert len(source.calls) == 4
+
+        await stream.read()
+        assert source.max_in_flight <= 3
+
+    @pytest.mark.asyncio
+    async def test_failed_range_is_raised(self):
+        source = RangeSource(fail_at=2000)
+        stream = streams.ParallelRangeStreamReader(source.fetch, len(DATA), 1000, 4)
+
+        with pytest.raises(ValueError):
+            await stream.read()
+
+        await asyncio.sleep(0.05)
+        assert source.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_empty(self):
+        stream = streams.ParallelRangeStreamReader(RangeSource().fetch, 0, 1000, 4)
+
+        assert (await stream.read()) == b''
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_first_range_given(self):
+        source = RangeSource()
+        stream = streams.ParallelRangeStreamReader(
+            source.fetch, len(DATA), 1000, 4,
+            first=source.fetch(0, 1000),
+        )
+
+        assert (await stream.read()) == DATA
+        # The first range was only fetched the once
+        assert source.calls.count((0, 1000)) == 1
+        assert len(source.calls) == 11
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_fetches(self):
+        source = RangeSource()
+        stream = streams.ParallelRangeStreamReader(source.fetch, len(DATA), 1000, 4)
+
+        await stream.read(10)
+        await asyncio.sleep(0)
+        assert source.in_flight > 0
+
+        stream.close()
+        await asyncio.sleep(0.05)
+
+        assert source.in_flight == 0
+        assert len(source.calls) == 5
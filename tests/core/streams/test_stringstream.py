@@ -33,6 +33,10 @@ class TestStringStream:
         stream = streams.StringStream(data)
         assert stream.size == len(data)
 
+    def test_content_type(self):
+        stream = streams.StringStream('This here be a string yar')
+        assert stream.content_type == 'application/octet-stream'
+
     @pytest.mark.asyncio
     async def test_hits_eof(self):
         data = 'This here be a string yar'
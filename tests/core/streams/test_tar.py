@@ -0,0 +1,240 @@
+import pytest
+
+import asyncio
+import gzip
+import io
+import os
+import tarfile
+import types
+
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+from waterbutler.core.utils import AsyncIterator
+
+
+def files_with_metadata(*contents, size=len):
+    """``(name, stream, metadata)`` triples for files whose metadata reports their size"""
+    return [
+        (
+            'folder/file{}.bin'.format(index),
+            streams.StringStream(content),
+            types.SimpleNamespace(size=size(content), modified_utc='2015-06-01T12:30:00+00:00'),
+        )
+        for index, content in enumerate(contents)
+    ]
+
+
+async def read_all(stream, n=-1):
+    chunks = []
+    chunk = await stream.read(n)
+    while chunk:
+        chunks.append(chunk)
+        chunk = await stream.read(n)
+    return b''.join(chunks)
+
+
+class TestTarStreamReader:
+
+    @pytest.mark.asyncio
+    async def test_single_file(self):
+        stream = streams.TarStreamReader(AsyncIterator([
+            ('filename.extension', streams.StringStream('[File Content]'))
+        ]))
+
+        data = await stream.read()
+
+        tar = tarfile.open(fileobj=io.BytesIO(data))
+        assert tar.getnames() == ['filename.extension']
+        assert tar.extractfile('filename.extension').read() == b'[File Content]'
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('n', [-1, 100, 2 ** 16])
+    async def test_size_from_metadata(self, n):
+        contents = (b'', b'[File One]', os.urandom(2 ** 17 + 3))
+        files = files_with_metadata(*contents)
+
+        size = streams.TarStreamReader.archive_size([(name, metadata) for name, _, metadata in files])
+        data = await read_all(streams.TarStreamReader(AsyncIterator(files), size=size), n)
+
+        assert size == len(data)
+        assert len(data) % tarfile.RECORDSIZE == 0
+
+        tar = tarfile.open(fileobj=io.BytesIO(data))
+        for (name, _, _), content in zip(files, contents):
+            assert tar.extractfile(name).read() == content
+            assert tar.getmember(name).mtime == 1433161800
+
+    @pytest.mark.asyncio
+    async def test_long_names(self):
+        name = '/'.join(['a' * 60] * 5) + '/ü.txt'
+        files = [(name, streams.StringStream(b'content'), types.SimpleNamespace(size=7))]
+
+        size = streams.TarStreamReader.archive_size([(name, files[0][2])])
+        data = await streams.TarStreamReader(AsyncIterator(files)).read()
+
+        assert size == len(data)
+        assert tarfile.open(fileobj=io.BytesIO(data)).extractfile(name).read() == b'content'
+
+    def test_size_unknown(self):
+        known = types.SimpleNamespace(size='10')
+        unknown = types.SimpleNamespace(size=None)
+
+        assert streams.TarStreamReader.archive_size([('a', known)]) == tarfile.RECORDSIZE
+        assert streams.TarStreamReader.archive_size([('a', known), ('b', unknown)]) is None
+
+    @pytest.mark.asyncio
+    async def test_spools_files_of_unknown_size(self):
+        class Unsized(streams.StringStream):
+            size = None
+
+        stream = streams.TarStreamReader(AsyncIterator([
+            ('unsized.txt', Unsized(b'[Unknown Length]' * 10000)),
+            ('sized.txt', streams.StringStream(b'[Known Length]')),
+        ]))
+
+        tar = tarfile.open(fileobj=io.BytesIO(await read_all(stream, 1000)))
+
+        assert tar.extractfile('unsized.txt').read() == b'[Unknown Length]' * 10000
+        assert tar.extractfile('sized.txt').read() == b'[Known Length]'
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('size', [lambda content: len(content) - 1, lambda content: len(content) + 1])
+    async def test_size_mismatch(self, size):
+        stream = streams.TarStreamReader(AsyncIterator(files_with_metadata(b'[File One]', size=size)))
+
+        with pytest.raises(exceptions.DownloadError):
+            await stream.read()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('n', [-1, 100])
+    async def test_gzip(self, n):
+        contents = (b'[File One]' * 1000, os.urandom(2 ** 17))
+        files = files_with_metadata(*contents)
+        size = streams.TarStreamReader.archive_size([(name, metadata) for name, _, metadata in files])
+
+        stream = streams.TarStreamReader(AsyncIterator(files), size=size, gzip=True, level=1)
+        data = await read_all(stream, n)
+
+        # Compressed, so the length isn't known
+        assert stream.size is None
+        assert len(gzip.decompress(data)) == size
+
+        tar = tarfile.open(fileobj=io.BytesIO(data), mode='r:gz')
+        for (name, _, _), content in zip(files, contents):
+            assert tar.extractfile(name).read() == content
+
+
+def tar_archive(*entries, format=tarfile.PAX_FORMAT):
+    """An archive of ``(name, content)`` pairs, a content of None making a folder"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=format) as tar:
+        for name, content in entries:
+            info = tarfile.TarInfo(name)
+            if content is None:
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            else:
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+class ChunkedStream(streams.StringStream):
+    """Returns at most ``chunk_size`` bytes per read, like a request body arriving in pieces"""
+
+    def __init__(self, data, chunk_size):
+        super().__init__(data)
+        self.chunk_size = chunk_size
+
+    async def _read(self, n=-1):
+        if n < 0 or n > self.chunk_size:
+            n = self.chunk_size
+        return await super()._read(n)
+
+
+async def parse_all(stream):
+    parser = streams.TarStreamParser(stream)
+    files = []
+    async for name, entry in parser:
+        files.append((name, await entry.read()))
+    return files
+
+
+class TestTarStreamParser:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('format', [tarfile.PAX_FORMAT, tarfile.GNU_FORMAT])
+    @pytest.mark.parametrize('chunk_size', [7, 512, 100000])
+    async def test_round_trip(self, format, chunk_size):
+        long_name = 'folder/' + 'a' * 150 + '/file.txt'
+        content = os.urandom(1500)
+        stream = ChunkedStream(tar_archive(
+            ('folder', None),
+            ('folder/file.bin', content),
+            ('./empty.txt', b''),
+            (long_name, b'[Long Name]'),
+            format=format,
+        ), chunk_size)
+
+        files = await parse_all(stream)
+
+        assert files == [
+            ('folder/file.bin', content),
+            ('empty.txt', b''),
+            (long_name, b'[Long Name]'),
+        ]
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_skips_links(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w', format=tarfile.PAX_FORMAT) as tar:
+            link = tarfile.TarInfo('link')
+            link.type = tarfile.SYMTYPE
+            link.linkname = '/etc/passwd'
+            tar.addfile(link)
+            info = tarfile.TarInfo('file')
+            info.size = 4
+            tar.addfile(info, io.BytesIO(b'file'))
+
+        assert await parse_all(streams.StringStream(buffer.getvalue())) == [('file', b'file')]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('name', ['../escape.txt', 'folder/../../escape.txt', '/'])
+    async def test_invalid_names(self, name):
+        stream = streams.StringStream(tar_archive((name, b'[Content]')))
+
+        with pytest.raises(exceptions.UploadError) as e:
+            await parse_all(stream)
+
+        assert e.value.code == 400
+
+    @pytest.mark.asyncio
+    async def test_truncated(self):
+        data = tar_archive(('file.bin', os.urandom(2000)))
+
+        with pytest.raises(exceptions.UploadError) as e:
+            await parse_all(streams.StringStream(data[:1500]))
+
+        assert e.value.code == 400
+
+    @pytest.mark.asyncio
+    async def test_waits_for_entry_to_be_read(self):
+        parser = streams.TarStreamParser(streams.StringStream(tar_archive(
+            ('one.txt', b'[File One]'),
+            ('two.txt', b'[File Two]'),
+        )))
+
+        name, entry = await parser.__anext__()
+        following = asyncio.ensure_future(parser.__anext__())
+        await asyncio.sleep(0)
+        assert name == 'one.txt'
+        assert not following.done()
+
+        assert await entry.read() == b'[File One]'
+        name, entry = await following
+        assert name == 'two.txt'
+        assert await entry.read() == b'[File Two]'
+
+        with pytest.raises(StopAsyncIteration):
+            await parser.__anext__()
@@ -2,15 +2,32 @@ import pytest
 
 import io
 import os
+import hashlib
 import tempfile
+import types
 import zipfile
+from unittest import mock
 
 from tests.utils import temp_files
 
 from waterbutler.core import streams
+from waterbutler.core import exceptions
 from waterbutler.core.utils import AsyncIterator
 
 
+class ChunkedStream(streams.StringStream):
+    """Returns at most ``chunk_size`` bytes per read, as a network stream would"""
+
+    def __init__(self, data, chunk_size):
+        super().__init__(data)
+        self.chunk_size = chunk_size
+
+    async def _read(self, n=-1):
+        if n < 0 or n > self.chunk_size:
+            n = self.chunk_size
+        return await super()._read(n)
+
+
 class TestZipStreamReader:
 
     @pytest.mark.asyncio
@@ -127,3 +144,205 @@ class TestZipStreamReader:
 
         for file in files:
             assert zip.open(file['filename']).read() == file['contents']
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('flush_boundary', [0, 2 ** 16, 2 ** 30])
+    async def test_small_reads_of_large_file(self, flush_boundary):
+        # Compressible, so sync flushes make a difference to the output
+        contents = b''.join(os.urandom(16) * 64 for _ in range(2 ** 9))
+
+        with mock.patch('waterbutler.settings.ZIP_FLUSH_BOUNDARY', flush_boundary):
+            with mock.patch('waterbutler.settings.ZIP_EXECUTOR_THRESHOLD', 2 ** 10):
+                stream = streams.ZipStreamReader(
+                    AsyncIterator([('foo.txt', streams.StringStream(contents))])
+                )
+
+                chunks = []
+                chunk = await stream.read(5000)
+                while chunk:
+                    chunks.append(chunk)
+                    chunk = await stream.read(5000)
+
+        zip = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+        assert zip.testzip() is None
+        assert zip.open('foo.txt').read() == contents
+
+    @pytest.mark.asyncio
+    async def test_small_upstream_chunks_gathered(self):
+        contents = b''.join(os.urandom(16) * 64 for _ in range(2 ** 8))
+        compressed = []
+        compress = streams.zip.ZipLocalFileData._compress
+
+        def record(self, chunk, final):
+            compressed.append(len(chunk))
+            return compress(self, chunk, final)
+
+        with mock.patch('waterbutler.settings.ZIP_EXECUTOR_THRESHOLD', 2 ** 12), \
+                mock.patch.object(streams.zip.ZipLocalFileData, '_compress', record):
+            stream = streams.ZipStreamReader(
+                AsyncIterator([('foo.txt', ChunkedStream(contents, 500))])
+            )
+            data = await stream.read()
+
+        # Compressed a few large chunks at a time, not in the 500 byte chunks they arrived in
+        assert all(size >= 2 ** 12 for size in compressed[:-1])
+        assert sum(compressed) == len(contents)
+        assert zipfile.ZipFile(io.BytesIO(data)).open('foo.txt').read() == contents
+
+    @pytest.mark.asyncio
+    async def test_many_small_files_in_one_read(self):
+        count = 5000
+        stream = streams.ZipStreamReader(AsyncIterator(
+            ('file{}.txt'.format(index), streams.StringStream('[File {}]'.format(index)))
+            for index in range(count)
+        ))
+
+        # Every file in a single read, which used to recurse once per file
+        data = await stream.read(2 ** 24)
+
+        assert (await stream.read(2 ** 24)) == b''
+        zip = zipfile.ZipFile(io.BytesIO(data))
+        assert zip.testzip() is None
+        assert len(zip.namelist()) == count
+        assert zip.open('file4999.txt').read() == b'[File 4999]'
+
+
+def stored_files(*contents):
+    """``(name, stream, metadata)`` triples for files whose metadata reports their size"""
+    return [
+        (
+            'file{}.bin'.format(index),
+            streams.StringStream(content),
+            types.SimpleNamespace(
+                size=len(content),
+                content_type='application/octet-stream',
+                modified_utc='2015-06-01T12:30:00+00:00',
+            ),
+        )
+        for index, content in enumerate(contents)
+    ]
+
+
+class TestZipCompressionPolicy:
+
+    def test_store_only(self):
+        policy = streams.ZipCompressionPolicy(store=True)
+
+        assert policy.compress_type('foo.txt') == zipfile.ZIP_STORED
+
+    def test_level_zero_stores(self):
+        assert streams.ZipCompressionPolicy(level=0).store is True
+        assert streams.ZipCompressionPolicy(level=6).store is False
+
+    def test_skips_by_extension_and_mime_type(self):
+        policy = streams.ZipCompressionPolicy(
+            store_extensions=['.jpg'],
+            store_mime_types=['application/zip', 'video/'],
+        )
+
+        assert policy.compress_type('foo.txt') == zipfile.ZIP_DEFLATED
+        assert policy.compress_type('foo.JPG') == zipfile.ZIP_STORED
+        assert policy.compress_type('foo', 'application/zip') == zipfile.ZIP_STORED
+        assert policy.compress_type('foo', 'video/mp4') == zipfile.ZIP_STORED
+        assert policy.compress_type('foo', 'application/zip-ish') == zipfile.ZIP_DEFLATED
+
+    @pytest.mark.asyncio
+    async def test_archive_size(self):
+        policy = streams.ZipCompressionPolicy(store=True)
+        files = stored_files(b'', b'[File One]', os.urandom(2 ** 17))
+
+        size = policy.archive_size([(name, metadata) for name, _, metadata in files])
+        data = await streams.ZipStreamReader(AsyncIterator(files), policy=policy, size=size).read()
+
+        assert size == len(data)
+        assert zipfile.ZipFile(io.BytesIO(data)).testzip() is None
+
+    def test_archive_size_unknown(self):
+        policy = streams.ZipCompressionPolicy(store_extensions=['.jpg'], store_mime_types=[])
+        known = types.SimpleNamespace(size='10', content_type=None)
+        unknown = types.SimpleNamespace(size=None, content_type=None)
+
+        assert isinstance(policy.archive_size([('a.jpg', known)]), int)
+        # Deflated, or of unknown size
+        assert policy.archive_size([('a.jpg', known), ('b.txt', known)]) is None
+        assert policy.archive_size([('a.jpg', known), ('b.jpg', unknown)]) is None
+
+
+class TestZipStreamReaderCompression:
+
+    @pytest.mark.asyncio
+    async def test_stores_according_to_policy(self):
+        policy = streams.ZipCompressionPolicy(store_extensions=['.png'], store_mime_types=[])
+        stream = streams.ZipStreamReader(AsyncIterator([
+            ('image.png', streams.StringStream(b'not really a png' * 100)),
+            ('text.txt', streams.StringStream(b'some text' * 100)),
+        ]), policy=policy)
+
+        zip = zipfile.ZipFile(io.BytesIO(await stream.read()))
+
+        assert zip.testzip() is None
+        assert zip.getinfo('image.png').compress_type == zipfile.ZIP_STORED
+        assert zip.getinfo('image.png').compress_size == 1600
+        assert zip.getinfo('text.txt').compress_type == zipfile.ZIP_DEFLATED
+        assert zip.open('image.png').read() == b'not really a png' * 100
+
+    @pytest.mark.asyncio
+    async def test_deflate_level(self):
+        # Fixed, as level 9 only reliably beats level 1 on some data
+        contents = b''.join(hashlib.sha256(str(i).encode('ascii')).digest()[:8] * 32 for i in range(2 ** 10))
+        sizes = []
+        for level in (1, 9):
+            policy = streams.ZipCompressionPolicy(level=level)
+            stream = streams.ZipStreamReader(
+                AsyncIterator([('foo.txt', streams.StringStream(contents))]),
+                policy=policy,
+            )
+            zip = zipfile.ZipFile(io.BytesIO(await stream.read()))
+            assert zip.open('foo.txt').read() == contents
+            sizes.append(zip.getinfo('foo.txt').compress_size)
+
+        assert sizes[1] < sizes[0]
+
+    @pytest.mark.asyncio
+    async def test_date_time_from_metadata(self):
+        stream = streams.ZipStreamReader(AsyncIterator(stored_files(b'[File One]')))
+
+        zip = zipfile.ZipFile(io.BytesIO(await stream.read()))
+
+        assert zip.getinfo('file0.bin').date_time == (2015, 6, 1, 12, 30, 0)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('start,end', [(0, 10), (35, 2 ** 16), (100, None), (0, None)])
+    async def test_select_range(self, start, end):
+        policy = streams.ZipCompressionPolicy(store=True)
+        contents = (os.urandom(2 ** 15), b'[File Two]', os.urandom(2 ** 15))
+        size = policy.archive_size([(name, metadata) for name, _, metadata in stored_files(*contents)])
+        data = await streams.ZipStreamReader(AsyncIterator(stored_files(*contents)), policy=policy, size=size).read()
+
+        end = size if end is None else end
+        stream = streams.ZipStreamReader(AsyncIterator(stored_files(*contents)), policy=policy, size=size)
+        stream.select_range(start, end)
+
+        chunks = []
+        chunk = await stream.read(1000)
+        while chunk:
+            chunks.append(chunk)
+            chunk = await stream.read(1000)
+
+        # The same archive, byte for byte, so resumed downloads fit together
+        assert b''.join(chunks) == data[start:end]
+        assert stream.size == end - start
+        assert stream.partial is ((start, end) != (0, size))
+        assert stream.content_range == 'bytes {}-{}/{}'.format(start, end - 1, size)
+
+    @pytest.mark.asyncio
+    async def test_size_mismatch(self):
+        policy = streams.ZipCompressionPolicy(store=True)
+        files = stored_files(b'[File One]')
+        files[0][2].size = 5
+
+        stream = streams.ZipStreamReader(AsyncIterator(files), policy=policy, size=1000)
+
+        with pytest.raises(exceptions.DownloadError):
+            await stream.read()
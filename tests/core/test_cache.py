@@ -0,0 +1,254 @@
+import time
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import cache
+
+
+@pytest.fixture
+def backend():
+    return cache.MemoryBackend(3)
+
+
+class TestMemoryBackend:
+
+    def test_get_set(self, backend):
+        backend.set('ns', 'key', 'value', 10)
+
+        assert backend.get('ns', 'key') == 'value'
+
+    def test_missing(self, backend):
+        with pytest.raises(KeyError):
+            backend.get('ns', 'key')
+
+    def test_expires(self, backend):
+        backend.set('ns', 'key', 'value', 10)
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 11):
+            with pytest.raises(KeyError):
+                backend.get('ns', 'key')
+
+        assert len(backend) == 0
+
+    def test_evicts_least_recently_used(self, backend):
+        backend.set('ns', 'one', 1, 10)
+        backend.set('ns', 'two', 2, 10)
+        backend.set('ns', 'three', 3, 10)
+        backend.get('ns', 'one')
+        backend.set('ns', 'four', 4, 10)
+
+        assert len(backend) == 3
+        assert backend.get('ns', 'one') == 1
+        with pytest.raises(KeyError):
+            backend.get('ns', 'two')
+
+    def test_invalidate_namespace(self, backend):
+        backend.set('ns', 'one', 1, 10)
+        backend.set('ns', 'two', 2, 10)
+        backend.set('other', 'one', 1, 10)
+
+        backend.invalidate('ns')
+
+        assert len(backend) == 1
+        assert backend.get('other', 'one') == 1
+        with pytest.raises(KeyError):
+            backend.get('ns', 'one')
+
+
+class TestMetadataCache:
+
+    def setup_method(self, method):
+        cache._SHARED.clear()
+
+    def test_namespaced_by_credentials_and_settings(self):
+        assert cache.MetadataCache('s3', {'key': 'a'}, {'bucket': 'b'}).namespace == \
+            cache.MetadataCache('s3', {'key': 'a'}, {'bucket': 'b'}).namespace
+        assert cache.MetadataCache('s3', {'key': 'a'}, {'bucket': 'b'}).namespace != \
+            cache.MetadataCache('s3', {'key': 'a'}, {'bucket': 'c'}).namespace
+        assert cache.MetadataCache('s3', {'key': 'a'}, {'bucket': 'b'}).namespace != \
+            cache.MetadataCache('s3', {'key': 'b'}, {'bucket': 'b'}).namespace
+
+    def test_request_tier_is_not_shared(self):
+        first = cache.MetadataCache('s3', {}, {})
+        first.set('key', 'value')
+
+        assert first.get('key') == 'value'
+        with pytest.raises(KeyError):
+            cache.MetadataCache('s3', {}, {}).get('key')
+
+    def test_shared_tier(self):
+        with mock.patch('waterbutler.settings.METADATA_CACHE_TTL', 10):
+            cache.MetadataCache('s3', {}, {}).set('key', 'value')
+            second = cache.MetadataCache('s3', {}, {})
+
+            assert second.get('key') == 'value'
+            assert second.hits == 1
+
+            second.invalidate()
+
+            with pytest.raises(KeyError):
+                cache.MetadataCache('s3', {}, {}).get('key')
+
+    def test_disabled(self):
+        metadata_cache = cache.MetadataCache('s3', {}, {})
+
+        with mock.patch('waterbutler.settings.METADATA_CACHE_REQUEST_TTL', 0):
+            metadata_cache.set('key', 'value')
+
+            with pytest.raises(KeyError):
+                metadata_cache.get('key')
+
+        assert metadata_cache.misses == 1
+
+
+class TestObjectCache:
+
+    @pytest.mark.asyncio
+    async def test_get_set(self):
+        objects = cache.ObjectCache(100)
+        await objects.set('sha', b'content')
+
+        assert await objects.get('sha') == b'content'
+        assert objects.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_missing(self):
+        objects = cache.ObjectCache(100)
+
+        with pytest.raises(KeyError):
+            await objects.get('sha')
+        assert objects.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_bounded_by_size(self):
+        objects = cache.ObjectCache(10)
+        await objects.set('one', b'1234')
+        await objects.set('two', b'1234')
+        await objects.get('one')
+        await objects.set('three', b'1234')
+        await objects.set('huge', b'12345678901')
+
+        assert len(objects) == 2
+        assert await objects.get('one') == b'1234'
+        assert await objects.get('three') == b'1234'
+        for key in ('two', 'huge'):
+            with pytest.raises(KeyError):
+                await objects.get(key)
+
+    @pytest.mark.asyncio
+    async def test_spills_to_disk(self, tmpdir):
+        objects = cache.ObjectCache(10, spill_path=str(tmpdir.join('spill')), spill_max_size=10)
+        await objects.set('one', b'1234')
+        await objects.set('two', b'1234')
+        await objects.set('three', b'1234')
+
+        assert len(tmpdir.join('spill').listdir()) == 1
+        assert await objects.get('one') == b'1234'
+
+        # Read back into memory, pushing out the next least recently used
+        assert len(tmpdir.join('spill').listdir()) == 1
+        assert await objects.get('two') == b'1234'
+        assert await objects.get('three') == b'1234'
+
+    @pytest.mark.asyncio
+    async def test_spill_bounded_by_size(self, tmpdir):
+        objects = cache.ObjectCache(4, spill_path=str(tmpdir), spill_max_size=8)
+        for key in ('one', 'two', 'three', 'four'):
+            await objects.set(key, b'1234')
+
+        assert len(tmpdir.listdir()) == 2
+        with pytest.raises(KeyError):
+            await objects.get('one')
+        assert await objects.get('two') == b'1234'
+
+    @pytest.mark.asyncio
+    async def test_spilled_file_removed(self, tmpdir):
+        objects = cache.ObjectCache(4, spill_path=str(tmpdir), spill_max_size=8)
+        await objects.set('one', b'1234')
+        await objects.set('two', b'1234')
+        tmpdir.listdir()[0].remove()
+
+        with pytest.raises(KeyError):
+            await objects.get('one')
+        assert len(objects) == 1
+
+
+class FakeResponse:
+
+    def __init__(self, status, body=b'', headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+        self.released = False
+
+    async def read(self):
+        return self.body
+
+    async def release(self):
+        self.released = True
+
+
+class TestConditionalCache:
+
+    @pytest.fixture
+    def conditional(self):
+        return cache.ConditionalCache(10, 100)
+
+    @pytest.mark.asyncio
+    async def test_remembers_etag(self, conditional):
+        key = conditional.key('GET', 'http://example.com/')
+        response = FakeResponse(200, b'{"a": 1}', {'ETag': '"abc"'})
+
+        assert await conditional.revalidated('ns', key, response, None) is response
+
+        entry = conditional.lookup('ns', key)
+        assert conditional.validators(entry) == {'If-None-Match': '"abc"'}
+        assert conditional.lookup('other', key) is None
+
+    @pytest.mark.asyncio
+    async def test_remembers_last_modified(self, conditional):
+        key = conditional.key('GET', 'http://example.com/')
+        response = FakeResponse(200, b'body', {'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        await conditional.revalidated('ns', key, response, None)
+
+        entry = conditional.lookup('ns', key)
+        assert conditional.validators(entry) == {'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+
+    @pytest.mark.asyncio
+    async def test_not_modified(self, conditional):
+        key = conditional.key('GET', 'http://example.com/')
+        await conditional.revalidated('ns', key, FakeResponse(200, b'{"a": 1}', {'ETag': '"abc"'}), None)
+        not_modified = FakeResponse(304, headers={'ETag': '"abc"'})
+
+        response = await conditional.revalidated('ns', key, not_modified, conditional.lookup('ns', key))
+
+        assert not_modified.released
+        assert response.status == 200
+        assert await response.json() == {'a': 1}
+        assert conditional.stats == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('response', [
+        FakeResponse(200, b'body'),
+        FakeResponse(404, b'body', {'ETag': '"abc"'}),
+        FakeResponse(200, b'x' * 101, {'ETag': '"abc"'}),
+        FakeResponse(200, b'body', {'ETag': '"abc"', 'Content-Length': '101'}),
+    ])
+    async def test_not_remembered(self, conditional, response):
+        key = conditional.key('GET', 'http://example.com/')
+        await conditional.revalidated('ns', key, response, None)
+
+        assert conditional.lookup('ns', key) is None
+
+    def test_key(self, conditional):
+        key = conditional.key('GET', 'http://example.com/', {'b': 1, 'a': 2}, {'Accept': 'raw'})
+
+        assert key == conditional.key('GET', 'http://example.com/', {'a': 2, 'b': 1}, {'Accept': 'raw'})
+        assert key != conditional.key('GET', 'http://example.com/', {'a': 2, 'b': 1})
+
+    def test_disabled(self, conditional):
+        conditional.backend.set('ns', 'key', ({}, 200, b''), 10)
+
+        with mock.patch('waterbutler.settings.CONDITIONAL_CACHE_TTL', 0):
+            assert conditional.lookup('ns', 'key') is None
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from waterbutler.core import connections
+
+
+class StubServer:
+    """Minimal keep-alive HTTP server that counts the connections opened against it"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        while True:
+            head = await self._read_head(reader)
+            if not head:
+                break
+            self.requests += 1
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+            await writer.drain()
+        writer.close()
+
+    async def _read_head(self, reader):
+        head = b''
+        while not head.endswith(b'\r\n\r\n'):
+            line = await reader.readline()
+            if not line:
+                return b''
+            head += line
+        return head
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return 'http://127.0.0.1:{}/'.format(self.server.sockets[0].getsockname()[1])
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+@pytest.fixture
+def stub_server():
+    return StubServer()
+
+
+class TestConnector:
+
+    @pytest.mark.asyncio
+    async def test_connector_is_shared_per_loop(self):
+        assert connections.get_connector() is connections.get_connector()
+
+    @pytest.mark.asyncio
+    async def test_connector_recreated_after_close(self):
+        connector = connections.get_connector()
+        connections.close_connectors()
+
+        assert connector.closed
+        assert connections.get_connector() is not connector
+
+
+class TestRequest:
+
+    @pytest.mark.asyncio
+    async def test_reuses_connections(self, stub_server):
+        url = await stub_server.start()
+
+        try:
+            for _ in range(1000):
+                resp = await connections.request('GET', url)
+                assert (await resp.read()) == b'ok'
+        finally:
+            connections.close_connectors()
+            await stub_server.stop()
+
+        assert stub_server.requests == 1000
+        assert stub_server.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_explicit_connector_is_respected(self, stub_server):
+        url = await stub_server.start()
+
+        try:
+            for _ in range(3):
+                resp = await connections.request('GET', url, connector=None)
+                await resp.read()
+        finally:
+            connections.close_connectors()
+            await stub_server.stop()
+
+        # aiohttp's default connector closes its connection after every request
+        assert stub_server.connections == 3
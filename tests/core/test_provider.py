@@ -1,9 +1,19 @@
+import io
+import os
+import json
+import tarfile
+import zipfile
+
 import pytest
 
 from tests import utils
 from unittest import mock
+from waterbutler.core import cache
+from waterbutler.core import streams
 from waterbutler.core import metadata
 from waterbutler.core import exceptions
+from waterbutler.core.utils import AsyncIterator
+from waterbutler.providers.filesystem import FileSystemProvider
 
 
 @pytest.fixture
@@ -60,6 +70,46 @@ class TestBaseProvider:
 
         assert e.value.code == 422
 
+    @pytest.mark.asyncio
+    async def test_exists_is_cached(self, provider1):
+        path = await provider1.validate_path('/some/path')
+        provider1.metadata = utils.MockCoroutine(return_value=metadata.BaseMetadata)
+
+        assert (await provider1.exists(path)) is metadata.BaseMetadata
+        assert (await provider1.exists(path)) is metadata.BaseMetadata
+        assert provider1.metadata.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_exists_caches_not_found(self, provider1):
+        path = await provider1.validate_path('/some/path')
+        provider1.metadata = utils.MockCoroutine(side_effect=exceptions.MetadataError('', code=404))
+
+        assert (await provider1.exists(path)) is False
+        assert (await provider1.exists(path)) is False
+        assert provider1.metadata.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_metadata_copies_listings(self, provider1):
+        path = await provider1.validate_path('/some/folder/')
+        provider1.metadata = utils.MockCoroutine(return_value=['a', 'b'])
+
+        (await provider1.cached_metadata(path)).append('c')
+
+        assert (await provider1.cached_metadata(path)) == ['a', 'b']
+
+    @pytest.mark.asyncio
+    async def test_copy_invalidates_metadata(self, provider1):
+        src_path = await provider1.validate_path('/source/path')
+        dest_path = await provider1.validate_path('/destination/path')
+        provider1.metadata = utils.MockCoroutine(side_effect=exceptions.MetadataError('', code=404))
+
+        assert (await provider1.exists(dest_path)) is False
+
+        await provider1.copy(provider1, src_path, dest_path, handle_naming=False)
+        provider1.metadata = utils.MockCoroutine(return_value=metadata.BaseMetadata)
+
+        assert (await provider1.exists(dest_path)) is metadata.BaseMetadata
+
     @pytest.mark.asyncio
     async def test_intra_copy_notimplemented(self, provider1):
         with pytest.raises(NotImplementedError):
@@ -104,6 +154,105 @@ class TestBaseProvider:
         assert str(path) == str(new_path.parent)
         assert new_path.name == 'text_file.txt'
 
+    @pytest.mark.asyncio
+    async def test_revalidate_paths_are_children(self, provider1):
+        path = await provider1.validate_path('/this/is/a/path/')
+        new_paths = await provider1.revalidate_paths(path, [('text_file.txt', False), ('folder', True)])
+
+        assert [new_path.name for new_path in new_paths] == ['text_file.txt', 'folder']
+        assert [new_path.is_dir for new_path in new_paths] == [False, True]
+        assert all(str(new_path.parent) == str(path) for new_path in new_paths)
+
+
+class FakeResponse:
+
+    def __init__(self, status, body, headers):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    async def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+    async def release(self):
+        pass
+
+
+class TestConditionalRequests:
+
+    def setup_method(self, method):
+        cache.conditional.backend.clear()
+
+    def responses(self, *responses):
+        sent = []
+
+        async def request(method, url, *args, **kwargs):
+            sent.append(kwargs['headers'])
+            return responses[len(sent) - 1]
+
+        return sent, mock.patch('waterbutler.core.connections.request', request)
+
+    @pytest.mark.asyncio
+    async def test_not_modified_served_from_cache(self, provider1):
+        sent, patch = self.responses(
+            FakeResponse(200, b'{"name": "repo"}', {'ETag': '"v1"'}),
+            FakeResponse(304, b'', {'ETag': '"v1"'}),
+        )
+
+        with patch:
+            first = await provider1.make_request('GET', 'http://example.com/repo', conditional=True, expects=(200, ))
+            second = await provider1.make_request('GET', 'http://example.com/repo', conditional=True, expects=(200, ))
+
+        assert await first.json() == {'name': 'repo'}
+        assert await second.json() == {'name': 'repo'}
+        assert 'If-None-Match' not in sent[0]
+        assert sent[1]['If-None-Match'] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_modified(self, provider1):
+        sent, patch = self.responses(
+            FakeResponse(200, b'"old"', {'ETag': '"v1"'}),
+            FakeResponse(200, b'"new"', {'ETag': '"v2"'}),
+            FakeResponse(304, b'', {'ETag': '"v2"'}),
+        )
+
+        with patch:
+            for _ in range(3):
+                response = await provider1.make_request('GET', 'http://example.com/repo', conditional=True)
+
+        assert await response.json() == 'new'
+        assert sent[2]['If-None-Match'] == '"v2"'
+
+    @pytest.mark.asyncio
+    async def test_not_conditional_by_default(self, provider1):
+        sent, patch = self.responses(
+            FakeResponse(200, b'"old"', {'ETag': '"v1"'}),
+            FakeResponse(200, b'"old"', {'ETag': '"v1"'}),
+        )
+
+        with patch:
+            await provider1.make_request('GET', 'http://example.com/repo')
+            await provider1.make_request('GET', 'http://example.com/repo')
+
+        assert 'If-None-Match' not in sent[1]
+
+    @pytest.mark.asyncio
+    async def test_namespaced_by_credentials(self, provider1):
+        other = utils.MockProvider1({'user': 'name'}, {'pass': 'other'}, {})
+        sent, patch = self.responses(
+            FakeResponse(200, b'"mine"', {'ETag': '"v1"'}),
+            FakeResponse(200, b'"theirs"', {'ETag': '"v1"'}),
+        )
+
+        with patch:
+            await provider1.make_request('GET', 'http://example.com/repo', conditional=True)
+            await other.make_request('GET', 'http://example.com/repo', conditional=True)
+
+        assert 'If-None-Match' not in sent[1]
+
 
 class TestHandleNameConflict:
 
@@ -329,9 +478,24 @@ class TestCopy:
         ret = await provider1.copy(provider1, src_path, dest_path)
 
         assert ret == 'Upload return'
-        provider1.download.assert_called_once_with(src_path)
+        provider1.download.assert_called_once_with(src_path, parallel=True)
         provider1.upload.assert_called_once_with('Download return', dest_path)
 
+    @pytest.mark.asyncio
+    async def test_copy_closes_download_on_failure(self, provider1):
+        src_path = await provider1.validate_path('/source/path')
+        dest_path = await provider1.validate_path('/destination/path')
+        download_stream = mock.Mock(spec=streams.ParallelRangeStreamReader)
+        download_stream.name = None
+
+        provider1.upload = utils.MockCoroutine(side_effect=exceptions.UploadError('nope'))
+        provider1.download = utils.MockCoroutine(return_value=download_stream)
+
+        with pytest.raises(exceptions.UploadError):
+            await provider1.copy(provider1, src_path, dest_path)
+
+        download_stream.close.assert_called_once_with()
+
 
 class TestMove:
     @pytest.mark.asyncio
@@ -481,3 +645,124 @@ class TestMove:
         assert 'bytes=10-' == provider1._build_range_header((10, None))
         assert 'bytes=10-100' == provider1._build_range_header((10, 100))
         assert 'bytes=-255' == provider1._build_range_header((None, 255))
+
+
+class TestZip:
+
+    @pytest.fixture
+    def fs_provider(self, tmpdir):
+        folder = tmpdir.mkdir('files')
+        folder.join('photo.jpg').write(os.urandom(1000), 'wb')
+        folder.mkdir('sub').join('notes.txt').write(b'notes' * 100, 'wb')
+        return FileSystemProvider({}, {}, {'folder': str(folder)})
+
+    @pytest.mark.asyncio
+    async def test_size_known_when_stored(self, fs_provider):
+        path = await fs_provider.validate_path('/')
+
+        stream = await fs_provider.zip(path, policy=streams.ZipCompressionPolicy(store=True))
+        data = await stream.read()
+
+        assert stream.size == len(data)
+        zip = zipfile.ZipFile(io.BytesIO(data))
+        assert zip.testzip() is None
+        assert sorted(zip.namelist()) == ['photo.jpg', 'sub/notes.txt']
+
+    @pytest.mark.asyncio
+    async def test_size_unknown_when_deflated(self, fs_provider):
+        path = await fs_provider.validate_path('/')
+
+        stream = await fs_provider.zip(path)
+        zip = zipfile.ZipFile(io.BytesIO(await stream.read()))
+
+        assert stream.size is None
+        assert zip.getinfo('photo.jpg').compress_type == zipfile.ZIP_STORED
+        assert zip.getinfo('sub/notes.txt').compress_type == zipfile.ZIP_DEFLATED
+
+    @pytest.mark.asyncio
+    async def test_deflated_streams_without_listing(self, fs_provider):
+        path = await fs_provider.validate_path('/')
+
+        with mock.patch('waterbutler.core.utils.ZipStreamGenerator.walk') as walk:
+            stream = await fs_provider.zip(path)
+
+        assert not walk.called
+        zip = zipfile.ZipFile(io.BytesIO(await stream.read()))
+        assert sorted(zip.namelist()) == ['photo.jpg', 'sub/notes.txt']
+
+    @pytest.mark.asyncio
+    async def test_sized_when_asked(self, fs_provider):
+        path = await fs_provider.validate_path('/')
+        # Only files stored by extension, so the length can be known whatever the policy
+        os.remove(os.path.join(fs_provider.folder, 'sub', 'notes.txt'))
+
+        stream = await fs_provider.zip(path, sized=True)
+        data = await stream.read()
+
+        assert stream.size == len(data)
+        assert zipfile.ZipFile(io.BytesIO(data)).namelist() == ['photo.jpg']
+
+    @pytest.mark.asyncio
+    async def test_tar(self, fs_provider):
+        path = await fs_provider.validate_path('/')
+
+        stream = await fs_provider.tar(path)
+        data = await stream.read()
+
+        assert stream.size == len(data)
+        tar = tarfile.open(fileobj=io.BytesIO(data))
+        assert sorted(tar.getnames()) == ['photo.jpg', 'sub/notes.txt']
+        assert tar.extractfile('sub/notes.txt').read() == b'notes' * 100
+
+    @pytest.mark.asyncio
+    async def test_tar_gz(self, fs_provider):
+        path = await fs_provider.validate_path('/')
+
+        stream = await fs_provider.tar(path, gzip=True)
+        tar = tarfile.open(fileobj=io.BytesIO(await stream.read()), mode='r:gz')
+
+        assert stream.size is None
+        assert tar.extractfile('sub/notes.txt').read() == b'notes' * 100
+
+
+class TestBatchUpload:
+
+    @pytest.fixture
+    def fs_provider(self, tmpdir):
+        folder = tmpdir.mkdir('files')
+        folder.join('photo.jpg').write(b'photo', 'wb')
+        folder.mkdir('sub').join('notes.txt').write(b'notes', 'wb')
+        return FileSystemProvider({}, {}, {'folder': str(folder)})
+
+    def test_unsupported_by_default(self, provider1):
+        assert provider1.can_batch_upload() is False
+
+    @pytest.mark.asyncio
+    async def test_upload_batch_raises(self, provider1):
+        path = await provider1.validate_path('/folder/')
+
+        with pytest.raises(exceptions.UploadError) as e:
+            await provider1.upload_batch(AsyncIterator([]), path)
+
+        assert e.value.code == 501
+
+    @pytest.mark.asyncio
+    async def test_folder_copy_uses_upload_batch(self, fs_provider, provider1):
+        uploaded = {}
+
+        async def upload_batch(files, path):
+            async for name, stream, _ in files:
+                uploaded[name] = await stream.read()
+            return 'Someratheruniquevalue', True
+
+        provider1.can_batch_upload = mock.Mock(return_value=True)
+        provider1.upload_batch = upload_batch
+        src_path = await fs_provider.validate_path('/')
+        dest_path = await provider1.validate_path('/destination/')
+
+        folder, created = await fs_provider._folder_file_op(fs_provider.copy, provider1, src_path, dest_path)
+
+        assert folder == 'Someratheruniquevalue'
+        # The destination existed, and was deleted first
+        assert created is False
+        assert uploaded == {'photo.jpg': b'photo', 'sub/notes.txt': b'notes'}
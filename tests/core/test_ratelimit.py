@@ -0,0 +1,162 @@
+import time
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import ratelimit
+
+
+@pytest.fixture
+def bucket():
+    return ratelimit.TokenBucket(10, 2)
+
+
+class TestTokenBucket:
+
+    def test_burst_is_free(self, bucket):
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.stats['delayed'] == 0
+
+    def test_steady_rate(self, bucket):
+        bucket.reserve()
+        bucket.reserve()
+
+        assert abs(bucket.reserve() - 0.1) < 0.01
+        assert abs(bucket.reserve() - 0.2) < 0.01
+        assert bucket.stats['requests'] == 4
+        assert bucket.stats['delayed'] == 2
+        assert abs(bucket.stats['total_delay'] - 0.3) < 0.02
+
+    def test_max_delay(self):
+        bucket = ratelimit.TokenBucket(1, 1, max_delay=5)
+        bucket.block(100)
+
+        assert bucket.reserve() == 5
+
+    def test_retry_after_seconds(self, bucket):
+        bucket.update({'Retry-After': '30'})
+
+        assert abs(bucket.reserve() - 30) < 0.1
+
+    def test_retry_after_date(self, bucket):
+        bucket.update({'Retry-After': time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 60))})
+
+        assert abs(bucket.reserve() - 60) < 2
+
+    def test_rate_limit_exhausted(self, bucket):
+        bucket.update({
+            'X-RateLimit-Remaining': '0',
+            'X-RateLimit-Reset': str(int(time.time()) + 20),
+        })
+
+        assert abs(bucket.reserve() - 20) < 2
+
+    def test_rate_limit_remaining(self, bucket):
+        bucket.update({
+            'X-RateLimit-Remaining': '4000',
+            'X-RateLimit-Reset': str(int(time.time()) + 20),
+        })
+
+        assert bucket.reserve() == 0
+
+    def test_ignores_garbage(self, bucket):
+        bucket.update({'Retry-After': 'soon', 'X-RateLimit-Remaining': 'none', 'X-RateLimit-Reset': '1'})
+
+        assert bucket.reserve() == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_sleeps(self, bucket):
+        bucket.block(0.05)
+        start = time.monotonic()
+
+        await bucket.acquire()
+
+        assert time.monotonic() - start >= 0.04
+
+    def test_acquire_on_several_loops(self, bucket):
+        bucket.block(0.05)
+        errors = []
+
+        def acquire():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(bucket.acquire())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                loop.close()
+
+        threads = [threading.Thread(target=acquire) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert bucket.requests == 4
+        assert bucket.delayed == 4
+
+
+class TestGetBucket:
+
+    def setup_method(self, method):
+        ratelimit._BUCKETS.clear()
+
+    def test_keyed_by_provider_host_and_credentials(self):
+        bucket = ratelimit.get_bucket('github', 'https://api.github.com/repos', {'token': 'a'})
+
+        assert bucket is ratelimit.get_bucket('github', 'https://api.github.com/user', {'token': 'a'})
+        assert bucket is not ratelimit.get_bucket('github', 'https://api.github.com/user', {'token': 'b'})
+        assert bucket is not ratelimit.get_bucket('github', 'https://uploads.github.com/', {'token': 'a'})
+        assert bucket is not ratelimit.get_bucket('s3', 'https://api.github.com/repos', {'token': 'a'})
+
+    def test_provider_limits(self):
+        with mock.patch('waterbutler.settings.RATE_LIMITS', {'github': {'rate': 1, 'burst': 50}}):
+            bucket = ratelimit.get_bucket('github', 'https://api.github.com/', {})
+
+        assert bucket.rate == 1
+        assert bucket.burst == 50
+
+    def test_evicts_oldest(self):
+        with mock.patch('waterbutler.settings.RATE_LIMIT_MAX_BUCKETS', 2):
+            first = ratelimit.get_bucket('s3', 'https://one/', {})
+            ratelimit.get_bucket('s3', 'https://two/', {})
+            ratelimit.get_bucket('s3', 'https://three/', {})
+
+        assert len(ratelimit._BUCKETS) == 2
+        assert first is not ratelimit.get_bucket('s3', 'https://one/', {})
+
+    def test_shared_across_threads(self):
+        start = threading.Barrier(8)
+        buckets = []
+
+        def reserve():
+            start.wait()
+            for _ in range(200):
+                bucket = ratelimit.get_bucket('s3', 'https://one/', {})
+                bucket.reserve()
+            buckets.append(bucket)
+
+        with mock.patch('waterbutler.settings.RATE_LIMITS', {'s3': {'rate': 1e6, 'burst': 1e6}}):
+            threads = [threading.Thread(target=reserve) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(ratelimit._BUCKETS) == 1
+        assert all(bucket is buckets[0] for bucket in buckets)
+        assert ratelimit.stats()['s3']['requests'] == 8 * 200
+
+    def test_stats(self):
+        bucket = ratelimit.get_bucket('s3', 'https://one/', {})
+        bucket.block(1)
+        bucket.reserve()
+
+        stats = ratelimit.stats()
+
+        assert stats['s3']['requests'] == 1
+        assert stats['s3']['delayed'] == 1
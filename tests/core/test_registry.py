@@ -0,0 +1,50 @@
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import utils
+from waterbutler.core import registry
+from waterbutler.core import exceptions
+from waterbutler.providers.filesystem import FileSystemProvider
+
+
+class TestRegistry:
+
+    def setup_method(self, method):
+        registry.clear()
+
+    def teardown_method(self, method):
+        registry.clear()
+
+    def test_load(self):
+        names = registry.load()
+
+        assert 'filesystem' in names
+        assert registry.get('filesystem') is FileSystemProvider
+
+    def test_get_resolves_once(self):
+        manager = mock.Mock(return_value=mock.Mock(driver=FileSystemProvider))
+
+        with mock.patch('waterbutler.core.registry.driver.DriverManager', manager):
+            assert registry.get('filesystem') is FileSystemProvider
+            assert registry.get('filesystem') is FileSystemProvider
+
+        assert manager.call_count == 1
+
+    def test_get_after_load_skips_entry_points(self):
+        registry.load()
+
+        with mock.patch('waterbutler.core.registry.driver.DriverManager') as manager:
+            assert registry.get('filesystem') is FileSystemProvider
+
+        assert not manager.called
+
+    def test_not_found(self):
+        with pytest.raises(exceptions.ProviderNotFound):
+            registry.get('notaprovider')
+
+    def test_make_provider(self, tmpdir):
+        provider = utils.make_provider('filesystem', {}, {}, {'folder': str(tmpdir)})
+
+        assert isinstance(provider, FileSystemProvider)
+        assert provider.folder == str(tmpdir)
@@ -0,0 +1,245 @@
+import os
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import transfer
+from waterbutler.core import exceptions
+
+from waterbutler.providers.filesystem import FileSystemProvider
+from waterbutler.providers.filesystem.metadata import FileSystemFolderMetadata
+
+
+class SlowFileSystemProvider(FileSystemProvider):
+    """A filesystem provider that can create folders, never copies intra-provider and tracks how
+    many uploads are in flight, so the transfer engine does all of the work
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def can_intra_copy(self, dest_provider, path=None):
+        return False
+
+    def can_intra_move(self, dest_provider, path=None):
+        return False
+
+    async def create_folder(self, path, **kwargs):
+        os.makedirs(path.full_path)
+        return FileSystemFolderMetadata({'path': path.path.rstrip('/')}, self.folder)
+
+    async def delete(self, path, **kwargs):
+        if not os.path.exists(path.full_path):
+            raise exceptions.NotFoundError(str(path))
+        return (await super().delete(path, **kwargs))
+
+    async def upload(self, stream, path, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return (await super().upload(stream, path, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def src_provider(tmpdir):
+    return SlowFileSystemProvider({}, {}, {'folder': str(tmpdir.mkdir('src'))})
+
+
+@pytest.fixture
+def dest_provider(tmpdir):
+    return SlowFileSystemProvider({}, {}, {'folder': str(tmpdir.mkdir('dest'))})
+
+
+@pytest.fixture
+def tree(src_provider):
+    """/a/{0..4}.txt, /a/b/{0..4}.txt, /a/b/c/{0..4}.txt"""
+    folder = src_provider.folder
+    for sub in ('a', 'a/b', 'a/b/c'):
+        os.makedirs(os.path.join(folder, sub))
+        for i in range(5):
+            with open(os.path.join(folder, sub, '{}.txt'.format(i)), 'wb') as fp:
+                fp.write(sub.encode('utf-8'))
+
+
+def listing(root):
+    return sorted(
+        os.path.relpath(os.path.join(base, name), root)
+        for base, dirs, files in os.walk(root)
+        for name in dirs + files
+    )
+
+
+class TestFolderTransfer:
+
+    @pytest.mark.asyncio
+    async def test_copies_tree(self, src_provider, dest_provider, tree):
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider, concurrency=3)
+
+        folder = await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        assert listing(os.path.join(dest_provider.folder, 'a')) == listing(os.path.join(src_provider.folder, 'a'))
+        assert job.stats == {'total': 17, 'completed': 17, 'retried': 0}
+        assert [child.name for child in folder.children] == [item.name for item in (await src_provider.metadata((await src_provider.validate_path('/a/'))))]
+        assert all(child is not None for child in folder.children)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_spans_folders(self, src_provider, dest_provider, tree):
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider, concurrency=10)
+
+        await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        # Each folder only holds 5 files, anything more means nested folders ran side by side
+        assert dest_provider.max_in_flight > 5
+        assert dest_provider.max_in_flight <= 10
+
+    @pytest.mark.asyncio
+    async def test_reports_progress(self, src_provider, dest_provider, tree):
+        reported = []
+
+        async def copy(*args, **kwargs):
+            reported.extend(transfer.stats())
+            return (await src_provider.copy(*args, **kwargs))
+
+        job = transfer.FolderTransfer(copy, src_provider, dest_provider, concurrency=1)
+        await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        assert len(reported) == 15
+        assert [stats['completed'] for stats in reported] == sorted(stats['completed'] for stats in reported)
+        assert reported[-1] == {'total': 17, 'completed': 16, 'retried': 0}
+        # Only running transfers are reported
+        assert transfer.stats() == []
+
+    @pytest.mark.asyncio
+    async def test_revalidates_children_in_bulk(self, src_provider, dest_provider, tree):
+        async def revalidate_paths(base, children):
+            return [base.child(name, folder=folder) for name, folder in children]
+
+        for provider in (src_provider, dest_provider):
+            provider.revalidate_path = mock.Mock(wraps=provider.revalidate_path)
+            provider.revalidate_paths = mock.Mock(wraps=revalidate_paths)
+
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider)
+
+        await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        # One batch per folder on each side, children are never looked up one at a time
+        assert src_provider.revalidate_paths.call_count == 3
+        assert dest_provider.revalidate_paths.call_count == 3
+        assert src_provider.revalidate_path.call_count == 0
+        assert sorted(src_provider.revalidate_paths.call_args[0][1]) == [
+            ('{}.txt'.format(i), False) for i in range(5)
+        ]
+        assert listing(os.path.join(dest_provider.folder, 'a')) == listing(os.path.join(src_provider.folder, 'a'))
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self, src_provider, dest_provider, tree):
+        upload = dest_provider.upload
+        failures = {'count': 0}
+
+        async def flaky_upload(stream, path, **kwargs):
+            if path.name == '3.txt' and failures['count'] < 2:
+                failures['count'] += 1
+                raise exceptions.UploadError('Service Unavailable', code=503)
+            return (await upload(stream, path, **kwargs))
+
+        dest_provider.upload = flaky_upload
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider, retries=2)
+
+        with mock.patch('waterbutler.settings.OP_RETRY_BACKOFF', 0):
+            await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        assert job.stats['retried'] == 2
+        assert os.path.exists(os.path.join(dest_provider.folder, 'a', '3.txt'))
+
+    @pytest.mark.asyncio
+    async def test_retries_timeouts(self, src_provider, dest_provider, tree):
+        upload = dest_provider.upload
+        failures = {'count': 0}
+
+        async def slow_upload(stream, path, **kwargs):
+            if path.name == '3.txt' and failures['count'] < 2:
+                failures['count'] += 1
+                raise asyncio.TimeoutError()
+            return (await upload(stream, path, **kwargs))
+
+        dest_provider.upload = slow_upload
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider, retries=2)
+
+        with mock.patch('waterbutler.settings.OP_RETRY_BACKOFF', 0):
+            await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        assert job.stats['retried'] == 2
+        assert os.path.exists(os.path.join(dest_provider.folder, 'a', '3.txt'))
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self, src_provider, dest_provider, tree):
+        attempts = {'count': 0}
+
+        async def upload(stream, path, **kwargs):
+            attempts['count'] += 1
+            raise exceptions.UploadError('Bad Request', code=400)
+
+        dest_provider.upload = upload
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider, concurrency=1, retries=3)
+
+        with mock.patch('waterbutler.settings.OP_RETRY_BACKOFF', 0):
+            with pytest.raises(exceptions.UploadError):
+                await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        assert attempts['count'] == 1
+        assert job.stats['retried'] == 0
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self, src_provider, dest_provider, tree):
+        async def upload(stream, path, **kwargs):
+            raise exceptions.UploadError('Service Unavailable', code=503)
+
+        dest_provider.upload = upload
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider, retries=1)
+
+        with mock.patch('waterbutler.settings.OP_RETRY_BACKOFF', 0):
+            with pytest.raises(exceptions.UploadError):
+                await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+    @pytest.mark.asyncio
+    async def test_fatal_error_cancels_outstanding_work(self, src_provider, dest_provider, tree):
+        upload = dest_provider.upload
+
+        async def failing_upload(stream, path, **kwargs):
+            if path.name == '0.txt':
+                raise exceptions.UploadError('Forbidden', code=403)
+            return (await upload(stream, path, **kwargs))
+
+        dest_provider.upload = failing_upload
+        job = transfer.FolderTransfer(src_provider.copy, src_provider, dest_provider, concurrency=1)
+
+        with pytest.raises(exceptions.UploadError):
+            await job.run((await src_provider.validate_path('/a/')), (await dest_provider.validate_path('/a/')))
+
+        assert job.stats['retried'] == 0
+        assert job.stats['completed'] < job.stats['total']
+        # Nothing is left running once the error is raised
+        await asyncio.sleep(0.05)
+        assert dest_provider.in_flight == 0
+
+
+class TestFolderFileOp:
+
+    @pytest.mark.asyncio
+    async def test_move_tree(self, src_provider, dest_provider, tree):
+        folder, created = await src_provider.move(
+            dest_provider,
+            (await src_provider.validate_path('/a/')),
+            (await dest_provider.validate_path('/')),
+        )
+
+        assert created is True
+        assert folder.name == 'a'
+        assert len(listing(dest_provider.folder)) == 18
+        assert not os.path.exists(os.path.join(src_provider.folder, 'a'))
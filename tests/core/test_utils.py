@@ -1,9 +1,12 @@
+import types
 import asyncio
 from unittest import mock
 
 import pytest
 
 from waterbutler.core import utils
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
 
 
 class TestAsyncRetry:
@@ -90,3 +93,137 @@ class TestAsyncRetry:
         await asyncio.sleep(.1)
 
         assert mock_func.call_count == 18
+
+
+class TreeProvider:
+    """Serves a fixed folder tree, slowly, recording how much work is in flight at once"""
+
+    TREE = {
+        '/': ['a.txt', 'b/', 'f.txt'],
+        '/b/': ['c.txt', 'd/'],
+        '/b/d/': ['e.txt'],
+    }
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.downloads = []
+        self.listed = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def path_from_metadata(self, parent_path, metadata):
+        return parent_path.child(metadata.name, folder=metadata.is_folder)
+
+    async def metadata(self, path):
+        self.listed.append(path.path)
+        await asyncio.sleep(0.01)
+        return self.listing(path.path)
+
+    def listing(self, path):
+        return [
+            types.SimpleNamespace(name=name.rstrip('/'), is_folder=name.endswith('/'))
+            for name in self.TREE['/' + path]
+        ]
+
+    async def download(self, path):
+        self.downloads.append(path.path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later files are ready first, they must still come out in order
+            await asyncio.sleep(0.01 * (5 - len(self.downloads)))
+            if path.name == self.fail_on:
+                raise exceptions.DownloadError('Service Unavailable', code=503)
+            return path.name
+        finally:
+            self.in_flight -= 1
+
+
+async def collect(generator):
+    items = []
+    async for item in generator:
+        items.append(item)
+    return items
+
+
+class TestZipStreamGenerator:
+
+    @pytest.mark.asyncio
+    async def test_yields_breadth_first_in_listing_order(self):
+        provider = TreeProvider()
+        root = WaterButlerPath('/', folder=True)
+
+        generator = utils.ZipStreamGenerator(provider, root, *provider.listing(''))
+
+        items = await collect(generator)
+
+        assert [(name, stream) for name, stream, _ in items] == [
+            ('a.txt', 'a.txt'),
+            ('f.txt', 'f.txt'),
+            ('b/c.txt', 'c.txt'),
+            ('b/d/e.txt', 'e.txt'),
+        ]
+        # ZipStreamReader asks again once the archive's footer is written
+        with pytest.raises(StopAsyncIteration):
+            await generator.__anext__()
+
+    @pytest.mark.asyncio
+    async def test_prefetches_downloads(self):
+        provider = TreeProvider()
+        root = WaterButlerPath('/', folder=True)
+        generator = utils.ZipStreamGenerator(provider, root, *provider.listing(''), prefetch=2)
+
+        await generator.__anext__()
+        await asyncio.sleep(0.05)
+
+        # The first file is handed out, the next two are opened behind it
+        assert provider.downloads == ['a.txt', 'f.txt', 'b/c.txt']
+        assert provider.max_in_flight > 1
+
+        await collect(generator)
+        assert len(provider.downloads) == 4
+
+    @pytest.mark.asyncio
+    async def test_sequential(self):
+        provider = TreeProvider()
+        root = WaterButlerPath('/', folder=True)
+        generator = utils.ZipStreamGenerator(provider, root, *provider.listing(''), prefetch=1)
+
+        items = await collect(generator)
+
+        assert [name for name, *_ in items] == ['a.txt', 'f.txt', 'b/c.txt', 'b/d/e.txt']
+
+    @pytest.mark.asyncio
+    async def test_download_error_is_raised_in_order(self):
+        provider = TreeProvider(fail_on='c.txt')
+        root = WaterButlerPath('/', folder=True)
+        generator = utils.ZipStreamGenerator(provider, root, *provider.listing(''))
+
+        assert (await generator.__anext__())[0] == 'a.txt'
+        assert (await generator.__anext__())[0] == 'f.txt'
+
+        with pytest.raises(exceptions.DownloadError):
+            await generator.__anext__()
+
+        await asyncio.sleep(0.05)
+        assert provider.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_walk_lists_everything_up_front(self):
+        provider = TreeProvider()
+        root = WaterButlerPath('/', folder=True)
+        generator = utils.ZipStreamGenerator(provider, root, *provider.listing(''))
+
+        files = await generator.walk()
+
+        assert [name for name, _ in files] == ['a.txt', 'f.txt', 'b/c.txt', 'b/d/e.txt']
+        assert all(metadata.name == name.split('/')[-1] for name, metadata in files)
+        assert provider.downloads == []
+        assert sorted(provider.listed) == ['b/', 'b/d/']
+
+        items = await collect(generator)
+
+        # Streamed from the walk, in the same order, without listing again
+        assert [name for name, *_ in items] == ['a.txt', 'f.txt', 'b/c.txt', 'b/d/e.txt']
+        assert [metadata for *_, metadata in items] == [metadata for _, metadata in files]
+        assert sorted(provider.listed) == ['b/', 'b/d/']
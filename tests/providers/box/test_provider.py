@@ -321,6 +321,31 @@ class TestValidatePath:
 
         assert wb_path_v1 == wb_path_v0
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_revalidate_paths_pages_through_listing(self, provider):
+        base = WaterButlerPath('/', _ids=[provider.folder])
+        first_url = provider.build_url('folders', provider.folder, 'items', fields='id,name,type', limit=1000)
+        second_url = provider.build_url('folders', provider.folder, 'items', fields='id,name,type', limit=1000, offset=1)
+
+        aiohttpretty.register_json_uri('GET', first_url, body={
+            'total_count': 2,
+            'entries': [{'type': 'file', 'id': '1', 'name': 'Foo.txt'}],
+        })
+        aiohttpretty.register_json_uri('GET', second_url, body={
+            'total_count': 2,
+            'entries': [{'type': 'folder', 'id': '2', 'name': 'bar'}],
+        })
+
+        foo, bar, missing = await provider.revalidate_paths(base, [('foo.txt', False), ('bar', True), ('baz', None)])
+
+        assert foo.name == 'foo.txt'
+        assert foo.identifier == '1'
+        assert bar.identifier == '2'
+        assert bar.is_dir
+        assert missing.identifier is None
+        assert aiohttpretty.has_call(method='GET', uri=second_url)
+
 
 class TestDownload:
 
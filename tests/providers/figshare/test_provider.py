@@ -411,3 +411,25 @@ class TestRevalidatePath:
         assert result.is_dir is False
         assert result.name == 'fantine.mp3'
         assert result.identifier == article_id
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_revalidate_paths(self, project_provider, list_project_articles, article_metadata, file_metadata):
+        article_id = str(list_project_articles[0]['id'])
+        list_project_articles[0]['title'] = 'fantine.mp3'
+
+        article_metadata_url = project_provider.build_url('articles', article_id)
+        list_articles_url = project_provider.build_url('projects', project_provider.project_id, 'articles')
+
+        aiohttpretty.register_json_uri('GET', list_articles_url, body=list_project_articles)
+        aiohttpretty.register_json_uri('GET', article_metadata_url, body=article_metadata)
+
+        path = await project_provider.validate_path('/')
+
+        found, missing = await project_provider.revalidate_paths(path, [('fantine.mp3', False), ('cosette.mp3', False)])
+
+        assert aiohttpretty.has_call(method='GET', uri=list_articles_url)
+        assert found.name == 'fantine.mp3'
+        assert found.identifier == article_id
+        assert missing.name == 'cosette.mp3'
+        assert missing.identifier is None
@@ -3,7 +3,9 @@ import pytest
 import io
 import os
 import shutil
+import asyncio
 from http import client
+from unittest import mock
 
 from waterbutler.core import streams
 from waterbutler.core import metadata
@@ -94,6 +96,37 @@ class TestCRUD:
 
         assert content == b'I am a file'
 
+    @pytest.mark.asyncio
+    async def test_download_range(self, provider):
+        path = await provider.validate_path('/flower.jpg')
+
+        result = await provider.download(path, range=(2, 4))
+        content = await result.read()
+
+        assert content == b'am'
+        assert result.partial
+        assert result.size == 2
+        assert result.content_range == 'bytes 2-3/11'
+
+    @pytest.mark.asyncio
+    async def test_download_range_suffix(self, provider):
+        path = await provider.validate_path('/flower.jpg')
+
+        result = await provider.download(path, range=(-4, None))
+        content = await result.read()
+
+        assert content == b'file'
+        assert result.content_range == 'bytes 7-10/11'
+
+    @pytest.mark.asyncio
+    async def test_download_range_not_satisfiable(self, provider):
+        path = await provider.validate_path('/flower.jpg')
+
+        with pytest.raises(exceptions.DownloadError) as exc:
+            await provider.download(path, range=(20, None))
+
+        assert exc.value.code == 416
+
     @pytest.mark.asyncio
     async def test_download_not_found(self, provider):
         path = await provider.validate_path('/missing.txt')
@@ -133,6 +166,28 @@ class TestCRUD:
         assert metadata.size == len(file_content)
         assert created is False
 
+    @pytest.mark.asyncio
+    async def test_upload_buffered_request_stream(self, provider):
+        chunk = os.urandom(65536)
+        chunks = 128  # 8MB
+        request = mock.Mock(headers={'Content-Length': str(len(chunk) * chunks)})
+        file_stream = streams.BufferedRequestStreamReader(request, max_buffer_size=len(chunk) * 4)
+
+        async def receive():
+            for _ in range(chunks):
+                await file_stream.write(chunk)
+            file_stream.write_eof()
+
+        receiver = asyncio.ensure_future(receive())
+        path = await provider.validate_path('/big.bin')
+        metadata, created = await provider.upload(file_stream, path)
+        await receiver
+
+        assert metadata.size == len(chunk) * chunks
+        assert created is True
+        with open(path.full_path, 'rb') as fp:
+            assert fp.read(len(chunk)) == chunk
+
     @pytest.mark.asyncio
     async def test_upload_nested_create(self, provider):
         file_name = 'new.txt'
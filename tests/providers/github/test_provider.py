@@ -9,14 +9,18 @@ from http import client
 
 import aiohttpretty
 
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.provider import build_url
+from waterbutler.core.utils import AsyncIterator
 
 from waterbutler.providers.github import GitHubProvider
 from waterbutler.providers.github import settings as github_settings
+from waterbutler.providers.github import provider as github_provider
 from waterbutler.providers.github.provider import GitHubPath
+from waterbutler.providers.github.exceptions import GitHubUnsupportedRepoError
 from waterbutler.providers.github.metadata import GitHubRevision
 from waterbutler.providers.github.metadata import GitHubFileTreeMetadata
 from waterbutler.providers.github.metadata import GitHubFolderTreeMetadata
@@ -24,6 +28,13 @@ from waterbutler.providers.github.metadata import GitHubFileContentMetadata
 from waterbutler.providers.github.metadata import GitHubFolderContentMetadata
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    github_provider._OBJECTS.clear()
+    github_provider._BRANCHES.clear()
+    cache.conditional.backend.clear()
+
+
 @pytest.fixture
 def auth():
     return {
@@ -882,3 +893,238 @@ class TestCreateFolder:
         assert metadata.kind == 'folder'
         assert metadata.name == 'trains'
         assert metadata.path == '/i/like/trains/'
+
+
+class TestCaching:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_validate_v1_path_cached(self, provider, branch_metadata, repo_tree_metadata_root):
+        branch_url = provider.build_repo_url('branches', provider.default_branch)
+        tree_url = provider.build_repo_url('git', 'trees',
+                                           branch_metadata['commit']['commit']['tree']['sha'],
+                                           recursive=1)
+
+        aiohttpretty.register_json_uri('GET', branch_url, body=branch_metadata)
+        aiohttpretty.register_json_uri('GET', tree_url, body=repo_tree_metadata_root)
+
+        first = await provider.validate_v1_path('/file.txt')
+
+        # Neither the branch nor the tree is fetched again
+        aiohttpretty.clear()
+        second = await provider.validate_v1_path('/file.txt')
+
+        assert first == second
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_branch_forgotten_on_write(self, provider, branch_metadata):
+        branch_url = provider.build_repo_url('branches', provider.default_branch)
+        aiohttpretty.register_json_uri('GET', branch_url, body=branch_metadata)
+
+        await provider._fetch_branch(provider.default_branch)
+        provider.invalidate_metadata()
+
+        moved = dict(branch_metadata, name='moved')
+        aiohttpretty.register_json_uri('GET', branch_url, body=moved)
+
+        assert await provider._fetch_branch(provider.default_branch) == moved
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_branch_not_cached(self, monkeypatch, provider, branch_metadata):
+        monkeypatch.setattr(github_settings, 'BRANCH_CACHE_TTL', 0)
+        branch_url = provider.build_repo_url('branches', provider.default_branch)
+        aiohttpretty.register_json_uri('GET', branch_url, body=branch_metadata)
+
+        await provider._fetch_branch(provider.default_branch)
+
+        assert len(github_provider._BRANCHES) == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_tree_cache_returns_copies(self, provider, repo_tree_metadata_root):
+        sha = hashlib.sha1().hexdigest()
+        tree_url = provider.build_repo_url('git', 'trees', sha, recursive=1)
+        aiohttpretty.register_json_uri('GET', tree_url, body=repo_tree_metadata_root)
+
+        tree = await provider._fetch_tree(sha, recursive=True)
+        tree['tree'] = []
+
+        assert await provider._fetch_tree(sha, recursive=True) == repo_tree_metadata_root
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_download_blob_cached(self, provider, repo_tree_metadata_root):
+        ref = hashlib.sha1().hexdigest()
+        file_sha = repo_tree_metadata_root['tree'][0]['sha']
+        path = await provider.validate_path('/file.txt')
+
+        url = provider.build_repo_url('git', 'blobs', file_sha)
+        tree_url = provider.build_repo_url('git', 'trees', ref, recursive=1)
+        commit_url = provider.build_repo_url('commits', path=path.path.lstrip('/'), sha=path.identifier[0])
+
+        aiohttpretty.register_uri('GET', url, body=b'delicious')
+        aiohttpretty.register_json_uri('GET', tree_url, body=repo_tree_metadata_root)
+        aiohttpretty.register_json_uri('GET', commit_url, body=[{'commit': {'tree': {'sha': ref}}}])
+
+        assert await (await provider.download(path)).read() == b'delicious'
+
+        # Only the file's history is fetched again
+        aiohttpretty.clear()
+        aiohttpretty.register_json_uri('GET', commit_url, body=[{'commit': {'tree': {'sha': ref}}}])
+
+        assert await (await provider.download(path)).read() == b'delicious'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_repo_not_modified(self, provider, repo_metadata):
+        url = provider.build_repo_url()
+        aiohttpretty.register_json_uri('GET', url, body=repo_metadata, headers={'ETag': '"v1"'})
+
+        assert await provider._fetch_repo() == repo_metadata
+
+        aiohttpretty.register_uri('GET', url, status=304, headers={'ETag': '"v1"'})
+
+        assert await provider._fetch_repo() == repo_metadata
+        assert cache.conditional.hits >= 1
+
+
+class TestTruncatedTrees:
+
+    @pytest.fixture
+    def trees(self):
+        root, level1, level2 = 'a' * 40, 'b' * 40, 'c' * 40
+        return root, {
+            root: [
+                {'path': 'level1', 'type': 'tree', 'mode': '040000', 'sha': level1},
+                {'path': 'file.txt', 'type': 'blob', 'mode': '100644', 'sha': 'd' * 40, 'size': 1},
+            ],
+            level1: [
+                {'path': 'level2', 'type': 'tree', 'mode': '040000', 'sha': level2},
+                {'path': 'file.txt', 'type': 'blob', 'mode': '100644', 'sha': 'e' * 40, 'size': 1},
+            ],
+            level2: [
+                {'path': 'file.txt', 'type': 'blob', 'mode': '100644', 'sha': 'f' * 40, 'size': 1},
+            ],
+        }
+
+    def register_trees(self, provider, root, trees, skip=()):
+        aiohttpretty.register_json_uri(
+            'GET',
+            provider.build_repo_url('git', 'trees', root, recursive=1),
+            body={'sha': root, 'tree': [], 'truncated': True},
+        )
+        for sha, tree in trees.items():
+            if sha in skip:
+                continue
+            aiohttpretty.register_json_uri(
+                'GET',
+                provider.build_repo_url('git', 'trees', sha),
+                body={'sha': sha, 'tree': tree, 'truncated': False},
+            )
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_search_descends_path(self, provider, trees):
+        root, trees = trees
+        # Only the folders along the path are fetched
+        self.register_trees(provider, root, trees, skip=('c' * 40, ))
+
+        entity = await provider._search_tree_for_path('/level1/file.txt', root)
+
+        assert entity['path'] == 'level1/file.txt'
+        assert entity['sha'] == 'e' * 40
+
+        with pytest.raises(exceptions.NotFoundError):
+            await provider._search_tree_for_path('/level1/missing.txt', root)
+
+        with pytest.raises(exceptions.NotFoundError):
+            await provider._search_tree_for_path('/file.txt/level1/', root)
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_walks_whole_tree(self, provider, trees):
+        root, trees = trees
+        self.register_trees(provider, root, trees)
+
+        tree = await provider._fetch_tree(root, recursive=True)
+
+        assert not tree['truncated']
+        assert [item['path'] for item in tree['tree']] == [
+            'level1',
+            'level1/level2',
+            'level1/level2/file.txt',
+            'level1/file.txt',
+            'file.txt',
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_truncated_folder(self, provider):
+        sha = 'a' * 40
+        aiohttpretty.register_json_uri(
+            'GET',
+            provider.build_repo_url('git', 'trees', sha),
+            body={'sha': sha, 'tree': [], 'truncated': True},
+        )
+
+        with pytest.raises(GitHubUnsupportedRepoError):
+            await provider._fetch_tree(sha)
+
+
+class TestBatchUpload:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_single_commit(self, provider, repo_metadata):
+        path = await provider.validate_path('/upload/')
+        branch = path.identifier[0]
+        contents_url = provider.build_repo_url('contents', path.path, ref=branch)
+        blob_url = provider.build_repo_url('git', 'blobs')
+        ref_url = provider.build_repo_url('git', 'refs', 'heads', branch)
+        tree_url = provider.build_repo_url('git', 'trees')
+        commit_url = provider.build_repo_url('git', 'commits')
+
+        aiohttpretty.register_json_uri('GET', contents_url, status=404, body={'message': 'Not Found'})
+        aiohttpretty.register_json_uri('POST', blob_url, status=201, body={'sha': 'b' * 40})
+        aiohttpretty.register_json_uri('GET', ref_url, body={'object': {'sha': 'a' * 40}})
+        aiohttpretty.register_json_uri('POST', tree_url, status=201, body={'sha': 'c' * 40})
+        aiohttpretty.register_json_uri('POST', commit_url, status=201, body={
+            'sha': 'd' * 40,
+            'author': {'date': '2015-06-01T12:30:00Z'},
+            'committer': {'date': '2015-06-01T12:30:00Z'},
+        })
+        aiohttpretty.register_json_uri('POST', ref_url, body={'object': {'sha': 'd' * 40}})
+
+        files = AsyncIterator([
+            ('one.txt', streams.StringStream(b'[File One]')),
+            ('nested/two.txt', streams.StringStream(b'[File Two]')),
+        ])
+
+        folder, created = await provider.upload_batch(files, path)
+
+        assert created is True
+        assert folder.path == '/upload/'
+        assert [child.path for child in folder.children] == ['/upload/one.txt', '/upload/nested/two.txt']
+
+        # One tree, one commit, and a single move of the branch for all the files
+        assert aiohttpretty.has_call(method='POST', uri=blob_url)
+        assert aiohttpretty.has_call(method='POST', uri=tree_url)
+        assert aiohttpretty.has_call(method='POST', uri=commit_url)
+        assert aiohttpretty.has_call(method='POST', uri=ref_url)
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_blob_error_stops_upload(self, provider, repo_metadata):
+        path = await provider.validate_path('/')
+        blob_url = provider.build_repo_url('git', 'blobs')
+
+        aiohttpretty.register_json_uri('POST', blob_url, status=500, body={'message': 'Server Error'})
+
+        files = AsyncIterator([('one.txt', streams.StringStream(b'[File One]'))])
+
+        with pytest.raises(exceptions.UploadError):
+            await provider.upload_batch(files, path)
+
+        assert not aiohttpretty.has_call(method='POST', uri=provider.build_repo_url('git', 'trees'))
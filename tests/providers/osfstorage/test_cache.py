@@ -0,0 +1,123 @@
+import os
+import time
+import shutil
+import hashlib
+
+import pytest
+
+from waterbutler.providers.osfstorage.cache import CompleteFileCache
+
+
+def complete_file(tmpdir, content, age=0):
+    name = hashlib.sha256(content).hexdigest()
+    path = tmpdir.join(name)
+    path.write_binary(content)
+    used = time.time() - age
+    os.utime(str(path), (used, used))
+    return name
+
+
+class TestCompleteFileCache:
+
+    def test_lookup(self, tmpdir):
+        cache = CompleteFileCache(str(tmpdir))
+        name = complete_file(tmpdir, b'cached', age=3600)
+
+        assert cache.lookup(name) == str(tmpdir.join(name))
+        assert cache.lookup(hashlib.sha256(b'missing').hexdigest()) is None
+        assert cache.stats == {'hits': 1, 'misses': 1, 'evictions': 0}
+
+        # A hit marks the file as just used
+        assert time.time() - os.path.getmtime(str(tmpdir.join(name))) < 60
+
+    @pytest.mark.parametrize('name', ['../etc/passwd', 'test/path', 'ABC', ''])
+    def test_lookup_only_content_addressed(self, tmpdir, name):
+        cache = CompleteFileCache(str(tmpdir))
+
+        assert cache.lookup(name) is None
+        assert cache.misses == 1
+
+    def test_add(self, tmpdir):
+        cache = CompleteFileCache(str(tmpdir.mkdir('complete')))
+        src = tmpdir.join('pending')
+        src.write_binary(b'uploaded')
+        name = hashlib.sha256(b'uploaded').hexdigest()
+
+        assert cache.add(str(src), name) == os.path.join(cache.path, name)
+        assert os.listdir(cache.path) == [name]
+        assert not src.exists()
+
+    def test_add_partial_not_served(self, tmpdir, monkeypatch):
+        cache = CompleteFileCache(str(tmpdir.mkdir('complete')))
+        src = tmpdir.join('pending')
+        src.write_binary(b'uploaded')
+        name = hashlib.sha256(b'uploaded').hexdigest()
+        lookups = []
+
+        def copy_across_devices(src, dst):
+            # Half copied, as a move to another device might be when a download comes in
+            with open(dst, 'wb') as fp:
+                fp.write(b'upl')
+            lookups.append(cache.lookup(name))
+            os.remove(dst)
+            return shutil.copy2(src, dst)
+
+        monkeypatch.setattr(shutil, 'move', copy_across_devices)
+        cache.add(str(src), name)
+
+        assert lookups == [None]
+        assert os.listdir(cache.path) == [name]
+        with open(cache.lookup(name), 'rb') as fp:
+            assert fp.read() == b'uploaded'
+
+    def test_evict_least_recently_used(self, tmpdir):
+        cache = CompleteFileCache(str(tmpdir), max_size=25)
+        oldest = complete_file(tmpdir, b'a' * 10, age=300)
+        older = complete_file(tmpdir, b'b' * 10, age=200)
+        newest = complete_file(tmpdir, b'c' * 10, age=100)
+
+        # Using the oldest makes it the newest
+        cache.lookup(oldest)
+
+        assert cache.evict() == [str(tmpdir.join(older))]
+        assert sorted(os.listdir(str(tmpdir))) == sorted([oldest, newest])
+        assert cache.evictions == 1
+
+    def test_evict_keeps_recent_files(self, tmpdir):
+        cache = CompleteFileCache(str(tmpdir), max_size=5, min_age=150)
+        old = complete_file(tmpdir, b'a' * 10, age=200)
+        recent = complete_file(tmpdir, b'b' * 10, age=100)
+
+        cache.evict()
+
+        assert os.listdir(str(tmpdir)) == [recent]
+        assert not tmpdir.join(old).exists()
+
+    def test_evict_skips_other_files(self, tmpdir):
+        cache = CompleteFileCache(str(tmpdir), max_size=0)
+        name = complete_file(tmpdir, b'a' * 10, age=100)
+        tmpdir.join(name + '.vol0+1.par2').write_binary(b'parity')
+
+        cache.evict()
+
+        assert os.listdir(str(tmpdir)) == [name + '.vol0+1.par2']
+
+    def test_evict_unbounded(self, tmpdir):
+        cache = CompleteFileCache(str(tmpdir))
+        name = complete_file(tmpdir, b'a' * 10, age=100)
+
+        assert cache.evict() == []
+        assert os.listdir(str(tmpdir)) == [name]
+
+    @pytest.mark.asyncio
+    async def test_trim_throttled(self, tmpdir):
+        cache = CompleteFileCache(str(tmpdir), max_size=0, evict_interval=60)
+        first = complete_file(tmpdir, b'a', age=100)
+
+        await cache.trim()
+        assert not tmpdir.join(first).exists()
+
+        second = complete_file(tmpdir, b'b', age=100)
+        await cache.trim()
+        assert tmpdir.join(second).exists()
+        assert cache.evictions == 1
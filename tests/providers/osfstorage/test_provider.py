@@ -1,7 +1,9 @@
 import os
 import io
+import json
 import time
 import asyncio
+import hashlib
 from http import client
 from unittest import mock
 
@@ -15,7 +17,11 @@ from waterbutler.core import metadata
 from waterbutler.core import exceptions
 from waterbutler.server import settings
 from waterbutler.core.path import WaterButlerPath
+from waterbutler.providers.filesystem import FileSystemProvider
 from waterbutler.providers.osfstorage import OSFStorageProvider
+from waterbutler.providers.osfstorage import settings as osf_settings
+from waterbutler.providers.osfstorage.cache import cache
+from waterbutler.providers.osfstorage.metadata import OsfStorageFileMetadata
 from waterbutler.providers.osfstorage.settings import FILE_PATH_COMPLETE
 
 
@@ -202,6 +208,30 @@ async def test_download(monkeypatch, provider_and_mock, osf_response, mock_path,
     inner_provider.download.assert_called_once_with(path=WaterButlerPath('/test/path'), displayName='unrelatedpath')
 
 
+@pytest.mark.asyncio
+@pytest.mark.aiohttpretty
+async def test_download_complete_cache(monkeypatch, tmpdir, provider_and_mock, osf_response, mock_path, mock_time):
+    provider, inner_provider = provider_and_mock
+    content = b'sleepy cat'
+    name = hashlib.sha256(content).hexdigest()
+    tmpdir.join(name).write_binary(content)
+    osf_response['data']['path'] = name
+
+    monkeypatch.setattr(osf_settings, 'COMPLETE_CACHE', True)
+    monkeypatch.setattr(cache, 'path', str(tmpdir))
+
+    base_url = provider.build_url(mock_path.identifier, 'download', version=None, mode=None)
+    url, _, params = provider.build_signed_url('GET', base_url)
+    aiohttpretty.register_json_uri('GET', url, params=params, body=osf_response)
+
+    stream = await provider.download(mock_path, range=(0, 5))
+
+    assert not inner_provider.download.called
+    assert stream.name == 'unrelatedpath'
+    assert stream.content_range == 'bytes 0-4/10'
+    assert await stream.read() == b'sleep'
+
+
 @pytest.mark.asyncio
 @pytest.mark.aiohttpretty
 async def test_delete(monkeypatch, provider, mock_path, mock_time):
@@ -274,6 +304,41 @@ async def test_provider_metadata(monkeypatch, provider, mock_folder_path, mock_t
     assert aiohttpretty.has_call(method='GET', uri=url, params=params)
 
 
+@pytest.mark.asyncio
+@pytest.mark.aiohttpretty
+async def test_provider_revalidate_paths(monkeypatch, provider, mock_folder_path, mock_time):
+    items = [
+        {
+            'name': 'foo',
+            'path': '/foo',
+            'kind': 'file',
+            'version': 10,
+            'downloads': 1,
+            'md5': '1234',
+            'sha256': '2345',
+        },
+        {
+            'name': 'baz',
+            'path': '/baz',
+            'kind': 'folder'
+        }
+    ]
+    url, _, params = provider.build_signed_url('GET', provider.build_url(mock_folder_path.identifier, 'children'))
+    aiohttpretty.register_json_uri('GET', url, params=params, status=200, body=items)
+
+    foo, baz, missing = await provider.revalidate_paths(
+        mock_folder_path,
+        [('foo', False), ('baz', True), ('baz', False)]
+    )
+
+    assert foo.identifier == 'foo'
+    assert foo.is_file
+    assert baz.identifier == 'baz'
+    assert baz.is_dir
+    assert missing.identifier is None
+    assert aiohttpretty.has_call(method='GET', uri=url, params=params)
+
+
 class TestValidatePath:
 
     @pytest.mark.asyncio
@@ -352,7 +417,7 @@ class TestUploads:
         assert path.identifier_path == res.path
 
         inner_provider.delete.assert_called_once_with(WaterButlerPath('/uniquepath'))
-        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
+        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['spool'].hexdigests['sha256']))
         inner_provider.upload.assert_called_once_with(file_stream, WaterButlerPath('/uniquepath'), check_created=False, fetch_metadata=False)
 
     @pytest.mark.asyncio
@@ -379,9 +444,9 @@ class TestUploads:
         assert res.extra['downloads'] == 10
         assert res.extra['checkout'] == 'hmoco'
 
-        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
+        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['spool'].hexdigests['sha256']))
         inner_provider.upload.assert_called_once_with(file_stream, WaterButlerPath('/uniquepath'), check_created=False, fetch_metadata=False)
-        inner_provider.move.assert_called_once_with(inner_provider, WaterButlerPath('/uniquepath'), WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
+        inner_provider.move.assert_called_once_with(inner_provider, WaterButlerPath('/uniquepath'), WaterButlerPath('/' + file_stream.writers['spool'].hexdigests['sha256']))
 
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
@@ -414,8 +479,90 @@ class TestUploads:
         assert res.extra['checkout'] is None
 
         inner_provider.upload.assert_called_once_with(file_stream, WaterButlerPath('/uniquepath'), check_created=False, fetch_metadata=False)
-        complete_path = os.path.join(FILE_PATH_COMPLETE, file_stream.writers['sha256'].hexdigest)
+        complete_path = os.path.join(FILE_PATH_COMPLETE, file_stream.writers['spool'].hexdigests['sha256'])
         mock_parity.assert_called_once_with(complete_path, credentials['parity'], settings['parity'])
         mock_backup.assert_called_once_with(complete_path, 'versionpk', 'https://waterbutler.io/hooks/metadata/', credentials['archive'], settings['parity'])
-        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
-        inner_provider.move.assert_called_once_with(inner_provider, WaterButlerPath('/uniquepath'), WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
+        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['spool'].hexdigests['sha256']))
+        inner_provider.move.assert_called_once_with(inner_provider, WaterButlerPath('/uniquepath'), WaterButlerPath('/' + file_stream.writers['spool'].hexdigests['sha256']))
+
+
+class FakeOSF:
+    """Just enough of the OSF's storage API for folders to be created and listed"""
+
+    class Response:
+
+        def __init__(self, status, body):
+            self.status = status
+            self.body = body
+
+        async def json(self):
+            return self.body
+
+        async def release(self):
+            pass
+
+    def __init__(self, root_id):
+        self.items = {root_id: {'kind': 'folder', 'name': '', 'children': []}}
+
+    def add(self, parent_id, name, kind):
+        if parent_id not in self.items:
+            raise exceptions.ProviderError('Parent not found', code=404)
+        item_id = 'id{}'.format(len(self.items))
+        self.items[item_id] = {'kind': kind, 'name': name, 'children': []}
+        self.items[parent_id]['children'].append(item_id)
+        return self.serialize(item_id)
+
+    def serialize(self, item_id):
+        item = self.items[item_id]
+        if item['kind'] == 'folder':
+            return {'kind': 'folder', 'name': item['name'], 'path': '/{}/'.format(item_id)}
+        return {
+            'kind': 'file', 'name': item['name'], 'path': '/' + item_id, 'size': 4, 'version': 1,
+            'downloads': 0, 'checkout': None, 'md5': None, 'sha256': None, 'modified': None,
+        }
+
+    async def request(self, method, url, data=None, **kwargs):
+        item_id, action = url.split('/')[3:5]
+        if action != 'children':
+            raise AssertionError('Unexpected request {} {}'.format(method, url))
+
+        if method == 'POST':
+            body = json.loads(data)
+            return self.Response(201, {'data': self.add(item_id, body['name'], body['kind'])})
+
+        if item_id not in self.items:
+            raise exceptions.MetadataError('Not found', code=404)
+        return self.Response(200, [self.serialize(child) for child in self.items[item_id]['children']])
+
+
+class TestFolderCopy:
+
+    @pytest.mark.asyncio
+    async def test_copy_nested_tree(self, provider, tmpdir):
+        src_folder = tmpdir.mkdir('src')
+        src_folder.mkdir('a').mkdir('b').mkdir('c').join('f.txt').write_binary(b'data')
+        src_provider = FileSystemProvider({}, {}, {'folder': str(src_folder)})
+
+        osf = FakeOSF(provider.root_id)
+        provider.make_signed_request = osf.request
+
+        async def upload(stream, path, **kwargs):
+            # The folder the file goes in must have been found
+            assert path.parent.identifier is not None
+            await stream.read()
+            return OsfStorageFileMetadata(osf.add(path.parent.identifier, path.name, 'file'), str(path)), True
+
+        provider.upload = upload
+
+        src_path = await src_provider.validate_path('/a/')
+        dest_path = await provider.validate_path('/')
+
+        folder, created = await src_provider.copy(provider, src_path, dest_path)
+
+        assert created is True
+        assert folder.name == 'a'
+        b = folder.children[0]
+        assert b.name == 'b'
+        c = b.children[0]
+        assert c.name == 'c'
+        assert [child.name for child in c.children] == ['f.txt']
@@ -6,6 +6,7 @@ import io
 import time
 import base64
 import hashlib
+import asyncio
 from http import client
 from unittest import mock
 
@@ -300,6 +301,42 @@ def build_folder_params(path):
     return {'prefix': path.path, 'delimiter': '/'}
 
 
+def multipart_upload_created(upload_id):
+    return '''<?xml version="1.0" encoding="UTF-8"?>
+        <InitiateMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+            <Bucket>that kerning</Bucket>
+            <Key>foobah</Key>
+            <UploadId>{}</UploadId>
+        </InitiateMultipartUploadResult>'''.format(upload_id).encode('utf-8')
+
+
+def multipart_upload_completed(etag):
+    return '''<?xml version="1.0" encoding="UTF-8"?>
+        <CompleteMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+            <Bucket>that kerning</Bucket>
+            <Key>foobah</Key>
+            <ETag>"{}"</ETag>
+        </CompleteMultipartUploadResult>'''.format(etag).encode('utf-8')
+
+
+def multipart_part_headers(part):
+    return {
+        'Content-Length': str(len(part)),
+        'Content-MD5': base64.b64encode(hashlib.md5(part).digest()).decode('ascii'),
+    }
+
+
+def multipart_complete_body(etags):
+    payload = '<?xml version="1.0" encoding="UTF-8"?>'
+    payload += '<CompleteMultipartUpload>'
+    payload += ''.join(
+        '<Part><PartNumber>{}</PartNumber><ETag>"{}"</ETag></Part>'.format(part_number, etag)
+        for part_number, etag in enumerate(etags, 1)
+    )
+    payload += '</CompleteMultipartUpload>'
+    return payload.encode('utf-8')
+
+
 class TestRegionDetection:
 
     @pytest.mark.asyncio
@@ -428,6 +465,79 @@ class TestCRUD:
 
         assert content == b'delicious'
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_download_parallel(self, provider, mock_time):
+        path = WaterButlerPath('/muhtriangle')
+        url = provider.bucket.new_key(path.path).generate_url(100, response_headers={'response-content-disposition': 'attachment'})
+        aiohttpretty.register_uri('GET', url, responses=[
+            {'status': 206, 'body': b'deli', 'auto_length': True, 'headers': {'Content-Range': 'bytes 0-3/9', 'ETag': '"etag"'}},
+            {'status': 206, 'body': b'ciou', 'auto_length': True},
+            {'status': 206, 'body': b's', 'auto_length': True},
+        ])
+
+        with mock.patch('waterbutler.providers.s3.settings.PARALLEL_DOWNLOAD_THRESHOLD', 5), \
+                mock.patch('waterbutler.providers.s3.settings.PARALLEL_DOWNLOAD_CHUNK_SIZE', 4), \
+                mock.patch('waterbutler.providers.s3.settings.PARALLEL_DOWNLOAD_CONCURRENCY', 1):
+            result = await provider.download(path, parallel=True)
+            content = await result.read()
+
+        assert isinstance(result, streams.ParallelRangeStreamReader)
+        assert result.size == 9
+        assert content == b'delicious'
+        # The size comes from the first range, not a HEAD
+        assert not aiohttpretty.has_call(method='HEAD', uri=provider.bucket.new_key(path.path).generate_url(100, 'HEAD'))
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_download_parallel_below_threshold(self, provider, mock_time):
+        path = WaterButlerPath('/muhtriangle')
+        url = provider.bucket.new_key(path.path).generate_url(100, response_headers={'response-content-disposition': 'attachment'})
+        aiohttpretty.register_uri('GET', url, responses=[
+            {'status': 206, 'body': b'deli', 'auto_length': True, 'headers': {'Content-Range': 'bytes 0-3/9', 'ETag': '"etag"'}},
+            {'status': 206, 'body': b'cious', 'auto_length': True},
+        ])
+
+        with mock.patch('waterbutler.providers.s3.settings.PARALLEL_DOWNLOAD_CHUNK_SIZE', 4):
+            result = await provider.download(path, parallel=True)
+            content = await result.read()
+
+        # The rest of the object is streamed by one request, not fetched a range at a time
+        assert isinstance(result, streams.ChainedResponseStreamReader)
+        assert result.size == 9
+        assert content == b'delicious'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_download_parallel_small_file(self, provider, mock_time):
+        path = WaterButlerPath('/muhtriangle')
+        url = provider.bucket.new_key(path.path).generate_url(100, response_headers={'response-content-disposition': 'attachment'})
+        aiohttpretty.register_uri('GET', url, status=206, body=b'delicious', auto_length=True, headers={
+            'Content-Range': 'bytes 0-8/9',
+            'ETag': '"etag"',
+        })
+
+        result = await provider.download(path, parallel=True)
+        content = await result.read()
+
+        assert isinstance(result, streams.ResponseStreamReader)
+        assert content == b'delicious'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_download_parallel_empty_file(self, provider, mock_time):
+        path = WaterButlerPath('/muhtriangle')
+        url = provider.bucket.new_key(path.path).generate_url(100, response_headers={'response-content-disposition': 'attachment'})
+        aiohttpretty.register_uri('GET', url, responses=[
+            {'status': 416, 'body': b''},
+            {'status': 200, 'body': b'', 'auto_length': True},
+        ])
+
+        result = await provider.download(path, parallel=True)
+
+        assert isinstance(result, streams.ResponseStreamReader)
+        assert (await result.read()) == b''
+
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_download_version(self, provider, mock_time):
@@ -732,6 +842,114 @@ class TestMetadata:
         assert aiohttpretty.has_call(method='PUT', uri=url)
         assert aiohttpretty.has_call(method='HEAD', uri=metadata_url)
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_multipart(self, provider, file_content, file_stream, file_metadata, mock_time):
+        path = WaterButlerPath('/foobah')
+        key = provider.bucket.new_key(path.path)
+        parts = [file_content[:4], file_content[4:]]
+        etags = [hashlib.md5(part).hexdigest() for part in parts]
+        combined_etag = '{}-2'.format(hashlib.md5(b''.join(hashlib.md5(part).digest() for part in parts)).hexdigest())
+
+        metadata_url = key.generate_url(100, 'HEAD')
+        aiohttpretty.register_uri(
+            'HEAD',
+            metadata_url,
+            responses=[
+                {'status': 404},
+                {'headers': file_metadata},
+            ],
+        )
+
+        create_url = key.generate_url(100, 'POST', query_parameters={'uploads': ''}, headers={})
+        aiohttpretty.register_uri('POST', create_url, body=multipart_upload_created('someid'))
+
+        part_urls = []
+        for part_number, (part, etag) in enumerate(zip(parts, etags), 1):
+            part_urls.append(key.generate_url(
+                100, 'PUT',
+                query_parameters={'partNumber': str(part_number), 'uploadId': 'someid'},
+                headers=multipart_part_headers(part),
+            ))
+            aiohttpretty.register_uri('PUT', part_urls[-1], headers={'ETag': '"{}"'.format(etag)})
+
+        complete_body = multipart_complete_body(etags)
+        complete_url = key.generate_url(
+            100, 'POST',
+            query_parameters={'uploadId': 'someid'},
+            headers={'Content-Length': str(len(complete_body))},
+        )
+        aiohttpretty.register_uri('POST', complete_url, body=multipart_upload_completed(combined_etag))
+
+        with mock.patch('waterbutler.providers.s3.settings.MULTIPART_THRESHOLD', 5), \
+                mock.patch('waterbutler.providers.s3.settings.MULTIPART_CHUNK_SIZE', 4):
+            metadata, created = await provider.upload(file_stream, path)
+
+        assert metadata.kind == 'file'
+        assert created
+        assert aiohttpretty.has_call(method='POST', uri=create_url)
+        assert aiohttpretty.has_call(method='PUT', uri=part_urls[0])
+        assert aiohttpretty.has_call(method='PUT', uri=part_urls[1])
+        assert aiohttpretty.has_call(method='POST', uri=complete_url)
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_multipart_aborts_on_failure(self, provider, file_content, file_stream, mock_time):
+        path = WaterButlerPath('/foobah')
+        key = provider.bucket.new_key(path.path)
+
+        metadata_url = key.generate_url(100, 'HEAD')
+        aiohttpretty.register_uri('HEAD', metadata_url, status=404)
+
+        create_url = key.generate_url(100, 'POST', query_parameters={'uploads': ''}, headers={})
+        aiohttpretty.register_uri('POST', create_url, body=multipart_upload_created('someid'))
+
+        for part_number, part in enumerate((file_content[:4], file_content[4:]), 1):
+            part_url = key.generate_url(
+                100, 'PUT',
+                query_parameters={'partNumber': str(part_number), 'uploadId': 'someid'},
+                headers=multipart_part_headers(part),
+            )
+            aiohttpretty.register_uri('PUT', part_url, status=500)
+
+        abort_url = key.generate_url(100, 'DELETE', query_parameters={'uploadId': 'someid'})
+        aiohttpretty.register_uri('DELETE', abort_url, status=204)
+
+        with mock.patch('waterbutler.providers.s3.settings.MULTIPART_THRESHOLD', 5), \
+                mock.patch('waterbutler.providers.s3.settings.MULTIPART_CHUNK_SIZE', 4), \
+                mock.patch('waterbutler.providers.s3.settings.MULTIPART_RETRIES', 0):
+            with pytest.raises(exceptions.UploadError):
+                await provider.upload(file_stream, path)
+
+        assert aiohttpretty.has_call(method='DELETE', uri=abort_url)
+
+    @pytest.mark.asyncio
+    async def test_upload_multipart_aborts_after_parts_settle(self, provider, monkeypatch):
+        path = WaterButlerPath('/foobah')
+        events = []
+
+        async def upload_part(path, upload_id, part_number, data):
+            if part_number == 1:
+                await asyncio.sleep(0.01)
+                raise exceptions.UploadError('part failed')
+            try:
+                await asyncio.sleep(10)
+            finally:
+                events.append('part {} settled'.format(part_number))
+
+        async def abort(path, upload_id):
+            events.append('abort')
+
+        monkeypatch.setattr(provider, '_create_multipart_upload', MockCoroutine(return_value='someid'))
+        monkeypatch.setattr(provider, '_upload_part', upload_part)
+        monkeypatch.setattr(provider, '_abort_multipart_upload', abort)
+
+        with mock.patch('waterbutler.providers.s3.settings.MULTIPART_CHUNK_SIZE', 4):
+            with pytest.raises(exceptions.UploadError):
+                await provider._multipart_upload(streams.StringStream(b'12345678'), path)
+
+        assert events == ['part 2 settled', 'abort']
+
 
 class TestCreateFolder:
 
@@ -1,8 +1,13 @@
 import json
+from unittest import mock
 
 from tornado import testing
 
 import waterbutler
+from waterbutler.core import cache
+from waterbutler.core import transfer
+from waterbutler.core import ratelimit
+from waterbutler.tasks import loops
 
 from tests import utils
 
@@ -14,9 +19,42 @@ class TestStatusHandler(utils.HandlerTestCase):
         expected = {
             'status': 'up',
             'version': waterbutler.__version__,
+            'background_loops': loops.pool.stats,
+            'conditional_requests': cache.conditional.stats,
+            'rate_limits': ratelimit.stats(),
+            'folder_transfers': transfer.stats(),
         }
         resp = yield self.http_client.fetch(
             self.get_url('/status'),
         )
         assert resp.code == 200
         assert expected == json.loads(resp.body.decode())
+
+    @testing.gen_test
+    def test_rate_limits(self):
+        bucket = ratelimit.get_bucket('s3', 'https://status.test/', {})
+        bucket.block(1)
+        bucket.reserve()
+
+        resp = yield self.http_client.fetch(
+            self.get_url('/status'),
+        )
+        stats = json.loads(resp.body.decode())['rate_limits']
+
+        assert stats['s3']['requests'] >= 1
+        assert stats['s3']['delayed'] >= 1
+
+    @testing.gen_test
+    def test_folder_transfers(self):
+        job = transfer.FolderTransfer(mock.Mock(__name__='copy'), mock.Mock(), mock.Mock())
+        job.total, job.completed = 10, 4
+        transfer._RUNNING.add(job)
+
+        try:
+            resp = yield self.http_client.fetch(
+                self.get_url('/status'),
+            )
+        finally:
+            transfer._RUNNING.discard(job)
+
+        assert json.loads(resp.body.decode())['folder_transfers'] == [{'total': 10, 'completed': 4, 'retried': 0}]
@@ -28,7 +28,7 @@ class TestValidatePut(BaseCreateMixinTest):
         with pytest.raises(exceptions.InvalidParameters) as e:
             self.mixin.prevalidate_put()
 
-        assert e.value.message == 'Kind must be file, folder or unspecified (interpreted as file), not notaferlder'
+        assert e.value.message == 'Kind must be file, folder, batch or unspecified (interpreted as file), not notaferlder'
 
     def test_default_kind(self):
         self.mixin.path = '/'
@@ -76,6 +76,7 @@ class TestValidatePut(BaseCreateMixinTest):
     @pytest.mark.asyncio
     async def test_name_required_for_dir(self):
         self.mixin.path = WaterButlerPath('/', folder=True)
+        self.mixin.kind = 'file'
         self.mixin.get_query_argument.return_value = None
 
         with pytest.raises(exceptions.InvalidParameters) as e:
@@ -86,6 +87,7 @@ class TestValidatePut(BaseCreateMixinTest):
     @pytest.mark.asyncio
     async def test_name_refused_for_file(self):
         self.mixin.path = WaterButlerPath('/foo.txt', folder=False)
+        self.mixin.kind = 'file'
         self.mixin.get_query_argument.return_value = 'bar.txt'
 
         with pytest.raises(exceptions.InvalidParameters) as e:
@@ -105,6 +107,40 @@ class TestValidatePut(BaseCreateMixinTest):
         assert e.value.message == 'Path must be a folder (and end with a "/") if trying to create a subfolder'
         assert e.value.code == client.CONFLICT
 
+    @pytest.mark.asyncio
+    async def test_batch_into_folder(self):
+        self.mixin.path = WaterButlerPath('/folder/', folder=True)
+        self.mixin.get_query_argument.return_value = None
+        self.mixin.provider = mock.Mock(can_batch_upload=mock.Mock(return_value=True))
+        self.mixin.kind = 'batch'
+
+        await self.mixin.postvalidate_put()
+
+        assert self.mixin.target_path == self.mixin.path
+
+    @pytest.mark.asyncio
+    async def test_batch_must_be_folder(self):
+        self.mixin.path = WaterButlerPath('/foo.txt', folder=False)
+        self.mixin.get_query_argument.return_value = None
+        self.mixin.kind = 'batch'
+
+        with pytest.raises(exceptions.InvalidParameters) as e:
+            await self.mixin.postvalidate_put()
+
+        assert e.value.message == 'Path must be a folder (and end with a "/") for batch uploads'
+
+    @pytest.mark.asyncio
+    async def test_batch_unsupported(self):
+        self.mixin.path = WaterButlerPath('/folder/', folder=True)
+        self.mixin.get_query_argument.return_value = None
+        self.mixin.provider = mock.Mock(can_batch_upload=mock.Mock(return_value=False))
+        self.mixin.kind = 'batch'
+
+        with pytest.raises(exceptions.InvalidParameters) as e:
+            await self.mixin.postvalidate_put()
+
+        assert e.value.code == client.NOT_IMPLEMENTED
+
 
 class TestCreateFolder(BaseCreateMixinTest):
 
@@ -131,8 +167,7 @@ class TestUploadFile(BaseCreateMixinTest):
 
     def setup_method(self, method):
         super().setup_method(method)
-        self.mixin.wsock = mock.Mock()
-        self.mixin.writer = mock.Mock()
+        self.mixin.stream = mock.Mock()
 
     @pytest.mark.asyncio
     async def test_created(self):
@@ -144,8 +179,7 @@ class TestUploadFile(BaseCreateMixinTest):
 
         await self.mixin.upload_file()
 
-        assert self.mixin.wsock.close.called
-        assert self.mixin.writer.close.called
+        assert self.mixin.stream.write_eof.called
         assert self.mixin.set_status.assert_called_once_with(201) is None
         assert self.mixin.write.assert_called_once_with({'data': {'day': 'tum'}}) is None
 
@@ -159,7 +193,6 @@ class TestUploadFile(BaseCreateMixinTest):
 
         await self.mixin.upload_file()
 
-        assert self.mixin.wsock.close.called
-        assert self.mixin.writer.close.called
+        assert self.mixin.stream.write_eof.called
         assert self.mixin.set_status.called is False
         assert self.mixin.write.assert_called_once_with({'data': {'day': 'ta'}}) is None
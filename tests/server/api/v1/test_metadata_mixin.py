@@ -1,6 +1,11 @@
 import pytest
 from unittest import mock
 
+from tests import utils
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+from waterbutler.providers.github import GitHubProvider
+from waterbutler.providers.github.provider import GitHubPath
 from waterbutler.server.api.v1.provider.metadata import MetadataMixin
 
 
@@ -98,6 +103,40 @@ class TestDownloadFile(BaseMetadataMixinTest):
         pass
 
 
+class TestDownloadCachedBlob(BaseMetadataMixinTest):
+
+    def setup_method(self, method):
+        super().setup_method(method)
+        self.mixin.provider = GitHubProvider({'name': 'cat', 'email': 'cat@cat.com'}, {'token': 'naps'}, {'owner': 'cat', 'repo': 'food'})
+        self.mixin.path = GitHubPath('/file.bin', _ids=[('master', None), ('master', None)])
+        self.mixin.set_header = mock.Mock()
+        self.mixin.get_query_argument = mock.Mock(return_value=None)
+        self.mixin.request.headers = {}
+        self.mixin.request.query_arguments = {}
+        self.written = []
+
+        async def write_stream(stream):
+            self.written.append(await stream.read())
+
+        self.mixin.write_stream = write_stream
+
+    def headers(self):
+        return {call[0][0]: call[0][1] for call in self.mixin.set_header.call_args_list}
+
+    @pytest.mark.asyncio
+    async def test_download_file(self, monkeypatch):
+        metadata = mock.Mock(size=7, extra={'fileSha': 'abc123'})
+        monkeypatch.setattr(self.mixin.provider, 'metadata', utils.MockCoroutine(return_value=metadata))
+        monkeypatch.setattr(self.mixin.provider, '_fetch_blob', utils.MockCoroutine(return_value=b'cached!'))
+
+        await self.mixin.download_file()
+
+        self.mixin.provider._fetch_blob.assert_called_once_with('abc123')
+        assert self.headers()['Content-Type'] == 'application/octet-stream'
+        assert self.headers()['Content-Length'] == '7'
+        assert self.written == [b'cached!']
+
+
 @pytest.mark.skipif
 class TestFileMetadata(BaseMetadataMixinTest):
 
@@ -126,3 +165,122 @@ class TestDownloadFolderAsZip(BaseMetadataMixinTest):
 
     def test_return(self):
         pass
+
+
+class TestZipRanges(BaseMetadataMixinTest):
+
+    def setup_method(self, method):
+        super().setup_method(method)
+        self.mixin.path = mock.Mock()
+        self.mixin.path.name = 'folder'
+        self.mixin.provider = mock.Mock()
+        self.mixin.set_header = mock.Mock()
+        self.mixin.write_stream = mock.Mock(side_effect=self._write_stream)
+        self.mixin.get_query_argument = mock.Mock(return_value='store')
+        self.mixin.request.headers = {}
+
+        self.stream = streams.ZipStreamReader(mock.Mock(), size=100)
+        self.stream.select_range = mock.Mock(wraps=self.stream.select_range)
+
+        async def zip(path, policy=None, sized=False):
+            self.policy = policy
+            self.sized = sized
+            return self.stream
+
+        self.mixin.provider.zip = zip
+
+    async def _write_stream(self, stream):
+        pass
+
+    def headers(self):
+        return {call[0][0]: call[0][1] for call in self.mixin.set_header.call_args_list}
+
+    @pytest.mark.asyncio
+    async def test_content_length(self):
+        await self.mixin.download_folder_as_zip()
+
+        assert self.policy.store is True
+        assert self.sized is False
+        assert self.headers()['Content-Length'] == '100'
+        assert self.headers()['Accept-Ranges'] == 'bytes'
+        assert not self.mixin.set_status.called
+
+    @pytest.mark.asyncio
+    async def test_range(self):
+        self.mixin.request.headers = {'Range': 'bytes=10-'}
+
+        await self.mixin.download_folder_as_zip()
+
+        assert self.sized is True
+        self.stream.select_range.assert_called_once_with(10, 100)
+        self.mixin.set_status.assert_called_once_with(206)
+        assert self.headers()['Content-Range'] == 'bytes 10-99/100'
+        assert self.headers()['Content-Length'] == '90'
+
+    @pytest.mark.asyncio
+    async def test_unsatisfiable_range(self):
+        self.mixin.request.headers = {'Range': 'bytes=100-'}
+
+        await self.mixin.download_folder_as_zip()
+
+        self.mixin.set_status.assert_called_once_with(416)
+        assert self.headers()['Content-Range'] == 'bytes */100'
+        assert not self.mixin.write_stream.called
+
+    @pytest.mark.asyncio
+    async def test_unknown_size(self):
+        self.stream.size = None
+        self.mixin.request.headers = {'Range': 'bytes=10-'}
+
+        await self.mixin.download_folder_as_zip()
+
+        assert 'Content-Length' not in self.headers()
+        assert not self.stream.select_range.called
+        assert not self.mixin.set_status.called
+
+    def test_invalid_compression(self):
+        self.mixin.get_query_argument = mock.Mock(return_value='fast')
+
+        with pytest.raises(exceptions.InvalidParameters):
+            self.mixin.zip_policy()
+
+
+class TestTar(BaseMetadataMixinTest):
+
+    def setup_method(self, method):
+        super().setup_method(method)
+        self.mixin.path = mock.Mock()
+        self.mixin.path.name = 'folder'
+        self.mixin.provider = mock.Mock()
+        self.mixin.set_header = mock.Mock()
+        self.mixin.write_stream = utils.MockCoroutine()
+        self.mixin.request.query_arguments = {'tar': [b'']}
+        self.stream = mock.Mock(size=10240)
+        self.mixin.provider.tar = utils.MockCoroutine(return_value=self.stream)
+
+    def headers(self):
+        return {call[0][0]: call[0][1] for call in self.mixin.set_header.call_args_list}
+
+    @pytest.mark.asyncio
+    async def test_plain(self):
+        self.mixin.get_query_argument = mock.Mock(return_value=None)
+
+        await self.mixin.get_folder()
+
+        self.mixin.provider.tar.assert_called_once_with(self.mixin.path, gzip=False, level=0)
+        self.mixin.write_stream.assert_called_once_with(self.stream)
+        assert self.headers()['Content-Type'] == 'application/x-tar'
+        assert self.headers()['Content-Length'] == '10240'
+        assert 'folder.tar' in self.headers()['Content-Disposition']
+
+    @pytest.mark.asyncio
+    async def test_gzip(self):
+        self.mixin.get_query_argument = mock.Mock(return_value='gzip')
+        self.stream.size = None
+
+        await self.mixin.get_folder()
+
+        self.mixin.provider.tar.assert_called_once_with(self.mixin.path, gzip=True, level=-1)
+        assert self.headers()['Content-Type'] == 'application/gzip'
+        assert 'folder.tar.gz' in self.headers()['Content-Disposition']
+        assert 'Content-Length' not in self.headers()
@@ -0,0 +1,113 @@
+import os
+import pickle
+import asyncio
+from unittest import mock
+
+import pytest
+from celery.backends.base import DisabledBackend
+
+from waterbutler import tasks  # noqa
+from waterbutler.tasks import core
+from waterbutler.tasks import notify
+from waterbutler.tasks import exceptions
+
+
+@pytest.fixture(autouse=True)
+def notify_path(monkeypatch, tmpdir):
+    monkeypatch.setattr(notify.settings, 'WAIT_NOTIFY_PATH', str(tmpdir))
+    return str(tmpdir)
+
+
+@pytest.fixture
+def result():
+    return mock.Mock(id='taskid', ready=mock.Mock(return_value=False), failed=mock.Mock(return_value=False))
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """A result backend, as without one results are read from the ad hoc file backend"""
+    backend = mock.Mock()
+    monkeypatch.setattr(core.app, 'backend', backend)
+    return backend
+
+
+async def finish(result, value, delay, notify_waiters=True):
+    await asyncio.sleep(delay)
+    result.ready.return_value = True
+    result.result = value
+    if notify_waiters:
+        notify.notify(result.id)
+
+
+class TestWaitOnCelery:
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures('backend')
+    async def test_wakes_on_notification(self, result):
+        loop = asyncio.get_event_loop()
+        asyncio.ensure_future(finish(result, 'done', 0.05))
+
+        started = loop.time()
+        assert (await core.wait_on_celery(result, interval=10, timeout=20)) == 'done'
+        assert loop.time() - started < 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures('backend')
+    async def test_polls_without_notification(self, result):
+        asyncio.ensure_future(finish(result, 'done', 0.05, notify_waiters=False))
+
+        assert (await core.wait_on_celery(result, interval=0.02, timeout=20)) == 'done'
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures('backend')
+    async def test_raises_task_error(self, result):
+        result.ready.return_value = True
+        result.failed.return_value = True
+        result.result = ValueError('boom')
+
+        with pytest.raises(ValueError):
+            await core.wait_on_celery(result)
+
+    @pytest.mark.asyncio
+    async def test_times_out(self, result):
+        with pytest.raises(exceptions.WaitTimeOutError):
+            await core.wait_on_celery(result, interval=0.02, timeout=0.05)
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures('backend')
+    async def test_cleans_up_socket(self, result, notify_path):
+        result.ready.return_value = True
+        result.result = 'done'
+
+        await core.wait_on_celery(result)
+
+        assert os.listdir(notify_path) == []
+
+    @pytest.mark.asyncio
+    async def test_adhoc_file_backend(self, result, monkeypatch, tmpdir):
+        monkeypatch.setattr(core.app, 'backend', DisabledBackend(core.app))
+
+        async def write_result():
+            await asyncio.sleep(0.05)
+            with open(os.path.join(str(tmpdir), result.id), 'wb') as fp:
+                pickle.dump(('metadata', True), fp)
+            notify.notify(result.id)
+
+        asyncio.ensure_future(write_result())
+
+        assert (await core.wait_on_celery(result, interval=10, basepath=str(tmpdir))) == ('metadata', True)
+
+
+class TestNotify:
+
+    def test_nobody_listening(self):
+        notify.notify('nobody')
+
+    @pytest.mark.asyncio
+    async def test_listener(self):
+        with notify.Listener('taskid') as listener:
+            assert (await listener.wait(0.01)) is False
+
+            notify.notify('taskid')
+
+            assert (await listener.wait(1)) is True
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+import pytest
+
+from waterbutler.tasks import core
+from waterbutler.tasks import loops
+
+
+async def current_loop():
+    return asyncio.get_event_loop(), threading.current_thread()
+
+
+@pytest.fixture
+def pool(request):
+    pool = loops.LoopPool(2)
+    request.addfinalizer(pool.stop)
+    return pool
+
+
+class TestLoopPool:
+
+    def test_loops_are_reused(self, pool):
+        first_loop, first_thread = pool.run(current_loop())
+        second_loop, second_thread = pool.run(current_loop())
+
+        assert first_loop is second_loop
+        assert first_thread is second_thread
+        assert first_thread is not threading.current_thread()
+        assert first_loop.is_running()
+
+    def test_least_busy_loop(self, pool):
+        blocker = threading.Event()
+
+        async def block():
+            await asyncio.get_event_loop().run_in_executor(None, blocker.wait)
+
+        busy = pool.submit(block())
+        loop, _ = pool.run(current_loop())
+
+        # The first loop is still busy
+        assert loop is pool.loops[1].loop
+        assert [stats['pending'] for stats in pool.stats] == [1, 0]
+
+        blocker.set()
+        busy.result()
+        assert sum(stats['completed'] for stats in pool.stats) == 2
+        assert sum(stats['pending'] for stats in pool.stats) == 0
+
+    def test_run_from_own_loop(self, pool):
+        async def nested():
+            pool.run(current_loop())
+
+        with pytest.raises(RuntimeError):
+            pool.run(nested())
+
+    def test_raises(self, pool):
+        async def fail():
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            pool.run(fail())
+
+
+class TestBackgrounded:
+
+    @pytest.mark.asyncio
+    async def test_coroutines_run_on_background_loop(self, monkeypatch, pool):
+        monkeypatch.setattr(loops, 'pool', pool)
+
+        loop, thread = await core.backgrounded(current_loop)
+
+        assert loop is not asyncio.get_event_loop()
+        assert loop is pool.loops[0].loop or loop is pool.loops[1].loop
+
+    @pytest.mark.asyncio
+    async def test_functions_run_in_executor(self):
+        assert (await core.backgrounded(threading.current_thread)) is not threading.current_thread()
@@ -1,3 +1,8 @@
+import copy
+import json
+import time
+import asyncio
+import hashlib
 import datetime
 
 import jwe
@@ -5,13 +10,19 @@ import jwt
 import aiohttp
 
 from waterbutler.core import auth
+from waterbutler.core import cache
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 
 from waterbutler.auth.osf import settings
 
 
 JWE_KEY = jwe.kdf(settings.JWE_SECRET.encode(), settings.JWE_SALT.encode())
 
+# Shared by every handler instance in the process
+_CACHE = cache.MemoryBackend(settings.CACHE_MAX_ENTRIES)
+_IN_FLIGHT = {}
+
 
 class OsfAuthHandler(auth.BaseAuthHandler):
     """Identity lookup via the Open Science Framework"""
@@ -41,8 +52,13 @@ class OsfAuthHandler(auth.BaseAuthHandler):
         return query_params
 
     async def make_request(self, params, headers, cookies):
+        data, _ = await self._request(params, headers, cookies)
+        return data
+
+    async def _request(self, params, headers, cookies):
+        """Ask the OSF for credentials, returning them along with the expiry of their JWT"""
         try:
-            response = await aiohttp.request(
+            response = await connections.request(
                 'get',
                 settings.API_URL,
                 params=params,
@@ -63,10 +79,57 @@ class OsfAuthHandler(auth.BaseAuthHandler):
             raw = await response.json()
             signed_jwt = jwe.decrypt(raw['payload'].encode(), JWE_KEY)
             data = jwt.decode(signed_jwt, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM, options={'require_exp': True})
-            return data['data']
+            return data['data'], data['exp']
         except (jwt.InvalidTokenError, KeyError):
             raise exceptions.AuthError(data, code=response.status)
 
+    def cache_key(self, bundle, cookie, view_only, headers, cookies):
+        """Identifies an auth lookup by everything the OSF's answer depends on.  The caller's
+        credentials are kept as a digest, never as is.
+        """
+        identity = hashlib.sha256(json.dumps([
+            headers.get('Authorization'),
+            cookie,
+            sorted((name, getattr(value, 'value', value)) for name, value in cookies.items()),
+        ]).encode('utf-8')).hexdigest()
+
+        return (json.dumps(bundle, sort_keys=True, default=str), view_only, identity)
+
+    async def cached_request(self, key, build_params, headers, cookies):
+        """Like :meth:`make_request`, but answered from a short lived cache when
+        ``settings.CACHE_TTL`` is set.  Concurrent lookups for the same key share a single
+        request to the OSF.
+
+        :param tuple key: From :meth:`cache_key`
+        :param callable build_params: Builds the query parameters, only called on a miss
+        """
+        if settings.CACHE_TTL <= 0:
+            return (await self.make_request(build_params(), headers, cookies))
+
+        try:
+            return copy.deepcopy(_CACHE.get('osf', key))
+        except KeyError:
+            pass
+
+        flight_key = (asyncio.get_event_loop(), key)
+        flight = _IN_FLIGHT.get(flight_key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._fill_cache(key, build_params(), headers, cookies))
+            _IN_FLIGHT[flight_key] = flight
+            flight.add_done_callback(lambda _: _IN_FLIGHT.pop(flight_key, None))
+
+        # One caller going away mustn't cancel the lookup for the others
+        return copy.deepcopy(await asyncio.shield(flight))
+
+    async def _fill_cache(self, key, params, headers, cookies):
+        data, expires = await self._request(params, headers, cookies)
+
+        ttl = min(settings.CACHE_TTL, expires - time.time())
+        if ttl > 0:
+            _CACHE.set('osf', key, data, ttl)
+
+        return data
+
     async def fetch(self, request, bundle):
         """Used for v0"""
         headers = {'Content-Type': 'application/json'}
@@ -82,10 +145,12 @@ class OsfAuthHandler(auth.BaseAuthHandler):
         if view_only:
             view_only = view_only[0].decode()
 
-        payload = (await self.make_request(
-            self.build_payload(bundle, cookie=cookie, view_only=view_only),
+        cookies = dict(request.cookies)
+        payload = (await self.cached_request(
+            self.cache_key(bundle, cookie, view_only, headers, cookies),
+            lambda: self.build_payload(bundle, cookie=cookie, view_only=view_only),
             headers,
-            dict(request.cookies)
+            cookies
         ))
 
         payload['auth']['callback_url'] = payload['callback_url']
@@ -107,14 +172,17 @@ class OsfAuthHandler(auth.BaseAuthHandler):
             # View only must go outside of the jwt
             view_only = view_only[0].decode()
 
-        payload = (await self.make_request(
-            self.build_payload({
-                'nid': resource,
-                'provider': provider,
-                'action': self.ACTION_MAP[request.method.lower()]
-            }, cookie=cookie, view_only=view_only),
+        bundle = {
+            'nid': resource,
+            'provider': provider,
+            'action': self.ACTION_MAP[request.method.lower()]
+        }
+        cookies = dict(request.cookies)
+        payload = (await self.cached_request(
+            self.cache_key(bundle, cookie, view_only, headers, cookies),
+            lambda: self.build_payload(bundle, cookie=cookie, view_only=view_only),
             headers,
-            dict(request.cookies)
+            cookies
         ))
 
         payload['auth']['callback_url'] = payload['callback_url']
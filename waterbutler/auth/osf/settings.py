@@ -9,6 +9,11 @@ JWT_EXPIRATION = config.get('JWT_EXPIRATION', 15)
 JWT_ALGORITHM = config.get('JWT_ALGORITHM', 'HS256')
 API_URL = config.get('API_URL', 'http://localhost:5000/api/v1/files/auth/')
 
+# Successful auth responses may be reused for this many seconds, never past the expiry of the
+# response's JWT.  Disabled by default, as revoked permissions aren't seen until entries expire.
+CACHE_TTL = config.get('CACHE_TTL', 0)
+CACHE_MAX_ENTRIES = config.get('CACHE_MAX_ENTRIES', 10000)
+
 JWE_SALT = config.get('JWE_SALT')
 JWE_SECRET = config.get('JWE_SECRET')
 JWT_SECRET = config.get('JWT_SECRET')
@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import collections
+
+from waterbutler import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """An in-process LRU cache whose entries expire after a TTL.  Entries are grouped into
+    namespaces, one per provider, credentials, and settings, and a whole namespace can be
+    invalidated at once.
+
+    This is the default process-wide backend.  A shared backend, such as Redis with one hash per
+    namespace, only needs to provide the same ``get``, ``set``, and ``invalidate`` methods.
+
+    Copies and moves may run on a background thread's event loop, so access is locked.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._namespaces = collections.defaultdict(set)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, namespace, key):
+        """Returns the cached value, or raises ``KeyError`` if it is missing or has expired"""
+        with self._lock:
+            value, expires = self._entries[(namespace, key)]
+
+            if expires < time.monotonic():
+                self._remove((namespace, key))
+                raise KeyError(key)
+
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace, key, value, ttl):
+        with self._lock:
+            self._entries[(namespace, key)] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end((namespace, key))
+            self._namespaces[namespace].add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, namespace):
+        with self._lock:
+            for key in self._namespaces.pop(namespace, ()):
+                self._entries.pop((namespace, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def _remove(self, entry):
+        namespace, key = entry
+        del self._entries[entry]
+
+        keys = self._namespaces.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[namespace]
+
+
+_SHARED = MemoryBackend(settings.METADATA_CACHE_MAX_ENTRIES)
+
+
+class ObjectCache:
+    """An in-process LRU cache of values that never change once written, such as git objects
+    keyed by their sha.  Values are bytes, and the cache is bounded by their total size rather
+    than their number.  There is no TTL and no invalidation.
+
+    Values pushed out of memory are spilled to files in ``spill_path``, when given, themselves
+    bounded by ``spill_max_size``, and read back from there on a miss.  Disk access happens in
+    the default executor.
+
+    :param int max_size: Bytes to hold in memory, values larger than this aren't cached
+    :param str spill_path: A directory to spill to, None to keep everything in memory
+    :param int spill_max_size: Bytes to hold on disk
+    """
+
+    def __init__(self, max_size, spill_path=None, spill_max_size=0):
+        self.max_size = max_size
+        self.spill_path = spill_path
+        self.spill_max_size = spill_max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()
+        self._memory_size = 0
+        self._spilled = collections.OrderedDict()
+        self._spilled_size = 0
+
+    def __len__(self):
+        return len(self._memory) + len(self._spilled)
+
+    async def get(self, key):
+        """Returns the cached value, or raises ``KeyError``"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+            spilled = key in self._spilled
+
+        if spilled:
+            try:
+                value = await asyncio.get_event_loop().run_in_executor(None, self._read_spilled, key)
+            except OSError:
+                with self._lock:
+                    self._forget_spilled(key)
+            else:
+                await self.set(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        raise KeyError(key)
+
+    async def set(self, key, value):
+        if len(value) > self.max_size:
+            return
+
+        with self._lock:
+            self._forget_spilled(key)
+            if key in self._memory:
+                self._memory_size -= len(self._memory.pop(key))
+            self._memory[key] = value
+            self._memory_size += len(value)
+
+            evicted = []
+            while self._memory_size > self.max_size:
+                old_key, old_value = self._memory.popitem(last=False)
+                self._memory_size -= len(old_value)
+                evicted.append((old_key, old_value))
+
+        if self.spill_path is not None and evicted:
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self._spill, evicted)
+            except OSError as e:
+                logger.warning('Could not spill cached objects to {}: {}'.format(self.spill_path, e))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._spilled):
+                self._forget_spilled(key)
+            self._memory.clear()
+            self._memory_size = 0
+
+    def _filename(self, key):
+        return os.path.join(self.spill_path, hashlib.sha256(repr(key).encode('utf-8')).hexdigest())
+
+    def _read_spilled(self, key):
+        with open(self._filename(key), 'rb') as fp:
+            return fp.read()
+
+    def _spill(self, entries):
+        os.makedirs(self.spill_path, exist_ok=True)
+        for key, value in entries:
+            if len(value) > self.spill_max_size:
+                continue
+
+            # Written aside then renamed, so a concurrent read never sees half a value
+            filename = self._filename(key)
+            with open(filename + '.tmp', 'wb') as fp:
+                fp.write(value)
+            os.replace(filename + '.tmp', filename)
+
+            with self._lock:
+                self._forget_spilled(key)
+                self._spilled[key] = len(value)
+                self._spilled_size += len(value)
+                while self._spilled_size > self.spill_max_size:
+                    self._forget_spilled(next(iter(self._spilled)))
+
+    def _forget_spilled(self, key):
+        size = self._spilled.pop(key, None)
+        if size is None:
+            return
+
+        self._spilled_size -= size
+        try:
+            os.remove(self._filename(key))
+        except OSError:
+            pass
+
+
+class CachedResponse:
+    """Stands in for a ``304 Not Modified`` response, with the status and body of the response
+    it revalidated.  The headers are those of the 304.
+    """
+
+    def __init__(self, method, url, status, headers, body):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self._content = body
+
+    async def read(self):
+        return self._content
+
+    async def text(self, encoding='utf-8'):
+        return self._content.decode(encoding)
+
+    async def json(self, *, loads=json.loads):
+        return loads(self._content.decode('utf-8'))
+
+    async def release(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConditionalCache:
+    """Remembers the validators, ``ETag`` or ``Last-Modified``, and the body of successful
+    responses, so that the same request can be made conditionally next time.  A ``304 Not
+    Modified`` is then answered with the remembered body, see :func:`BaseProvider.make_request`.
+    APIs such as GitHub's don't count a 304 against the rate limit.
+
+    Entries are namespaced by provider, credentials, and settings, as the same url may return
+    something different to someone else.
+
+    :param int max_entries: The number of responses to remember
+    :param int max_body_size: Responses with larger bodies aren't remembered
+    """
+
+    def __init__(self, max_entries, max_body_size):
+        self.backend = MemoryBackend(max_entries)
+        self.max_body_size = max_body_size
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(method, url, params=None, headers=None):
+        """Requests for the same url may differ by their query or the representation asked for"""
+        accept = (headers or {}).get('Accept')
+        return (method, url, json.dumps(params, sort_keys=True, default=str), accept)
+
+    def lookup(self, namespace, key):
+        """The remembered ``(validators, status, body)``, or None
+
+        :rtype: tuple or None
+        """
+        if settings.CONDITIONAL_CACHE_TTL <= 0:
+            return None
+        try:
+            return self.backend.get(namespace, key)
+        except KeyError:
+            return None
+
+    @staticmethod
+    def validators(entry):
+        """The headers to make a request conditional on the remembered response"""
+        return entry[0]
+
+    async def revalidated(self, namespace, key, response, entry):
+        """Returns the response to give to the caller: a :class:`CachedResponse` if ``response``
+        is a 304 for ``entry``, otherwise ``response`` itself, after remembering it if it can be.
+        """
+        if response.status == 304 and entry is not None:
+            await response.release()
+            self.hits += 1
+            _, status, body = entry
+            return CachedResponse(key[0], key[1], status, response.headers, body)
+
+        if response.status != 200 or settings.CONDITIONAL_CACHE_TTL <= 0:
+            return response
+
+        self.misses += 1
+
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        elif response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        if not validators:
+            return response
+
+        length = response.headers.get('Content-Length')
+        if length is not None and int(length) > self.max_body_size:
+            return response
+
+        # The body is kept by the response, later reads by the caller return it
+        body = await response.read()
+        if len(body) <= self.max_body_size:
+            self.backend.set(namespace, key, (validators, response.status, body), settings.CONDITIONAL_CACHE_TTL)
+
+        return response
+
+    @property
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else None,
+        }
+
+
+conditional = ConditionalCache(settings.CONDITIONAL_CACHE_MAX_ENTRIES, settings.CONDITIONAL_CACHE_MAX_BODY_SIZE)
+
+
+class NotFound:
+    """Cached in place of metadata for paths that are known not to exist"""
+
+
+class MetadataCache:
+    """Caches the results of a provider's ``metadata`` calls in two tiers.  The request tier
+    belongs to a single provider instance, and so lives for the duration of one request or task.
+    The process-wide tier is shared by every provider instance with the same name, credentials,
+    and settings.
+
+    Either tier is disabled by setting its TTL to 0.  The process-wide tier is disabled by default,
+    as writes made by other processes, or made directly against the provider, can't invalidate it.
+
+    :param str name: The provider's NAME
+    :param dict credentials: The provider's credentials
+    :param dict settings: The provider's settings
+    """
+
+    def __init__(self, name, credentials, provider_settings):
+        self.namespace = (name, namespace_digest(credentials, provider_settings))
+        self.local = MemoryBackend(settings.METADATA_CACHE_MAX_ENTRIES)
+        self.shared = _SHARED
+
+        self.hits = 0
+        self.misses = 0
+
+    def _tiers(self):
+        if settings.METADATA_CACHE_REQUEST_TTL > 0:
+            yield self.local, settings.METADATA_CACHE_REQUEST_TTL
+        if settings.METADATA_CACHE_TTL > 0:
+            yield self.shared, settings.METADATA_CACHE_TTL
+
+    def get(self, key):
+        """Returns the cached value for ``key``, or raises ``KeyError``"""
+        for tier, _ in self._tiers():
+            try:
+                value = tier.get(self.namespace, key)
+            except KeyError:
+                continue
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        raise KeyError(key)
+
+    def set(self, key, value):
+        for tier, ttl in self._tiers():
+            tier.set(self.namespace, key, value, ttl)
+
+    def invalidate(self):
+        """Forget everything cached for this provider, credentials, and settings"""
+        self.local.invalidate(self.namespace)
+        self.shared.invalidate(self.namespace)
+
+
+def namespace_digest(credentials, provider_settings):
+    return hashlib.sha256(
+        json.dumps([credentials, provider_settings], sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def path_key(path, revision=None):
+    """Identifies a path by its id, for id-based providers, and by its full materialized path"""
+    return (getattr(path, 'identifier', None), str(path), revision)
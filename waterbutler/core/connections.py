@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import weakref
+
+import aiohttp
+
+from waterbutler import settings
+
+
+logger = logging.getLogger(__name__)
+_CONNECTORS = weakref.WeakKeyDictionary()
+
+
+def get_connector(loop=None):
+    """Returns the shared :class:`aiohttp.TCPConnector` for the given event loop, creating it if
+    necessary.  The connector keeps a pool of keep-alive connections per (host, port, ssl) triple
+    so that successive requests to the same provider don't pay for a new TCP and TLS handshake.
+
+    Connectors are bound to the loop they were created on, so a registry is kept per loop.
+
+    :param loop: The event loop to fetch a connector for.  Defaults to the current loop.
+    :rtype: :class:`aiohttp.TCPConnector`
+    """
+    loop = loop or asyncio.get_event_loop()
+
+    connector = _CONNECTORS.get(loop)
+    if connector is None or connector.closed:
+        connector = aiohttp.TCPConnector(
+            limit=settings.CONNECTION_LIMIT_PER_HOST,
+            keepalive_timeout=settings.CONNECTION_KEEPALIVE_TIMEOUT,
+            use_dns_cache=settings.CONNECTION_USE_DNS_CACHE,
+            loop=loop,
+        )
+        _CONNECTORS[loop] = connector
+
+    return connector
+
+
+async def request(method, url, *args, **kwargs):
+    """A drop in replacement for :func:`aiohttp.request` that sends the request over the shared,
+    pooled connector for the current event loop.
+
+    :param str method: The HTTP method
+    :param str url: The url to send the request to
+    :param tuple \*args: args passed to :func:`aiohttp.request`
+    :param dict \*\*kwargs: kwargs passed to :func:`aiohttp.request`
+    :rtype: :class:`aiohttp.ClientResponse`
+    """
+    kwargs.setdefault('connector', get_connector(kwargs.get('loop')))
+    return (await aiohttp.request(method, url, *args, **kwargs))
+
+
+def close_connectors():
+    """Close every pooled connector and all of their open transports.  Called on server and
+    worker shutdown.
+    """
+    for loop, connector in list(_CONNECTORS.items()):
+        logger.debug('Closing connector {!r} for loop {!r}'.format(connector, loop))
+        connector.close()
+    _CONNECTORS.clear()
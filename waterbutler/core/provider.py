@@ -1,49 +1,21 @@
 import abc
-import time
 import asyncio
 import logging
-import weakref
-import functools
 import itertools
 from urllib import parse
 
 import furl
-import aiohttp
 
-from waterbutler import settings
+from waterbutler.core import cache
 from waterbutler.core import streams
+from waterbutler.core import transfer
+from waterbutler.core import ratelimit
+from waterbutler.core import connections
 from waterbutler.core import exceptions
 from waterbutler.core.utils import ZipStreamGenerator
 from waterbutler.core.utils import RequestHandlerContext
 
 logger = logging.getLogger(__name__)
-_THROTTLES = weakref.WeakKeyDictionary()
-
-
-def throttle(concurrency=10, interval=1):
-    def _throttle(func):
-        @functools.wraps(func)
-        async def wrapped(*args, **kwargs):
-            if asyncio.get_event_loop() not in _THROTTLES:
-                count, last_call, event = 0, time.time(), asyncio.Event()
-                _THROTTLES[asyncio.get_event_loop()] = (count, last_call, event)
-                event.set()
-            else:
-                count, last_call, event = _THROTTLES[asyncio.get_event_loop()]
-
-            await event.wait()
-            count += 1
-            if count > concurrency:
-                count = 0
-                if (time.time() - last_call) < interval:
-                    event.clear()
-                    await asyncio.sleep(interval - (time.time() - last_call))
-                    event.set()
-
-            last_call = time.time()
-            return (await func(*args, **kwargs))
-        return wrapped
-    return _throttle
 
 
 def build_url(base, *segments, **query):
@@ -137,9 +109,11 @@ class BaseProvider(metaclass=abc.ABCMeta):
             if value is not None
         }
 
-    @throttle()
     async def make_request(self, method, url, *args, **kwargs):
-        """A wrapper around :func:`aiohttp.request`. Inserts default headers.
+        """A wrapper around :func:`aiohttp.request`. Inserts default headers and sends the request
+        over the shared connection pool, see :func:`waterbutler.core.connections.request`.
+        Requests are rate limited per provider, host, and credentials, see
+        :func:`waterbutler.core.ratelimit.get_bucket`.
 
         :param str method: The HTTP method
         :param str url: The url to send the request to
@@ -148,6 +122,9 @@ class BaseProvider(metaclass=abc.ABCMeta):
             if the returned status code is not in it.
         :type expects: tuple of ints
         :param Exception throws: The exception to be raised from expects
+        :keyword bool conditional: Make a GET conditional on the validators of the last response
+            to it, and answer a ``304 Not Modified`` with that response's body, see
+            :class:`waterbutler.core.cache.ConditionalCache`
         :param tuple \*args: args passed to :func:`aiohttp.request`
         :param dict \*\*kwargs: kwargs passed to :func:`aiohttp.request`
         :rtype: :class:`aiohttp.Response`
@@ -158,14 +135,27 @@ class BaseProvider(metaclass=abc.ABCMeta):
         range = kwargs.pop('range', None)
         expects = kwargs.pop('expects', None)
         throws = kwargs.pop('throws', exceptions.ProviderError)
+        conditional = kwargs.pop('conditional', False) and method == 'GET' and not range
         if range:
             kwargs['headers']['Range'] = self._build_range_header(range)
 
         if callable(url):
             url = url()
+
+        if conditional:
+            key = cache.conditional.key(method, url, kwargs.get('params'), kwargs['headers'])
+            entry = cache.conditional.lookup(self.metadata_cache.namespace, key)
+            if entry is not None:
+                kwargs['headers'].update(cache.conditional.validators(entry))
+
+        bucket = ratelimit.get_bucket(self.NAME, url, self.credentials)
         while retry >= 0:
+            await bucket.acquire()
             try:
-                response = await aiohttp.request(method, url, *args, **kwargs)
+                response = await connections.request(method, url, *args, **kwargs)
+                bucket.update(response.headers)
+                if conditional:
+                    response = await cache.conditional.revalidated(self.metadata_cache.namespace, key, response, entry)
                 if expects and response.status not in expects:
                     raise (await exceptions.exception_from_response(response, error=throws, **kwargs))
                 return response
@@ -202,15 +192,19 @@ class BaseProvider(metaclass=abc.ABCMeta):
             args = (dest_provider, src_path, dest_path)
             kwargs = {}
 
-        if self.can_intra_move(dest_provider, src_path):
-            return (await self.intra_move(*args))
+        try:
+            if self.can_intra_move(dest_provider, src_path):
+                return (await self.intra_move(*args))
 
-        if src_path.is_dir:
-            metadata, created = await self._folder_file_op(self.move, *args, **kwargs)
-        else:
-            metadata, created = await self.copy(*args, handle_naming=False, **kwargs)
+            if src_path.is_dir:
+                metadata, created = await self._folder_file_op(self.move, *args, **kwargs)
+            else:
+                metadata, created = await self.copy(*args, handle_naming=False, **kwargs)
 
-        await self.delete(src_path)
+            await self.delete(src_path)
+        finally:
+            self.invalidate_metadata()
+            dest_provider.invalidate_metadata()
 
         return metadata, created
 
@@ -228,28 +222,39 @@ class BaseProvider(metaclass=abc.ABCMeta):
             args = (dest_provider, src_path, dest_path)
             kwargs = {}
 
-        if self.can_intra_copy(dest_provider, src_path):
-                return (await self.intra_copy(*args))
+        try:
+            if self.can_intra_copy(dest_provider, src_path):
+                    return (await self.intra_copy(*args))
 
-        if src_path.is_dir:
-            return (await self._folder_file_op(self.copy, *args, **kwargs))
+            if src_path.is_dir:
+                return (await self._folder_file_op(self.copy, *args, **kwargs))
 
-        download_stream = await self.download(src_path)
+            # Providers that support it may fetch large files over several connections at once
+            download_stream = await self.download(src_path, parallel=True)
 
-        if getattr(download_stream, 'name', None):
-            dest_path.rename(download_stream.name)
+            if getattr(download_stream, 'name', None):
+                dest_path.rename(download_stream.name)
 
-        return (await dest_provider.upload(download_stream, dest_path))
+            try:
+                return (await dest_provider.upload(download_stream, dest_path))
+            except Exception:
+                # Stop whatever the source stream still has in flight
+                if hasattr(download_stream, 'close'):
+                    download_stream.close()
+                raise
+        finally:
+            dest_provider.invalidate_metadata()
 
     async def _folder_file_op(self, func, dest_provider, src_path, dest_path, **kwargs):
-        """Recursively apply func to src/dest path.
+        """Recursively apply func to src/dest path.  The tree is walked by a
+        :class:`waterbutler.core.transfer.FolderTransfer`, which shares a single concurrency budget
+        across every nested folder.
 
         Called from: func: copy and move if src_path.is_dir.
 
         Calls: func: dest_provider.delete and notes result for bool: created
-               func: dest_provider.create_folder
-               func: dest_provider.revalidate_path
-               func: self.metadata
+               func: transfer.FolderTransfer.run
+               func: dest_provider.upload_batch, instead of the above, if it can batch upload
 
         :param coroutine func: to be applied to src/dest path
         :param *Provider dest_provider: Destination provider
@@ -267,36 +272,12 @@ class BaseProvider(metaclass=abc.ABCMeta):
                 raise
             created = True
 
-        folder = await dest_provider.create_folder(dest_path, folder_precheck=False)
-
-        dest_path = await dest_provider.revalidate_path(dest_path.parent, dest_path.name, folder=dest_path.is_dir)
-
-        folder.children = []
-        items = await self.metadata(src_path)
-
-        for i in range(0, len(items), settings.OP_CONCURRENCY):
-            futures = []
-            for item in items[i:i + settings.OP_CONCURRENCY]:
-                futures.append(asyncio.ensure_future(
-                    func(
-                        dest_provider,
-                        # TODO figure out a way to cut down on all the requests made here
-                        (await self.revalidate_path(src_path, item.name, folder=item.is_folder)),
-                        (await dest_provider.revalidate_path(dest_path, item.name, folder=item.is_folder)),
-                        handle_naming=False,
-                    )
-                ))
-
-                if item.is_folder:
-                    await futures[-1]
-
-            if not futures:
-                continue
-
-            done, _ = await asyncio.wait(futures, return_when=asyncio.FIRST_EXCEPTION)
-
-            for fut in done:
-                folder.children.append(fut.result()[0])
+        if dest_provider.can_batch_upload():
+            # Everything in one go, with downloads opened ahead as for a zip
+            items = await self.cached_metadata(src_path)
+            folder, _ = await dest_provider.upload_batch(ZipStreamGenerator(self, src_path, *items), dest_path)
+        else:
+            folder = await transfer.FolderTransfer(func, self, dest_provider).run(src_path, dest_path)
 
         return folder, created
 
@@ -356,6 +337,28 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         return False
 
+    def can_batch_upload(self):
+        """Indicates if many files can be written at once with :func:`BaseProvider.upload_batch`.
+
+        .. note::
+            Defaults to False
+
+        :rtype: bool
+        """
+        return False
+
+    async def upload_batch(self, files, path, **kwargs):
+        """Uploads many files into the folder ``path`` as one operation.  Only implemented by
+        providers whose :func:`BaseProvider.can_batch_upload` returns True.  Used to copy folders
+        to them, and by batch uploads to the v1 API.
+
+        :param files: An async iterator of ``(name, stream)`` pairs, or ``(name, stream,
+            metadata)`` triples, ``name`` being relative to ``path`` and possibly nested
+        :param WaterButlerPath path: The folder to upload into
+        :rtype: (:class:`waterbutler.core.metadata.BaseFolderMetadata`, bool created)
+        """
+        raise exceptions.UploadError('{} does not support batch uploads'.format(self.NAME), code=501)
+
     def intra_copy(self, dest_provider, source_options, dest_options):
         raise NotImplementedError
 
@@ -375,7 +378,7 @@ class BaseProvider(metaclass=abc.ABCMeta):
         :rtype: (`self.metadata()` or False)
         """
         try:
-            return (await self.metadata(path, **kwargs))
+            return (await self.cached_metadata(path, **kwargs))
         except exceptions.NotFoundError:
             return False
         except exceptions.MetadataError as e:
@@ -383,6 +386,50 @@ class BaseProvider(metaclass=abc.ABCMeta):
                 raise
         return False
 
+    @property
+    def metadata_cache(self):
+        if not hasattr(self, '_metadata_cache'):
+            self._metadata_cache = cache.MetadataCache(self.NAME, self.credentials, self.settings)
+        return self._metadata_cache
+
+    async def cached_metadata(self, path, revision=None, **kwargs):
+        """Like :func:`BaseProvider.metadata`, but answered from :attr:`metadata_cache` where
+        possible.  Paths that don't exist are cached as well.  Calls with extra keyword arguments
+        bypass the cache, as they may change what is returned.
+
+        :param WaterButlerPath path: The path to get metadata for
+        :param str revision: An optional revision
+        :rtype: :class:`waterbutler.core.metadata.BaseMetadata` or :class:`list`
+        :raises: :class:`waterbutler.core.exceptions.MetadataError`
+        """
+        if revision is not None:
+            kwargs['revision'] = revision
+
+        if set(kwargs) - {'revision'}:
+            return (await self.metadata(path, **kwargs))
+
+        key = cache.path_key(path, revision)
+        try:
+            value = self.metadata_cache.get(key)
+        except KeyError:
+            try:
+                value = await self.metadata(path, **kwargs)
+            except exceptions.ProviderError as e:
+                if e.code != 404:
+                    raise
+                value = cache.NotFound
+            self.metadata_cache.set(key, value)
+
+        if value is cache.NotFound:
+            raise exceptions.NotFoundError(str(path))
+
+        # Folder listings are lists, don't let callers modify the cached copy
+        return list(value) if isinstance(value, list) else value
+
+    def invalidate_metadata(self):
+        """Forget all cached metadata for this provider, called after anything is written to it"""
+        self.metadata_cache.invalidate()
+
     async def handle_name_conflict(self, path, conflict='replace', **kwargs):
         """Check WaterButlerPath and resolve conflicts
 
@@ -425,10 +472,55 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         return base.child(path, folder=folder)
 
-    async def zip(self, path, **kwargs):
-        """Streams a Zip archive of the given folder
+    async def revalidate_paths(self, base, children):
+        """Revalidate many children of the same base folder at once.  Equivalent to calling
+        :meth:`revalidate_path` for each child, which is what this default does.  Id-based
+        providers that look children up by listing `base` should override this to resolve every
+        child from a single listing.
+
+        :param WaterButlerPath base: The base folder to look under
+        :param children: An iterable of ``(path, folder)`` pairs, as for :meth:`revalidate_path`
+        :rtype: list of WaterButlerPath, in the same order as ``children``
+        """
+        paths = []
+        for path, folder in children:
+            paths.append(await self.revalidate_path(base, path, folder=folder))
+        return paths
+
+    async def zip(self, path, policy=None, sized=False, **kwargs):
+        """Streams a Zip archive of the given folder.  Folders are listed as the archive streams,
+        unless the policy stores every file or ``sized`` is given, in which case the whole folder
+        is listed before anything is streamed.  If every file in it is to be stored uncompressed
+        and its size is known, so is the length of the archive, as the stream's ``size``.
 
         :param str path: The folder to compress
+        :param ZipCompressionPolicy policy: How to compress each file, defaults to the settings
+        :param bool sized: Work out the length of the archive if it can be known, even though
+            the policy deflates some files, e.g. to answer a range request
+        """
+
+        metadata = await self.metadata(path)
+        if path.is_file:
+            metadata = [metadata]
+            path = path.parent
+
+        policy = policy or streams.ZipCompressionPolicy()
+        generator = ZipStreamGenerator(self, path, *metadata)
+
+        size = None
+        if policy.store or sized:
+            size = policy.archive_size(await generator.walk())
+
+        return streams.ZipStreamReader(generator, policy=policy, size=size)
+
+    async def tar(self, path, gzip=False, level=None, **kwargs):
+        """Streams a tar archive of the given folder.  A plain tar is listed in full before
+        anything is streamed, so that the length of the archive is known as the stream's
+        ``size``, unless the provider doesn't report the size of every file.
+
+        :param str path: The folder to archive
+        :param bool gzip: Gzip the archive, which makes its length unknown
+        :param int level: The gzip compression level
         """
 
         metadata = await self.metadata(path)
@@ -436,7 +528,13 @@ class BaseProvider(metaclass=abc.ABCMeta):
             metadata = [metadata]
             path = path.parent
 
-        return streams.ZipStreamReader(ZipStreamGenerator(self, path, *metadata))
+        generator = ZipStreamGenerator(self, path, *metadata)
+
+        size = None
+        if not gzip:
+            size = streams.TarStreamReader.archive_size(await generator.walk())
+
+        return streams.TarStreamReader(generator, size=size, gzip=gzip, level=level)
 
     @abc.abstractmethod
     def can_duplicate_names(self):
@@ -0,0 +1,177 @@
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import collections
+from urllib import parse
+from email.utils import parsedate_to_datetime
+
+from waterbutler import settings
+
+
+logger = logging.getLogger(__name__)
+# Shared by every thread running an event loop, see waterbutler.tasks.loops
+_BUCKETS = collections.OrderedDict()
+_BUCKETS_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """A token bucket rate limiter.  Tokens are refilled at ``rate`` per second up to ``burst``
+    and every request consumes one.  Requests that find the bucket empty reserve a future token
+    and sleep until it becomes available, so callers are served in the order they arrived.
+
+    The bucket can also be blocked outright until a given time, which is how ``Retry-After`` and
+    exhausted ``X-RateLimit-Remaining`` responses from the remote host are honoured.
+
+    A bucket may be shared by several threads, each running its own event loop.  Its state is
+    guarded by a lock and holds nothing tied to a loop, callers sleep on their own.
+    """
+
+    def __init__(self, rate, burst, max_delay=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_delay = max_delay
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self._lock = threading.Lock()
+
+        # Queueing delay counters
+        self.requests = 0
+        self.delayed = 0
+        self.total_delay = 0.0
+        self.max_observed_delay = 0.0
+
+    def reserve(self):
+        """Take a token from the bucket, returning how many seconds the caller must wait before
+        it may be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+
+            delay = max(0, -self.tokens / self.rate, self.blocked_until - now)
+            if self.max_delay is not None:
+                delay = min(delay, self.max_delay)
+
+            self.requests += 1
+            if delay > 0:
+                self.delayed += 1
+                self.total_delay += delay
+                self.max_observed_delay = max(self.max_observed_delay, delay)
+
+        return delay
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def block(self, seconds):
+        """Refuse to hand out tokens for the next ``seconds`` seconds"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update(self, headers):
+        """Honour rate limiting hints sent back by the remote host
+
+        :param headers: The response headers, a case insensitive mapping
+        """
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            seconds = parse_retry_after(retry_after)
+            if seconds:
+                logger.info('Remote host requested a backoff of {} seconds'.format(seconds))
+                self.block(seconds)
+
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        try:
+            if remaining is not None and int(remaining) <= 0 and reset is not None:
+                seconds = int(reset) - time.time()
+                if seconds > 0:
+                    logger.info('Rate limit exhausted, waiting {} seconds for reset'.format(seconds))
+                    self.block(seconds)
+        except ValueError:
+            pass
+
+    @property
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'delayed': self.delayed,
+            'total_delay': self.total_delay,
+            'max_delay': self.max_observed_delay,
+        }
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header, which may be given as delta-seconds or as an HTTP date.
+
+    :rtype: float or None
+    """
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def credentials_digest(credentials):
+    return hashlib.sha256(
+        json.dumps(credentials, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def get_bucket(name, url, credentials):
+    """Returns the :class:`TokenBucket` for the given provider, host, and set of credentials,
+    creating one from the provider's configured limits if it doesn't exist yet.
+
+    :param str name: The provider's NAME
+    :param str url: The url about to be requested, only the host is considered
+    :param dict credentials: The credentials the request is made with
+    :rtype: :class:`TokenBucket`
+    """
+    key = (name, parse.urlsplit(url).netloc, credentials_digest(credentials))
+
+    with _BUCKETS_LOCK:
+        try:
+            _BUCKETS.move_to_end(key)
+            return _BUCKETS[key]
+        except KeyError:
+            pass
+
+        limits = settings.RATE_LIMITS.get(name, {})
+        bucket = _BUCKETS[key] = TokenBucket(
+            limits.get('rate', settings.RATE_LIMIT_DEFAULT_RATE),
+            limits.get('burst', settings.RATE_LIMIT_DEFAULT_BURST),
+            max_delay=limits.get('max_delay', settings.RATE_LIMIT_MAX_DELAY),
+        )
+
+        while len(_BUCKETS) > settings.RATE_LIMIT_MAX_BUCKETS:
+            _BUCKETS.popitem(last=False)
+
+    return bucket
+
+
+def stats():
+    """Aggregate queueing delay counters for every tracked bucket, grouped by provider"""
+    with _BUCKETS_LOCK:
+        buckets = list(_BUCKETS.items())
+
+    ret = {}
+    for (name, _, _), bucket in buckets:
+        totals = ret.setdefault(name, {'requests': 0, 'delayed': 0, 'total_delay': 0.0, 'max_delay': 0.0})
+        totals['requests'] += bucket.requests
+        totals['delayed'] += bucket.delayed
+        totals['total_delay'] += bucket.total_delay
+        totals['max_delay'] = max(totals['max_delay'], bucket.max_observed_delay)
+    return ret
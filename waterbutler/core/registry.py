@@ -0,0 +1,71 @@
+import logging
+import threading
+
+from stevedore import driver
+from stevedore import extension
+
+from waterbutler.core import exceptions
+
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'waterbutler.providers'
+
+_CLASSES = {}
+_LOCK = threading.Lock()
+
+
+def load():
+    """Resolve every provider registered under the ``waterbutler.providers`` entry point, so
+    that requests never have to scan entry points themselves.  Called once as the server or a
+    worker starts.  Providers that fail to import are logged and skipped.
+
+    :rtype: list of provider names
+    """
+    manager = extension.ExtensionManager(
+        namespace=NAMESPACE,
+        invoke_on_load=False,
+        on_load_failure_callback=_log_failure,
+    )
+
+    with _LOCK:
+        for ext in manager.extensions:
+            _CLASSES[ext.name] = ext.plugin
+
+    logger.info('Loaded providers: {}'.format(', '.join(sorted(_CLASSES))))
+    return sorted(_CLASSES)
+
+
+def get(name):
+    """Returns the provider class registered as ``name``.  Providers that weren't loaded at
+    startup are resolved, and remembered, on first use.
+
+    :param str name: The name of the provider (s3, box, etc)
+    :rtype: subclass of :class:`waterbutler.core.provider.BaseProvider`
+    :raises: :class:`waterbutler.core.exceptions.ProviderNotFound`
+    """
+    try:
+        return _CLASSES[name]
+    except KeyError:
+        pass
+
+    try:
+        manager = driver.DriverManager(
+            namespace=NAMESPACE,
+            name=name,
+            invoke_on_load=False,
+        )
+    except RuntimeError:
+        raise exceptions.ProviderNotFound(name)
+
+    with _LOCK:
+        return _CLASSES.setdefault(name, manager.driver)
+
+
+def clear():
+    with _LOCK:
+        _CLASSES.clear()
+
+
+def _log_failure(manager, entrypoint, exc):
+    logger.error('Could not load provider {!r}: {!r}'.format(entrypoint.name, exc))
@@ -7,12 +7,21 @@ from waterbutler.core.streams.file import FileStreamReader  # noqa
 
 from waterbutler.core.streams.http import FormDataStream  # noqa
 from waterbutler.core.streams.http import RequestStreamReader  # noqa
+from waterbutler.core.streams.http import BufferedRequestStreamReader  # noqa
 from waterbutler.core.streams.http import ResponseStreamReader  # noqa
+from waterbutler.core.streams.http import ChainedResponseStreamReader  # noqa
+from waterbutler.core.streams.http import ParallelRangeStreamReader  # noqa
 
 from waterbutler.core.streams.metadata import HashStreamWriter  # noqa
+from waterbutler.core.streams.metadata import HashSpoolWriter  # noqa
 
 from waterbutler.core.streams.zip import ZipStreamReader  # noqa
+from waterbutler.core.streams.zip import ZipCompressionPolicy  # noqa
+
+from waterbutler.core.streams.tar import TarStreamReader  # noqa
+from waterbutler.core.streams.tar import TarStreamParser  # noqa
 
 from waterbutler.core.streams.base64 import Base64EncodeStream  # noqa
 
 from waterbutler.core.streams.json import JSONStream  # noqa
+from waterbutler.core.streams.json import Base64JSONStream  # noqa
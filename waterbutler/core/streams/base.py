@@ -1,5 +1,13 @@
 import abc
 import asyncio
+import collections
+
+
+def join(chunks):
+    """Concatenates a list of bytes-like chunks, without copying a lone ``bytes`` chunk"""
+    if len(chunks) == 1 and isinstance(chunks[0], bytes):
+        return chunks[0]
+    return b''.join(chunks)
 
 
 class BaseStream(asyncio.StreamReader, metaclass=abc.ABCMeta):
@@ -41,6 +49,10 @@ class BaseStream(asyncio.StreamReader, metaclass=abc.ABCMeta):
                 reader.feed_data(data)
             for writer in self.writers.values():
                 writer.write(data)
+                # Writers that hand their input off elsewhere may hold the read up, as
+                # asyncio.StreamWriter does
+                if hasattr(writer, 'drain'):
+                    await writer.drain()
         return data
 
     @abc.abstractmethod
@@ -58,7 +70,7 @@ class MultiStream(asyncio.StreamReader):
         super().__init__()
         self._size = 0
         self.stream = []
-        self._streams = []
+        self._streams = collections.deque()
 
         self.add_streams(*streams)
 
@@ -81,22 +93,26 @@ class MultiStream(asyncio.StreamReader):
         if n < 0:
             return (await super().read(n))
 
-        chunk = b''
+        # Joined once at the end, many small streams would make repeated concatenation quadratic
+        chunks = []
+        remaining = n
 
-        while self.stream and (len(chunk) < n or n == -1):
-            if n == -1:
-                chunk += await self.stream.read(-1)
-            else:
-                chunk += await self.stream.read(n - len(chunk))
+        while self.stream and remaining > 0:
+            chunk = await self.stream.read(remaining)
+            if chunk:
+                chunks.append(chunk)
+                remaining -= len(chunk)
 
             if self.stream.at_eof():
                 self._cycle()
+            elif not chunk:
+                break
 
-        return chunk
+        return join(chunks)
 
     def _cycle(self):
         try:
-            self.stream = self.streams.pop(0)
+            self.stream = self.streams.popleft()
         except IndexError:
             self.stream = None
             self.feed_eof()
@@ -111,6 +127,7 @@ class StringStream(BaseStream):
             raise TypeError('Data must be either str or bytes, found {!r}'.format(type(data)))
 
         self._size = len(data)
+        self.content_type = 'application/octet-stream'
         self.feed_data(data)
         self.feed_eof()
 
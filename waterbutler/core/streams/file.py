@@ -1,48 +1,135 @@
+import io
 import os
 import asyncio
 
-import agent
-
 from waterbutler.core.streams import BaseStream
 
 
 class FileStreamReader(BaseStream):
+    """Streams the contents of a file object.  Reads from real files are done with ``os.pread``
+    in the default executor, keeping blocking disk IO off of the event loop.  In-memory file
+    objects, such as :class:`io.BytesIO`, are read inline.
+
+    :param file_pointer: A binary file object
+    :param tuple range: An optional ``(start, end)`` byte range, as returned by
+        ``tornado.httputil._parse_request_range``.  ``end`` is exclusive and a negative ``start``
+        counts back from the end of the file.  A range makes the stream partial.
+    """
 
-    def __init__(self, file_pointer):
+    def __init__(self, file_pointer, range=None):
         super().__init__()
-        self.file_gen = None
         self.file_pointer = file_pointer
-        self.read_size = None
         self.content_type = 'application/octet-stream'
 
+        self.partial = range is not None
+        self.range = range
+        self.offset = None
+        self._bounds = None
+
+    @property
+    def fileno(self):
+        try:
+            return self.file_pointer.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return None
+
+    @property
+    def total_size(self):
+        return self.bounds[2]
+
+    @property
+    def start(self):
+        return self.bounds[0]
+
+    @property
+    def end(self):
+        return self.bounds[1]
+
+    @property
+    def bounds(self):
+        """``(start, end, total_size)``, worked out on first use and cached, as the underlying
+        file is not expected to change while it is being streamed
+        """
+        if self._bounds is None:
+            total_size = self._total_size()
+            self._bounds = self._resolve_range(self.range, total_size) + (total_size, )
+        return self._bounds
+
     @property
     def size(self):
+        return self.end - self.start
+
+    @property
+    def content_range(self):
+        if self.size == 0:
+            return 'bytes */{}'.format(self.total_size)
+        return 'bytes {}-{}/{}'.format(self.start, self.end - 1, self.total_size)
+
+    @property
+    def satisfiable(self):
+        """Whether the requested range overlaps the file, in the sense of RFC 7233"""
+        return not self.partial or self.start < self.total_size
+
+    def close(self):
+        self.file_pointer.close()
+        self.feed_eof()
+
+    def _total_size(self):
+        if self.fileno is not None:
+            # The size and reads go to the file descriptor, past anything still buffered in
+            # the file object
+            self.file_pointer.flush()
+            return os.fstat(self.fileno).st_size
+
         cursor = self.file_pointer.tell()
         self.file_pointer.seek(0, os.SEEK_END)
         ret = self.file_pointer.tell()
         self.file_pointer.seek(cursor)
         return ret
 
-    def close(self):
-        self.file_pointer.close()
-        self.feed_eof()
+    def _resolve_range(self, range, total_size):
+        if range is None:
+            return 0, total_size
 
-    @agent.async_generator
-    def chunk_reader(self):
-        self.file_pointer.seek(0)
-        while True:
-            chunk = self.file_pointer.read(self.read_size)
-            if not chunk:
-                self.feed_eof()
-                yield b''
+        start, end = range
+        if start is None:
+            start = 0
+        elif start < 0:
+            start = max(0, total_size + start)
 
-            yield chunk
+        if end is None or end > total_size:
+            end = total_size
+
+        start = min(start, total_size)
+        return start, max(start, end)
+
+    def _read_chunk(self, fileno, offset, size):
+        if fileno is not None:
+            return os.pread(fileno, size, offset)
+
+        self.file_pointer.seek(offset)
+        return self.file_pointer.read(size)
 
     async def _read(self, size):
-        self.file_gen = self.file_gen or self.chunk_reader()
-        self.read_size = size
-        # add sleep of 0 so read will yield and continue in next io loop iteration
-        # asyncio.sleep(0) yields None by default, which displeases tornado
-        await asyncio.sleep(0.001)
-        async for chunk in self.file_gen:
-            return chunk
+        if self.offset is None:
+            self.offset = self.start
+
+        remaining = self.end - self.offset
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+
+        fileno = self.fileno
+        if size == 0:
+            chunk = b''
+        elif fileno is not None:
+            chunk = await asyncio.get_event_loop().run_in_executor(None, self._read_chunk, fileno, self.offset, size)
+        else:
+            chunk = self._read_chunk(fileno, self.offset, size)
+
+        self.offset += len(chunk)
+
+        if not chunk or self.offset >= self.end:
+            if not self._eof:
+                self.feed_eof()
+
+        return chunk
@@ -1,9 +1,12 @@
-import asyncio
 import uuid
+import asyncio
+import inspect
+import collections
 
 from waterbutler.core.streams import BaseStream
 from waterbutler.core.streams import MultiStream
 from waterbutler.core.streams import StringStream
+from waterbutler.core.streams.base import join
 
 
 class FormDataStream(MultiStream):
@@ -164,6 +167,10 @@ class ResponseStreamReader(BaseStream):
     def content_range(self):
         return self.response.headers['Content-Range']
 
+    def close(self):
+        """Close the response, whatever of its body is left unread"""
+        self.response.close()
+
     @property
     def name(self):
         return self._name
@@ -205,3 +212,273 @@ class RequestStreamReader(BaseStream):
             return (await self.inner.readexactly(size))
         except asyncio.IncompleteReadError as e:
             return e.partial
+
+
+class BufferedRequestStreamReader(BaseStream):
+    """An in-process pipe from a request handler's ``data_received`` to a provider's upload.
+    Received chunks are queued as-is and handed to the reader without passing through a socket.
+    Reads that line up with the received chunks return them without copying.
+
+    The buffer is bounded: once ``max_buffer_size`` bytes are queued, :meth:`write` waits until
+    the reader has caught up, which in turn stops tornado from reading more of the request body.
+
+    The writer calls :meth:`write_eof` once the request body has been fully received, or
+    :meth:`abort` if the reading side has gone away.
+    """
+
+    def __init__(self, request, max_buffer_size=2 ** 20):
+        super().__init__()
+        self.request = request
+        self.max_buffer_size = max_buffer_size
+
+        self._chunks = collections.deque()
+        self._buffered = 0
+        self._write_eof = False
+        self._aborted = False
+
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    @property
+    def size(self):
+        return int(self.request.headers.get('Content-Length'))
+
+    def at_eof(self):
+        return (self._write_eof or self._aborted) and not self._chunks
+
+    async def write(self, chunk):
+        """Queue ``chunk`` for the reader, waiting for room in the buffer if it is full.
+
+        :param chunk: A bytes-like object
+        """
+        while not self._writable.is_set() and not self._aborted:
+            await self._writable.wait()
+
+        if self._aborted or not chunk:
+            return
+
+        self._chunks.append(chunk)
+        self._buffered += len(chunk)
+        self._readable.set()
+
+        if self._buffered >= self.max_buffer_size:
+            self._writable.clear()
+
+    def write_eof(self):
+        self._write_eof = True
+        self._readable.set()
+
+    def abort(self):
+        """Discard anything buffered and release a writer blocked on a full buffer"""
+        self._aborted = True
+        self._chunks.clear()
+        self._buffered = 0
+        self._readable.set()
+        self._writable.set()
+
+    async def _read(self, size=-1):
+        # Wait for either a full read's worth of data or the end of the body
+        while not (self._write_eof or self._aborted) and (size < 0 or self._buffered < size):
+            self._readable.clear()
+            await self._readable.wait()
+
+        if not self._chunks:
+            if not self._eof:
+                self.feed_eof()
+            return b''
+
+        if size < 0 or size >= self._buffered:
+            size = self._buffered
+
+        first = self._chunks[0]
+        if len(first) == size:
+            # The common case: hand the chunk over untouched
+            data = self._chunks.popleft()
+        else:
+            parts, remaining = [], size
+            while remaining:
+                chunk = memoryview(self._chunks.popleft())
+                if len(chunk) > remaining:
+                    self._chunks.appendleft(chunk[remaining:])
+                    chunk = chunk[:remaining]
+                parts.append(chunk)
+                remaining -= len(chunk)
+            data = b''.join(parts)
+
+        self._buffered -= size
+        if self._buffered < self.max_buffer_size:
+            self._writable.set()
+
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+
+        if self.at_eof() and not self._eof:
+            self.feed_eof()
+
+        return data
+
+
+class ChainedResponseStreamReader(BaseStream):
+    """Streams the bodies of several responses one after the other, such as the ranges of an
+    object.  Responses may be given as awaitables, so that later ones are requested while the
+    earlier ones are read.
+
+    :param list responses: Responses, or awaitables of them, in order
+    :param int size: The combined size of the bodies in bytes
+    """
+
+    def __init__(self, responses, size, name=None, content_type='application/octet-stream'):
+        super().__init__()
+        self.content_type = content_type
+        self._size = size
+        self._name = name
+
+        self._pending = collections.deque()
+        for response in responses:
+            if not inspect.isawaitable(response):
+                received, response = response, asyncio.Future()
+                response.set_result(received)
+            self._pending.append(asyncio.ensure_future(response))
+        self._response = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def size(self):
+        return self._size
+
+    def close(self):
+        """Cancel any outstanding requests and close the responses not yet read"""
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+        for future in self._pending:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                future.result().close()
+            future.cancel()
+        self._pending.clear()
+
+    async def _next_response(self):
+        if not self._pending:
+            return False
+
+        try:
+            self._response = await self._pending[0]
+        except Exception:
+            self.close()
+            raise
+
+        self._pending.popleft()
+        return True
+
+    async def _read(self, size):
+        chunks = []
+        while True:
+            if self._response is None and not (await self._next_response()):
+                if not self._eof:
+                    self.feed_eof()
+                return join(chunks)
+
+            chunk = await self._response.content.read(size)
+            if not chunk:
+                await self._response.release()
+                self._response = None
+            elif size < 0:
+                chunks.append(chunk)
+            else:
+                return chunk
+
+
+class ParallelRangeStreamReader(BaseStream):
+    """Reads an object of known size as a series of byte ranges, fetching up to ``concurrency``
+    ranges at once.  Ranges are handed to the reader in order, so at most ``concurrency`` ranges
+    plus the one being read are held in memory at any time.
+
+    :param coroutine fetch: Called as ``fetch(start, end)`` and returns the bytes from ``start``
+        up to but not including ``end``
+    :param int size: The size of the object in bytes
+    :param int chunk_size: The size of each range
+    :param int concurrency: The number of ranges fetched at once
+    :param first: An optional awaitable of the first range, already on its way
+    """
+
+    def __init__(self, fetch, size, chunk_size, concurrency, name=None, content_type='application/octet-stream', first=None):
+        super().__init__()
+        self.fetch = fetch
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.content_type = content_type
+        self._size = size
+        self._name = name
+
+        self._offsets = iter(range(0, size, chunk_size))
+        self._pending = collections.deque()
+        self._current = memoryview(b'')
+
+        if first is not None:
+            self._offsets = iter(range(chunk_size, size, chunk_size))
+            self._pending.append(asyncio.ensure_future(first))
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def size(self):
+        return self._size
+
+    def close(self):
+        """Cancel any outstanding fetches"""
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._offsets = iter(())
+
+    def _schedule(self):
+        while len(self._pending) < self.concurrency:
+            try:
+                start = next(self._offsets)
+            except StopIteration:
+                break
+            self._pending.append(asyncio.ensure_future(
+                self.fetch(start, min(start + self.chunk_size, self._size))
+            ))
+
+    async def _next_chunk(self):
+        self._schedule()
+        if not self._pending:
+            return False
+
+        try:
+            self._current = memoryview(await self._pending.popleft())
+        except Exception:
+            self.close()
+            raise
+
+        self._schedule()
+        return True
+
+    async def _read(self, size):
+        parts = []
+        while size < 0 or size > 0:
+            if not self._current and not (await self._next_chunk()):
+                break
+
+            if size < 0 or size >= len(self._current):
+                parts.append(self._current)
+                size -= len(self._current) if size > 0 else 0
+                self._current = memoryview(b'')
+            else:
+                parts.append(self._current[:size])
+                self._current = self._current[size:]
+                size = 0
+
+        if not self._current and not self._pending and not self._eof:
+            self._schedule()
+            if not self._pending:
+                self.feed_eof()
+
+        return b''.join(parts)
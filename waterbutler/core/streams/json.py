@@ -1,7 +1,11 @@
+import json
+import base64
 import asyncio
 
+from waterbutler.core.streams import BaseStream
 from waterbutler.core.streams import StringStream
 from waterbutler.core.streams import MultiStream
+from waterbutler.core.streams.base import join
 
 
 class JSONStream(MultiStream):
@@ -13,3 +17,111 @@ class JSONStream(MultiStream):
                 value = StringStream(value)
             streams.extend([StringStream('"{}":"'.format(key)), value, StringStream('",')])
         super().__init__(*(streams[:-1] + [StringStream('"}')]))
+
+
+class Base64JSONStream(BaseStream):
+    """A JSON object holding the base64 encoded contents of a stream under ``key``, alongside
+    any other ``fields``, as taken by APIs such as GitHub's git/blobs.
+
+    The stream is read and encoded a block at a time.  A block is filled whatever the length of
+    the stream's reads, and being a multiple of 3 bytes encodes without padding, so padding only
+    ever ends the contents.  The default block encodes to 64KiB, the length aiohttp reads a
+    request body in, so each of its reads is usually handed an encoded block untouched.  The
+    length of the object is known up front from the size of the stream.
+
+    :param stream: The stream to encode
+    :param str key: The name of the field holding the encoded stream
+    :param dict fields: Any other fields of the object, which must be JSON serializable
+    :param int block_size: Bytes of the stream encoded at a time, rounded down to a multiple of 3
+    """
+
+    def __init__(self, stream, key='content', fields=None, block_size=3 * 2 ** 14):
+        super().__init__()
+        self.stream = stream
+
+        head = json.dumps(fields or {}, separators=(',', ':'))[:-1]
+        if fields:
+            head += ','
+        head += json.dumps(key) + ':"'
+        self._head = head.encode('utf-8')
+        self._tail = b'"}'
+
+        if stream.size is None:
+            self._size = None
+        else:
+            self._size = len(self._head) + self.encoded_size(stream.size) + len(self._tail)
+
+        self._block = memoryview(bytearray(max(block_size - block_size % 3, 3)))
+        self._encoded = False
+        self._piece = b''
+        self._offset = 0
+
+    @staticmethod
+    def encoded_size(size):
+        """The length of ``size`` bytes once base64 encoded, padding included"""
+        return 4 * ((size + 2) // 3)
+
+    @property
+    def size(self):
+        return self._size
+
+    async def _read(self, size=-1):
+        if size < 0:
+            chunks = []
+            chunk = await self._read_piece(None)
+            while chunk:
+                chunks.append(chunk)
+                chunk = await self._read_piece(None)
+            return join(chunks)
+
+        if size == 0:
+            return b''
+        return await self._read_piece(size)
+
+    async def _read_piece(self, size):
+        """Up to ``size`` bytes, or all if None, of the rest of the current piece of the body"""
+        while self._offset == len(self._piece):
+            piece = await self._next_piece()
+            if piece is None:
+                if not self._eof:
+                    self.feed_eof()
+                return b''
+            self._piece, self._offset = piece, 0
+
+        end = len(self._piece)
+        if size is not None:
+            end = min(self._offset + size, end)
+
+        if self._offset == 0 and end == len(self._piece):
+            chunk = self._piece
+        else:
+            chunk = self._piece[self._offset:end]
+        self._offset = end
+
+        if self._tail is None and self._offset == len(self._piece) and not self._eof:
+            self.feed_eof()
+        return chunk
+
+    async def _next_piece(self):
+        """The next piece of the body: the head, each encoded block, then the tail, or None once
+        all have been read.
+        """
+        if self._head is not None:
+            piece, self._head = self._head, None
+            return piece
+
+        while not self._encoded:
+            filled = 0
+            while filled < len(self._block):
+                chunk = await self.stream.read(len(self._block) - filled)
+                if not chunk:
+                    self._encoded = True
+                    break
+                self._block[filled:filled + len(chunk)] = chunk
+                filled += len(chunk)
+
+            if filled:
+                return base64.b64encode(self._block[:filled])
+
+        piece, self._tail = self._tail, None
+        return piece
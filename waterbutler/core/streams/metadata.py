@@ -1,3 +1,9 @@
+import asyncio
+import hashlib
+
+from waterbutler import settings
+
+
 class HashStreamWriter:
     """Stream-like object that hashes and discards its input."""
     def __init__(self, hasher):
@@ -15,3 +21,108 @@ class HashStreamWriter:
 
     def close(self):
         pass
+
+
+class HashSpoolWriter:
+    """Stream-like object that hashes its input with several algorithms and, optionally, spools
+    it to a local file, without doing either on the event loop.
+
+    Input is gathered into blocks of ``settings.HASH_BLOCK_SIZE`` bytes, large enough that
+    hashlib releases the GIL, and each block is hashed and written in the default executor, in
+    order.  The stream being read waits in :meth:`drain` while ``settings.HASH_MAX_BUFFERED``
+    bytes are queued, so a slow disk holds the upload back instead of filling memory.
+    :meth:`close` must be awaited before the digests are read.
+
+    :param str path: The file to spool to, None to only hash
+    :param algorithms: The names of the hashlib algorithms to use
+    """
+    def __init__(self, path, *algorithms, block_size=None, max_buffered=None):
+        self.path = path
+        self.hashes = {name: hashlib.new(name) for name in algorithms}
+        self.block_size = block_size or settings.HASH_BLOCK_SIZE
+        max_buffered = max_buffered or settings.HASH_MAX_BUFFERED
+
+        self._file = None
+        self._batch = []
+        self._batch_size = 0
+        self._blocks = asyncio.Queue(maxsize=max(max_buffered // self.block_size, 1))
+        self._consumer = None
+        self._error = None
+
+    @property
+    def hexdigests(self):
+        return {name: hash.hexdigest() for name, hash in self.hashes.items()}
+
+    def can_write_eof(self):
+        return False
+
+    def write(self, data):
+        self._batch.append(data)
+        self._batch_size += len(data)
+
+    async def drain(self):
+        """Queues the input gathered so far once there's a block of it, waiting for room"""
+        if self._error is not None:
+            raise self._error
+
+        if self._batch_size >= self.block_size:
+            await self._put(self._take_batch())
+
+    async def close(self):
+        """Processes whatever is left, and closes the spooled file.  Raises any error that
+        occurred while hashing or writing.
+        """
+        if self._batch_size:
+            await self._put(self._take_batch())
+
+        if self._consumer is not None:
+            await self._put(None)
+            await self._consumer
+
+        await asyncio.get_event_loop().run_in_executor(None, self._close_file)
+
+        if self._error is not None:
+            raise self._error
+
+    def _take_batch(self):
+        block = b''.join(self._batch)
+        self._batch = []
+        self._batch_size = 0
+        return block
+
+    async def _put(self, block):
+        if self._consumer is None:
+            self._consumer = asyncio.ensure_future(self._consume())
+        await self._blocks.put(block)
+
+    async def _consume(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            block = await self._blocks.get()
+            if block is None:
+                return
+            if self._error is not None:
+                # Keep emptying the queue, so that nothing waits on it forever
+                continue
+            try:
+                await loop.run_in_executor(None, self._process, block)
+            except Exception as e:
+                self._error = e
+
+    def _process(self, block):
+        for hash in self.hashes.values():
+            hash.update(block)
+
+        if self.path is not None:
+            if self._file is None:
+                self._file = open(self.path, 'wb')
+            self._file.write(block)
+
+    def _close_file(self):
+        if self.path is None:
+            return
+
+        if self._file is None:
+            # Nothing was written, the file must still exist
+            self._file = open(self.path, 'wb')
+        self._file.close()
@@ -0,0 +1,366 @@
+import asyncio
+import calendar
+import tarfile
+import tempfile
+import time
+import zlib
+
+from waterbutler import settings
+from waterbutler.core import exceptions
+from waterbutler.core.streams import BaseStream
+from waterbutler.core.streams import FileStreamReader
+from waterbutler.core.streams.base import join
+
+
+# Basic structure of a .tar:
+
+# <Header 0>  (512 bytes, plus a pax extended header for long names or large files)
+# <File Stream 0>  (zero padded to a multiple of 512 bytes)
+# .
+# .
+# <Header n>
+# <File Stream n>
+# <End of Archive>  (two zero blocks, zero padded to a multiple of 10240 bytes)
+
+
+def _file_size(metadata):
+    try:
+        return int(metadata.size)
+    except (AttributeError, NotImplementedError, TypeError, ValueError):
+        return None
+
+
+def _mtime(metadata):
+    """The modification time of a file as a unix timestamp, or now if unknown"""
+    try:
+        modified = metadata.modified_utc
+        return calendar.timegm(time.strptime(modified[:19], '%Y-%m-%dT%H:%M:%S'))
+    except (AttributeError, NotImplementedError, TypeError, ValueError):
+        return int(time.time())
+
+
+def _header(name, size, mtime):
+    info = tarfile.TarInfo(name.strip('/'))
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o600
+    return info.tobuf(format=tarfile.PAX_FORMAT, encoding='utf-8', errors='surrogateescape')
+
+
+def _padding(size, block=tarfile.BLOCKSIZE):
+    return -size % block
+
+
+class TarStreamReader(asyncio.StreamReader):
+    """Combines one or more streams into a single tar archive, optionally gzipped.
+
+    Unlike zip, tar has no central directory, so the archive can be unpacked as it streams, and
+    its length is known up front from the size of each file, see :meth:`archive_size`.  A tar
+    header must hold the size of the file after it, which is taken from the file's metadata, or
+    failing that its stream.  Files of unknown size are spooled to disk first.
+
+    :param stream_gen: An async iterator yielding a ``(name, stream)`` pair, or a
+        ``(name, stream, metadata)`` triple, for every file
+    :param int size: The length of the archive, see :meth:`archive_size`
+    :param bool gzip: Gzip the archive
+    :param int level: The gzip compression level, defaults to ``settings.ZIP_COMPRESSION_LEVEL``
+    """
+
+    def __init__(self, stream_gen, size=None, gzip=False, level=None):
+        super().__init__()
+        self.streams = stream_gen
+        self.gzip = gzip
+        self.size = None if gzip else size
+
+        self.stream = None
+        self.compressor = None
+        if gzip:
+            level = settings.ZIP_COMPRESSION_LEVEL if level is None else level
+            # wbits of 16 + 15 writes a gzip header and trailer
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + 15)
+
+        self._buffer = bytearray()
+        self._compressed = bytearray()
+        self._length = 0
+        self._finished = False
+        self._flushed = False
+        self._file = None
+
+    @staticmethod
+    def archive_size(entries):
+        """The exact length of an uncompressed archive of ``entries``, or None if the size of
+        any of them is unknown.
+
+        :param entries: A list of ``(name, metadata)`` pairs
+        :rtype: int or None
+        """
+        length = 0
+        for name, metadata in entries:
+            size = _file_size(metadata)
+            if size is None:
+                return None
+            # The header's length doesn't depend on the modification time
+            length += len(_header(name, size, 0)) + size + _padding(size)
+
+        length += 2 * tarfile.BLOCKSIZE
+        return length + _padding(length, tarfile.RECORDSIZE)
+
+    async def read(self, n=-1):
+        if n < 0:
+            # Parent class will handle auto chunking for us
+            return await super().read(n)
+
+        if not self.gzip:
+            return await self._read_archive(n)
+
+        while len(self._compressed) < n and not self._flushed:
+            chunk = await self._read_archive(max(n, settings.ZIP_EXECUTOR_THRESHOLD))
+            if not chunk:
+                self._compressed += self.compressor.flush(zlib.Z_FINISH)
+                self._flushed = True
+            elif len(chunk) < settings.ZIP_EXECUTOR_THRESHOLD:
+                self._compressed += self.compressor.compress(chunk)
+            else:
+                self._compressed += await asyncio.get_event_loop().run_in_executor(None, self.compressor.compress, chunk)
+
+        ret = bytes(self._compressed[:n])
+        del self._compressed[:n]
+        return ret
+
+    async def _read_archive(self, n):
+        chunks = []
+
+        while n > 0:
+            if self._buffer:
+                chunk = bytes(self._buffer[:n])
+                del self._buffer[:len(chunk)]
+            elif self.stream is not None:
+                chunk = await self.stream.read(n)
+                if not chunk:
+                    self._end_file()
+                    continue
+                self._received(chunk)
+            elif not self._finished:
+                await self._next_file()
+                continue
+            else:
+                break
+
+            chunks.append(chunk)
+            n -= len(chunk)
+
+        return join(chunks)
+
+    def _queue(self, data):
+        self._buffer += data
+        self._length += len(data)
+
+    async def _next_file(self):
+        try:
+            entry = await self.streams.__anext__()
+        except StopAsyncIteration:
+            self._finished = True
+            self._queue(b'\0' * (2 * tarfile.BLOCKSIZE))
+            self._queue(b'\0' * _padding(self._length, tarfile.RECORDSIZE))
+            return
+
+        name, stream, *rest = entry
+        metadata = rest[0] if rest else None
+
+        spool = None
+        size = _file_size(metadata)
+        if size is None:
+            size = getattr(stream, 'size', None)
+        if size is None:
+            stream, spool = await self._spool(stream)
+            size = spool.tell()
+
+        self._queue(_header(name, size, _mtime(metadata)))
+        self.stream = stream
+        self._file = {'name': name, 'size': size, 'received': 0, 'spool': spool}
+
+    def _received(self, chunk):
+        self._file['received'] += len(chunk)
+        self._length += len(chunk)
+        if self._file['received'] > self._file['size']:
+            self._size_mismatch()
+
+    def _end_file(self):
+        if self._file['received'] != self._file['size']:
+            self._size_mismatch()
+
+        if self._file['spool'] is not None:
+            self._file['spool'].close()
+
+        self._queue(b'\0' * _padding(self._file['size']))
+        self.stream = None
+        self._file = None
+
+    def _size_mismatch(self):
+        # The size is already written to the file's header, the archive can't be fixed up
+        raise exceptions.DownloadError(
+            'Expected {name} to be {size} bytes, got {received}'.format(**self._file)
+        )
+
+    async def _spool(self, stream):
+        """Copies a stream of unknown length to a temporary file, so its size can be written
+        ahead of it.
+        """
+        loop = asyncio.get_event_loop()
+        spool = tempfile.TemporaryFile()
+
+        chunk = await stream.read(settings.ZIP_EXECUTOR_THRESHOLD)
+        while chunk:
+            await loop.run_in_executor(None, spool.write, chunk)
+            chunk = await stream.read(settings.ZIP_EXECUTOR_THRESHOLD)
+
+        await loop.run_in_executor(None, spool.flush)
+        return FileStreamReader(spool), spool
+
+
+def _pax_records(data):
+    """Parses the ``"<length> <key>=<value>\\n"`` records of a pax extended header"""
+    records, position = {}, 0
+    try:
+        while position < len(data):
+            space = data.index(b' ', position)
+            length = int(data[position:space])
+            key, _, value = data[space + 1:position + length - 1].partition(b'=')
+            records[key.decode('utf-8')] = value.decode('utf-8', 'surrogateescape')
+            position += length
+    except ValueError:
+        raise exceptions.UploadError('Invalid pax header in tar archive', code=400)
+    return records
+
+
+def _entry_name(name):
+    """Normalizes the name of a file in an uploaded archive, refusing any that would escape it"""
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if not parts or '..' in parts:
+        raise exceptions.UploadError('Invalid file name {!r} in tar archive'.format(name), code=400)
+    return '/'.join(parts)
+
+
+class TarStreamParser:
+    """Iterates over the files of a tar archive as it streams in, for batch uploads.  Yields a
+    ``(name, stream)`` pair for each regular file, ``name`` being relative to the root of the
+    archive.  Folders, links, and other special entries are skipped, as are pax and GNU long
+    name headers once applied to the entry they describe.
+
+    As an archive can only be read in order, the next file isn't yielded until the stream of
+    the last one has been read to its end.
+
+    :param stream: The archive, a stream such as
+        :class:`waterbutler.core.streams.BufferedRequestStreamReader`
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._entry = None
+
+    async def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._entry is not None:
+            await self._entry.consumed
+            await self._skip(_padding(self._entry.size))
+            self._entry = None
+
+        pax, long_name = {}, None
+        while True:
+            header = await self._read_exactly(tarfile.BLOCKSIZE)
+            # Two zero blocks end the archive, anything after them is padding
+            if not header or header == tarfile.NUL * tarfile.BLOCKSIZE:
+                while await self.stream.read(settings.ZIP_EXECUTOR_THRESHOLD):
+                    pass
+                raise StopAsyncIteration
+
+            try:
+                info = tarfile.TarInfo.frombuf(header, 'utf-8', 'surrogateescape')
+            except tarfile.HeaderError as e:
+                raise exceptions.UploadError('Invalid tar archive: {}'.format(e), code=400)
+
+            if info.type == tarfile.XHDTYPE:
+                pax.update(_pax_records(await self._read_block(info.size)))
+                continue
+            if info.type == tarfile.GNUTYPE_LONGNAME:
+                long_name = (await self._read_block(info.size)).rstrip(tarfile.NUL).decode('utf-8', 'surrogateescape')
+                continue
+
+            size = int(pax['size']) if 'size' in pax else info.size
+
+            if info.isreg():
+                name = _entry_name(pax.get('path') or long_name or info.name)
+                self._entry = TarEntryStream(self.stream, size)
+                return name, self._entry
+
+            await self._skip(size + _padding(size))
+            pax, long_name = {}, None
+
+    async def _read_exactly(self, n):
+        chunks = []
+        while n > 0:
+            chunk = await self.stream.read(n)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            n -= len(chunk)
+
+        data = join(chunks)
+        if data and n > 0:
+            raise exceptions.UploadError('Unexpected end of tar archive', code=400)
+        return data
+
+    async def _read_block(self, size):
+        """Reads the contents of a header entry, and its padding"""
+        return (await self._read_exactly(size + _padding(size)))[:size]
+
+    async def _skip(self, n):
+        while n > 0:
+            chunk = await self._read_exactly(min(n, settings.ZIP_EXECUTOR_THRESHOLD))
+            if not chunk:
+                raise exceptions.UploadError('Unexpected end of tar archive', code=400)
+            n -= len(chunk)
+
+
+class TarEntryStream(BaseStream):
+    """The contents of one file in a :class:`TarStreamParser`, read straight from the archive.
+    Reads return as many bytes as asked for, up to the end of the file.
+    """
+
+    def __init__(self, stream, size):
+        super().__init__()
+        self.stream = stream
+        self._size = size
+        self.remaining = size
+        self.consumed = asyncio.Future()
+
+        if size == 0:
+            self._finish()
+
+    @property
+    def size(self):
+        return self._size
+
+    async def _read(self, n=-1):
+        if n < 0 or n > self.remaining:
+            n = self.remaining
+
+        chunks = []
+        while n > 0:
+            chunk = await self.stream.read(n)
+            if not chunk:
+                raise exceptions.UploadError('Unexpected end of tar archive', code=400)
+            chunks.append(chunk)
+            n -= len(chunk)
+            self.remaining -= len(chunk)
+
+        if self.remaining == 0:
+            self._finish()
+        return join(chunks)
+
+    def _finish(self):
+        if not self.consumed.done():
+            self.consumed.set_result(None)
+        self.feed_eof()
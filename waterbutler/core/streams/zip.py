@@ -1,13 +1,18 @@
+import os
 import asyncio
 import binascii
+import collections
 import struct
 import time
 import zipfile
 import zlib
 
+from waterbutler import settings
+from waterbutler.core import exceptions
 from waterbutler.core.streams import BaseStream
 from waterbutler.core.streams import MultiStream
 from waterbutler.core.streams import StringStream
+from waterbutler.core.streams.base import join
 
 # for some reason python3.5 has this as (1 << 31) - 1, which is 0x7fffffff
 ZIP64_LIMIT = 0xffffffff - 1
@@ -56,6 +61,14 @@ class ZipLocalFileDataDescriptor(BaseStream):
         """Create 16 or 24 byte descriptor of file CRC, file size, and compress size"""
         self._eof = True
 
+        if self.file.expected_size is not None and self.file.original_size != self.file.expected_size:
+            # The archive's length was promised up front, a short or long file would break it
+            raise exceptions.DownloadError(
+                'Expected {} to be {} bytes, got {}'.format(
+                    self.file.zinfo.filename, self.file.expected_size, self.file.original_size
+                )
+            )
+
         if (self.file.original_size > ZIP64_LIMIT) or (self.file.compressed_size > ZIP64_LIMIT):
             self.file.need_zip64_data_descriptor = True
         return self.file.descriptor
@@ -65,6 +78,11 @@ class ZipLocalFileData(BaseStream):
     """A thin stream wrapper. Update the original_size, compressed_size, and CRC of a ZipLocalFile
     as chunks are read and compressed.
 
+    Large chunks are compressed in the default executor, so that one big archive doesn't stall
+    every other request on the event loop, while the next chunk is read from upstream.  Small
+    upstream chunks are gathered into large ones first, see :meth:`_read_input`.  The
+    compressor is only sync flushed every ``settings.ZIP_FLUSH_BOUNDARY`` bytes.
+
     See section 4.3.8 of the PKZIP APPNOTE.TXT.
 
     Note: This class is tightly coupled to ZipStreamReader and should not be used separately.
@@ -72,7 +90,12 @@ class ZipLocalFileData(BaseStream):
     def __init__(self, file, stream, *args, **kwargs):
         self.file = file
         self.stream = stream
-        self._buffer = bytearray()
+        # Compressed chunks not yet read, the first possibly a view of what's left of one
+        self._pending = collections.deque()
+        self._pending_size = 0
+        self._next_chunk = None
+        self._unflushed = 0
+        self._finished = False
         super().__init__(*args, **kwargs)
 
     @property
@@ -81,70 +104,140 @@ class ZipLocalFileData(BaseStream):
 
     async def _read(self, n=-1, *args, **kwargs):
 
-        ret = self._buffer
+        while (n == -1 or self._pending_size < n) and not self._finished:
+            if self._next_chunk is None:
+                chunk = await self._read_input(n)
+            else:
+                chunk = await self._next_chunk
+                self._next_chunk = None
+
+            final = self.stream.at_eof()
+            if len(chunk) < settings.ZIP_EXECUTOR_THRESHOLD or self.file.compressor is None:
+                compressed = self._compress(chunk, final)
+            else:
+                if not final:
+                    # Read ahead while this chunk is compressed
+                    self._next_chunk = asyncio.ensure_future(self._read_input(n))
+                compressed = await asyncio.get_event_loop().run_in_executor(None, self._compress, chunk, final)
+
+            self._finished = final
+            if compressed:
+                self._pending.append(compressed)
+                self._pending_size += len(compressed)
+
+        ret = self._take(n)
 
-        while (n == -1 or len(ret) < n) and not self.stream.at_eof():
-            chunk = await self.stream.read(n, *args, **kwargs)
+        # EOF is the buffer and stream are both empty
+        if not self._pending and self._finished:
+            self.feed_eof()
 
-            # Update file info
-            self.file.original_size += len(chunk)
-            self.file.zinfo.CRC = binascii.crc32(chunk, self.file.zinfo.CRC)
+        return ret
 
-            # compress
-            compressed = self.file.compressor.compress(chunk)
-            compressed += self.file.compressor.flush(
-                zlib.Z_FINISH if self.stream.at_eof() else zlib.Z_SYNC_FLUSH
-            )
+    async def _read_input(self, n):
+        """Reads the next chunk from upstream.  Network streams hand over small chunks, so for a
+        deflated file they are gathered up to ``settings.ZIP_EXECUTOR_THRESHOLD`` bytes, or the
+        end of the file, and compressed off the event loop all at once.
+        """
+        chunks, size = [], 0
+        while True:
+            chunk = await self.stream.read(n)
+            if chunk:
+                chunks.append(chunk)
+                size += len(chunk)
+            if (
+                not chunk or
+                self.file.compressor is None or
+                size >= settings.ZIP_EXECUTOR_THRESHOLD or
+                self.stream.at_eof()
+            ):
+                return join(chunks)
+
+    def _take(self, n):
+        """Removes up to ``n`` bytes from the front of the pending chunks.  Chunks are split with
+        memoryviews, so every byte is copied once at most, and not at all when a whole chunk
+        is returned as it is.
+        """
+        if n == -1 or n >= self._pending_size:
+            chunks = list(self._pending)
+            self._pending.clear()
+            self._pending_size = 0
+            return join(chunks)
+
+        chunks = []
+        remaining = n
+        while remaining:
+            chunk = self._pending.popleft()
+            if len(chunk) > remaining:
+                view = memoryview(chunk)
+                self._pending.appendleft(view[remaining:])
+                chunk = view[:remaining]
+            chunks.append(chunk)
+            remaining -= len(chunk)
+
+        self._pending_size -= n
+        return join(chunks)
+
+    def _compress(self, chunk, final):
+        """Compress one chunk, updating the file's size and CRC.  Only one call is ever in
+        flight for a file, so this is safe to run in another thread.
+        """
+        # Update file info
+        self.file.original_size += len(chunk)
+        self.file.zinfo.CRC = binascii.crc32(chunk, self.file.zinfo.CRC)
 
-            # Update file info
-            self.file.compressed_size += len(compressed)
-            ret += compressed
+        if self.file.compressor is None:
+            # Stored as is
+            self.file.compressed_size += len(chunk)
+            return chunk
 
-        # buffer any overages
-        if n != -1 and len(ret) > n:
-            self._buffer = ret[n:]
-            ret = ret[:n]
-        else:
-            self._buffer = bytearray()
+        # compress
+        compressed = self.file.compressor.compress(chunk)
+        self._unflushed += len(chunk)
+        if final:
+            compressed += self.file.compressor.flush(zlib.Z_FINISH)
+        elif self._unflushed >= settings.ZIP_FLUSH_BOUNDARY:
+            compressed += self.file.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._unflushed = 0
 
-        # EOF is the buffer and stream are both empty
-        if not self._buffer and self.stream.at_eof():
-            self.feed_eof()
-
-        return bytes(ret)
+        # Update file info
+        self.file.compressed_size += len(compressed)
+        return compressed
 
 
 class ZipLocalFile(MultiStream):
     """A local file entry in a zip archive.  Constructs the local file header, file data stream,
     and data descriptor.
 
+    The file is deflated at ``level``, or stored uncompressed if ``compress_type`` is
+    ``ZIP_STORED``.  If ``expected_size`` is given, the file must be exactly that long.
+
     Note: This class is tightly coupled to ZipStreamReader and should not be used separately.
     """
-    def __init__(self, file_tuple):
+    def __init__(self, file_tuple, compress_type=zipfile.ZIP_DEFLATED,
+                 level=zlib.Z_DEFAULT_COMPRESSION, date_time=None, expected_size=None):
         filename, stream = file_tuple
         filename = filename.strip('/')
         # Build a ZipInfo instance to use for the file's header and footer
         self.zinfo = zipfile.ZipInfo(
             filename=filename,
-            date_time=time.localtime(time.time())[:6],
+            date_time=date_time or time.localtime(time.time())[:6],
         )
-        self.zinfo.compress_type = zipfile.ZIP_DEFLATED
+        self.zinfo.compress_type = compress_type
         self.zinfo.external_attr = 0o600 << 16
         self.zinfo.header_offset = 0
         self.zinfo.flag_bits |= 0x08
         # Initial CRC: value will be updated as file is streamed
         self.zinfo.CRC = 0
 
-        # define a compressor
-        self.compressor = zlib.compressobj(
-            zlib.Z_DEFAULT_COMPRESSION,
-            zlib.DEFLATED,
-            -15,
-        )
+        # define a compressor, stored files are copied as they are
+        self.compressor = None
+        if compress_type == zipfile.ZIP_DEFLATED:
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
 
         # meta information - needed to build the footer
         self.original_size = 0
         self.compressed_size = 0
+        self.expected_size = expected_size
         self.need_zip64_data_descriptor = False
 
         super().__init__(
@@ -337,35 +430,201 @@ class ZipArchiveCentralDirectory(StringStream):
         return b''.join((file_headers, zip64_endrec, zip64_locator, endrec))
 
 
+class ZipCompressionPolicy:
+    """Decides how each file in an archive is compressed.  Files are deflated at ``level``,
+    unless the policy is store only, or their extension or mime type marks them as already
+    compressed, in which case deflating would only cost CPU and they are stored as they are.
+    A level of 0 is the same as store only.
+
+    :param int level: The deflate level, defaults to ``settings.ZIP_COMPRESSION_LEVEL``
+    :param bool store: Store every file uncompressed
+    :param store_extensions: Extensions of files to store, defaults to
+        ``settings.ZIP_STORE_EXTENSIONS``
+    :param store_mime_types: Mime types of files to store, a trailing ``/`` matching the whole
+        type.  Defaults to ``settings.ZIP_STORE_MIME_TYPES``
+    """
+    def __init__(self, level=None, store=False, store_extensions=None, store_mime_types=None):
+        self.level = settings.ZIP_COMPRESSION_LEVEL if level is None else level
+        self.store = store or self.level == 0
+
+        if store_extensions is None:
+            store_extensions = settings.ZIP_STORE_EXTENSIONS
+        self.store_extensions = {extension.lower() for extension in store_extensions}
+
+        if store_mime_types is None:
+            store_mime_types = settings.ZIP_STORE_MIME_TYPES
+        self.store_mime_types = tuple(mime_type.lower() for mime_type in store_mime_types)
+
+    def compress_type(self, name, content_type=None):
+        """Returns ``zipfile.ZIP_STORED`` or ``zipfile.ZIP_DEFLATED`` for the file ``name``"""
+        if self.store:
+            return zipfile.ZIP_STORED
+
+        if os.path.splitext(name)[1].lower() in self.store_extensions:
+            return zipfile.ZIP_STORED
+
+        if content_type:
+            content_type = content_type.lower()
+            for mime_type in self.store_mime_types:
+                if content_type == mime_type or (mime_type.endswith('/') and content_type.startswith(mime_type)):
+                    return zipfile.ZIP_STORED
+
+        return zipfile.ZIP_DEFLATED
+
+    def archive_size(self, entries):
+        """The exact length of an archive of ``entries``, or None if it can't be known before the
+        archive is built, because a file would be deflated or its size is unknown.  Every stored
+        file adds its size to fixed length headers, so the archive is laid out here exactly as
+        ZipStreamReader would, just without any data.
+
+        :param entries: A list of ``(name, metadata)`` pairs, in the order they will be streamed
+        :rtype: int or None
+        """
+        files = []
+        for name, metadata in entries:
+            size = _file_size(metadata)
+            if size is None or self.compress_type(name, _content_type(metadata)) != zipfile.ZIP_STORED:
+                return None
+
+            file = ZipLocalFile((name, None), compress_type=zipfile.ZIP_STORED)
+            file.original_size = file.compressed_size = size
+            file.need_zip64_data_descriptor = size > ZIP64_LIMIT
+            files.append(file)
+
+        return sum(file.total_bytes for file in files) + ZipArchiveCentralDirectory(files).size
+
+
+def _file_size(metadata):
+    try:
+        return int(metadata.size)
+    except (AttributeError, NotImplementedError, TypeError, ValueError):
+        return None
+
+
+def _content_type(metadata):
+    try:
+        return metadata.content_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def _date_time(metadata):
+    """The modification time of a file, as a ``ZipInfo.date_time`` tuple, or None if unknown"""
+    try:
+        modified = metadata.modified_utc
+        date_time = time.strptime(modified[:19], '%Y-%m-%dT%H:%M:%S')[:6]
+    except (AttributeError, NotImplementedError, TypeError, ValueError):
+        return None
+
+    # Zip can't represent anything earlier
+    return max(date_time, (1980, 1, 1, 0, 0, 0))
+
+
 class ZipStreamReader(asyncio.StreamReader):
-    """Combines one or more streams into a single, Zip-compressed stream"""
-    def __init__(self, stream_gen):
+    """Combines one or more streams into a single, Zip-compressed stream.
+
+    ``stream_gen`` yields a ``(name, stream)`` pair, or a ``(name, stream, metadata)`` triple,
+    for every file.  If ``size``, the length of the archive, is known up front, the stream can be
+    limited to a range of it, see :meth:`select_range`.
+
+    :param stream_gen: An async iterator of the files to include
+    :param ZipCompressionPolicy policy: How to compress each file, defaults to the settings
+    :param int size: The length of the archive, see :meth:`ZipCompressionPolicy.archive_size`
+    """
+    def __init__(self, stream_gen, policy=None, size=None):
         self._eof = False
         self.stream = None
         self.streams = stream_gen
         self.finished_streams = []
+        self.policy = policy or ZipCompressionPolicy()
+        self.size = size
+        self.partial = False
+        self.content_range = None
+        self._skip = 0
+        self._remaining = None
         # Each incoming stream should be wrapped in a _ZipFile instance
         super().__init__()
 
+    def select_range(self, start, end):
+        """Limits the stream to bytes ``start`` up to, not including, ``end`` of the archive, for
+        a Range request.  Files before ``start`` are still read, since the central directory
+        needs their CRCs, but none of them is returned.  ``size`` becomes the length of the
+        range.
+        """
+        if self.size is None:
+            raise ValueError('The length of the archive is not known')
+
+        self.partial = (start, end) != (0, self.size)
+        self.content_range = 'bytes {}-{}/{}'.format(start, end - 1, self.size)
+        self.size = end - start
+        self._skip = start
+        self._remaining = end - start
+
     async def read(self, n=-1):
         if n < 0:
             # Parent class will handle auto chunking for us
             return await super().read(n)
 
-        if not self.stream:
-            try:
-                self.stream = ZipLocalFile(await self.streams.__anext__())
-            except StopAsyncIteration:
-                if self._eof:
-                    return b''
-                self._eof = True
-                # Append a stream for the archive's footer (central directory)
-                self.stream = ZipArchiveCentralDirectory(self.finished_streams)
-
-        chunk = await self.stream.read(n)
-        if len(chunk) < n and self.stream.at_eof():
-            self.finished_streams.append(self.stream)
-            self.stream = None
-            chunk += await self.read(n - len(chunk))
+        while self._skip:
+            skipped = await self._read_archive(min(self._skip, max(n, 2 ** 16)))
+            if not skipped:
+                break
+            self._skip -= len(skipped)
 
+        if self._remaining is None:
+            return await self._read_archive(n)
+
+        chunk = await self._read_archive(min(n, self._remaining))
+        self._remaining -= len(chunk)
+        if not self._remaining and hasattr(self.streams, 'close'):
+            # Nothing past the range is needed
+            self.streams.close()
         return chunk
+
+    def _open(self, entry):
+        name, stream, *rest = entry
+        metadata = rest[0] if rest else None
+
+        content_type = _content_type(metadata) or getattr(stream, 'content_type', None)
+        compress_type = self.policy.compress_type(name, content_type)
+
+        expected_size = None
+        if self.size is not None:
+            expected_size = _file_size(metadata)
+
+        return ZipLocalFile(
+            (name, stream),
+            compress_type=compress_type,
+            level=self.policy.level,
+            date_time=_date_time(metadata),
+            expected_size=expected_size,
+        )
+
+    async def _read_archive(self, n):
+        # Collected and joined once, an archive of many small files would make concatenating
+        # each of them quadratic
+        chunks = []
+
+        while n > 0:
+            if not self.stream:
+                try:
+                    self.stream = self._open(await self.streams.__anext__())
+                except StopAsyncIteration:
+                    if self._eof:
+                        break
+                    self._eof = True
+                    # Append a stream for the archive's footer (central directory)
+                    self.stream = ZipArchiveCentralDirectory(self.finished_streams)
+
+            chunk = await self.stream.read(n)
+            if chunk:
+                chunks.append(chunk)
+                n -= len(chunk)
+
+            if self.stream.at_eof():
+                self.finished_streams.append(self.stream)
+                self.stream = None
+            elif not chunk:
+                break
+
+        return join(chunks)
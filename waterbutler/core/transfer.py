@@ -0,0 +1,189 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from waterbutler import settings
+from waterbutler.core import exceptions
+
+
+logger = logging.getLogger(__name__)
+
+# The folder transfers running in this process, reported by the /status endpoint
+_RUNNING = set()
+
+
+def stats():
+    """The progress of every folder transfer running in this process"""
+    return [transfer.stats for transfer in _RUNNING]
+
+
+class TransferItem:
+    """A single unit of work in a :class:`FolderTransfer`: one child of a folder being
+    transferred.  Tracks where its result belongs in the parent folder's metadata and how many
+    times it has been attempted.
+
+    ``src_path`` and ``dest_path`` are resolved in bulk, along with the rest of the folder's
+    children, when the item is queued.
+    """
+
+    def __init__(self, src_parent, dest_parent, metadata, folder, index, src_path=None, dest_path=None):
+        self.src_parent = src_parent
+        self.dest_parent = dest_parent
+        self.metadata = metadata
+        self.folder = folder
+        self.index = index
+        self.src_path = src_path
+        self.dest_path = dest_path
+        self.attempts = 0
+
+    @property
+    def name(self):
+        return self.metadata.name
+
+    @property
+    def is_folder(self):
+        return self.metadata.is_folder
+
+    def __repr__(self):
+        return '<{}({!r}, {!r})>'.format(self.__class__.__name__, self.src_parent, self.name)
+
+
+class FolderTransfer:
+    """Copies or moves a folder tree between providers using a fixed pool of workers fed from a
+    single queue.  The concurrency budget covers the whole tree, so files in deeply nested
+    folders are transferred alongside their aunts and cousins instead of one folder at a time.
+
+    Files, and folders that can be handled with an intra copy or move, are passed to ``func``.
+    Any other folder is created on the destination and its children are queued.
+
+    Transient failures (connection errors and the status codes in ``settings.OP_RETRY_ON``) are
+    retried per item.  Any other error is fatal: all outstanding work is cancelled and the error
+    is raised from :meth:`run`.
+
+    :param coroutine func: The bound copy or move method of the source provider
+    :param BaseProvider src_provider: The provider to transfer from
+    :param BaseProvider dest_provider: The provider to transfer to
+    :param int concurrency: The number of items transferred at once
+    :param int retries: How many times a failing item is retried
+
+    While running, the transfer's :attr:`stats` are listed by :func:`stats`.
+    """
+
+    def __init__(self, func, src_provider, dest_provider, concurrency=None, retries=None):
+        self.func = func
+        self.src_provider = src_provider
+        self.dest_provider = dest_provider
+        self.can_intra = getattr(src_provider, 'can_intra_' + func.__name__)
+        self.concurrency = concurrency or settings.OP_CONCURRENCY
+        self.retries = settings.OP_RETRIES if retries is None else retries
+
+        self.queue = asyncio.Queue()
+        self.total = 0
+        self.completed = 0
+        self.retried = 0
+
+    async def run(self, src_path, dest_path):
+        """Transfer the contents of ``src_path`` into ``dest_path``, which will be created.
+
+        :rtype: :class:`waterbutler.core.metadata.BaseFolderMetadata`
+        """
+        _RUNNING.add(self)
+        try:
+            folder = await self._create_folder(src_path, dest_path)
+
+            workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+            finished = asyncio.ensure_future(self.queue.join())
+
+            try:
+                await asyncio.wait(workers + [finished], return_when=asyncio.FIRST_COMPLETED)
+                # Workers only ever stop by raising
+                for worker in workers:
+                    if worker.done():
+                        worker.result()
+            finally:
+                for future in workers + [finished]:
+                    future.cancel()
+        finally:
+            _RUNNING.discard(self)
+            logger.info('Transferred {completed} of {total} items into {!r}, {retried} retried'.format(
+                dest_path, **self.stats
+            ))
+
+        return folder
+
+    @property
+    def stats(self):
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'retried': self.retried,
+        }
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self._transfer(item)
+            finally:
+                self.queue.task_done()
+
+    async def _transfer(self, item):
+        while True:
+            item.attempts += 1
+            try:
+                if item.src_path is None or item.attempts > 1:
+                    # A failed attempt may have left something behind on the destination
+                    self.dest_provider.invalidate_metadata()
+                    item.src_path = await self.src_provider.revalidate_path(item.src_parent, item.name, folder=item.is_folder)
+                    item.dest_path = await self.dest_provider.revalidate_path(item.dest_parent, item.name, folder=item.is_folder)
+                src_path, dest_path = item.src_path, item.dest_path
+
+                if item.is_folder and not self.can_intra(self.dest_provider, src_path):
+                    metadata = await self._create_folder(src_path, dest_path)
+                else:
+                    metadata, _ = await self.func(self.dest_provider, src_path, dest_path, handle_naming=False)
+                break
+            except (exceptions.ProviderError, aiohttp.errors.ClientError, asyncio.TimeoutError) as e:
+                if item.attempts > self.retries:
+                    raise
+                # Connection errors and timeouts are always transient, provider errors only
+                # for some statuses
+                if isinstance(e, exceptions.ProviderError) and e.code not in settings.OP_RETRY_ON:
+                    raise
+                self.retried += 1
+                logger.warning('Transfer of {!r} failed with {!r}, attempt {} of {}'.format(
+                    item, e, item.attempts, self.retries + 1
+                ))
+                await asyncio.sleep(settings.OP_RETRY_BACKOFF * item.attempts)
+
+        item.folder.children[item.index] = metadata
+        self.completed += 1
+
+        logger.debug('Transferred {} of {} items'.format(self.completed, self.total))
+
+    async def _create_folder(self, src_path, dest_path):
+        """Create ``dest_path`` and queue up the children of ``src_path`` to be transferred into
+        it.  Returns the new folder's metadata, its children filled in as they complete.
+        """
+        folder = await self.dest_provider.create_folder(dest_path, folder_precheck=False)
+        # Any cached listing of the parent predates the folder
+        self.dest_provider.invalidate_metadata()
+        dest_path = await self.dest_provider.revalidate_path(dest_path.parent, dest_path.name, folder=dest_path.is_dir)
+
+        items = await self.src_provider.cached_metadata(src_path)
+        folder.children = [None] * len(items)
+        self.total += len(items)
+
+        # Resolve every child from one listing of each side, rather than one lookup per child
+        children = [(metadata.name, metadata.is_folder) for metadata in items]
+        src_paths = await self.src_provider.revalidate_paths(src_path, children)
+        dest_paths = await self.dest_provider.revalidate_paths(dest_path, children)
+
+        for index, metadata in enumerate(items):
+            self.queue.put_nowait(TransferItem(
+                src_path, dest_path, metadata, folder, index,
+                src_path=src_paths[index], dest_path=dest_paths[index],
+            ))
+
+        return folder
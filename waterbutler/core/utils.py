@@ -4,15 +4,15 @@ import time
 import asyncio
 import logging
 import functools
+import collections
 import dateutil.parser
 # from concurrent.futures import ProcessPoolExecutor  TODO Get this working
 
-import aiohttp
 from raven import Client
-from stevedore import driver
 
 from waterbutler import settings
-from waterbutler.core import exceptions
+from waterbutler.core import registry
+from waterbutler.core import connections
 from waterbutler.tasks import settings as task_settings
 from waterbutler.server import settings as server_settings
 from waterbutler.core.signing import Signer
@@ -37,17 +37,7 @@ def make_provider(name, auth, credentials, settings, **kwargs):
 
     :rtype: :class:`waterbutler.core.provider.BaseProvider`
     """
-    try:
-        manager = driver.DriverManager(
-            namespace='waterbutler.providers',
-            name=name,
-            invoke_on_load=True,
-            invoke_args=(auth, credentials, settings),
-        )
-    except RuntimeError:
-        raise exceptions.ProviderNotFound(name)
-
-    return manager.driver
+    return registry.get(name)(auth, credentials, settings)
 
 
 def as_task(func):
@@ -97,7 +87,7 @@ def async_retry(retries=5, backoff=1, exceptions=(Exception, ), raven=client):
 
 async def send_signed_request(method, url, payload):
     message, signature = signer.sign_payload(payload)
-    return (await aiohttp.request(
+    return (await connections.request(
         method, url,
         data=json.dumps({
             'payload': message.decode(),
@@ -152,29 +142,145 @@ def normalize_datetime(date_string):
 
 
 class ZipStreamGenerator:
-    def __init__(self, provider, parent_path, *metadata_objs):
+    """Walks a folder tree and yields a ``(name, stream, metadata)`` triple for every file in
+    it, for :class:`waterbutler.core.streams.ZipStreamReader` to compress.
+
+    Files are always yielded breadth first, in the order the provider lists them, however long
+    each listing or download takes.  Work is started ahead of the compressor: each folder is
+    listed as soon as it is found, up to ``concurrency`` listings at a time, and up to
+    ``prefetch`` downloads are opened while the current file is still being compressed.
+
+    :param BaseProvider provider: The provider to read from
+    :param WaterButlerPath parent_path: The folder that names in the archive are relative to
+    :param metadata_objs: The metadata of the children of ``parent_path`` to include
+    :param int prefetch: The number of downloads to open ahead of the compressor
+    :param int concurrency: The number of folders listed at once
+    """
+
+    def __init__(self, provider, parent_path, *metadata_objs, prefetch=None, concurrency=None):
         self.provider = provider
         self.parent_path = parent_path
-        self.remaining = [
-            (parent_path, metadata)
-            for metadata in metadata_objs
-        ]
+        self.metadata_objs = metadata_objs
+        self.prefetch = max(prefetch or settings.ZIP_PREFETCH, 1)
+        self.concurrency = concurrency or settings.ZIP_LISTING_CONCURRENCY
+
+        self._files = None
+        self._opened = None
+        self._producer = None
+        self._download_slots = None
+        self._listing_limit = None
+        self._listings = []
 
     async def __aiter__(self):
         return self
 
     async def __anext__(self):
-        if not self.remaining:
+        if self._producer is None:
+            self._opened = asyncio.Queue()
+            self._download_slots = asyncio.Semaphore(self.prefetch)
+            self._producer = asyncio.ensure_future(self._produce())
+
+        item = await self._opened.get()
+        if item is None:
+            # Keep saying so if asked again
+            self._opened.put_nowait(None)
             raise StopAsyncIteration
-        path = self.provider.path_from_metadata(*self.remaining.pop(0))
-        if path.is_dir:
-            self.remaining.extend([
-                (path, item) for item in
-                await self.provider.metadata(path)
-            ])
-            return await self.__anext__()
-
-        return path.path.replace(self.parent_path.path, ''), await self.provider.download(path)
+
+        name, download, metadata = item
+        self._download_slots.release()
+        try:
+            return name, (await download), metadata
+        except Exception:
+            self.close()
+            raise
+
+    async def walk(self):
+        """Lists the whole tree up front, instead of as the archive is streamed.  Files are then
+        streamed from this listing, in the same order, without listing anything again.
+
+        :rtype: list of ``(name, metadata)`` pairs, one for every file
+        """
+        files = []
+        remaining = collections.deque(self._entries(self.parent_path, self.metadata_objs))
+
+        try:
+            while remaining:
+                path, metadata, listing = remaining.popleft()
+                if listing is not None:
+                    remaining.extend(await listing)
+                else:
+                    files.append((path, metadata, None))
+        except Exception:
+            self.close()
+            raise
+
+        self._files = files
+        return [(self._name(path), metadata) for path, metadata, _ in files]
+
+    def close(self):
+        """Cancel any listings and downloads that have been started but not yet handed out"""
+        if self._producer is not None:
+            self._producer.cancel()
+
+        for listing in self._listings:
+            listing.cancel()
+
+        while self._opened is not None and not self._opened.empty():
+            item = self._opened.get_nowait()
+            if item is not None:
+                item[1].cancel()
+
+    async def _produce(self):
+        try:
+            if self._files is not None:
+                remaining = collections.deque(self._files)
+            else:
+                remaining = collections.deque(self._entries(self.parent_path, self.metadata_objs))
+
+            while remaining:
+                path, metadata, listing = remaining.popleft()
+                if listing is not None:
+                    remaining.extend(await listing)
+                    continue
+
+                await self._download_slots.acquire()
+                download = asyncio.ensure_future(self.provider.download(path))
+                self._opened.put_nowait((self._name(path), download, metadata))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Hand the error to the consumer in order, after everything before it
+            failed = asyncio.Future()
+            failed.set_exception(e)
+            await self._download_slots.acquire()
+            self._opened.put_nowait(('', failed, None))
+
+        self._opened.put_nowait(None)
+
+    def _name(self, path):
+        return path.path.replace(self.parent_path.path, '')
+
+    def _entries(self, parent, metadata_objs):
+        """Builds ``(path, metadata, listing)`` entries for each of ``metadata_objs``, starting
+        the listing of every folder among them straight away.  ``listing`` is None for files.
+        """
+        if self._listing_limit is None:
+            self._listing_limit = asyncio.Semaphore(self.concurrency)
+
+        entries = []
+        for metadata in metadata_objs:
+            path = self.provider.path_from_metadata(parent, metadata)
+            listing = None
+            if path.is_dir:
+                listing = asyncio.ensure_future(self._list(path))
+                self._listings.append(listing)
+            entries.append((path, metadata, listing))
+        return entries
+
+    async def _list(self, path):
+        async with self._listing_limit:
+            children = await self.provider.metadata(path)
+        return self._entries(path, children)
 
 
 class RequestHandlerContext:
@@ -144,6 +144,45 @@ class BoxProvider(provider.BaseProvider):
 
         return base.child(name, _id=_id, folder=folder)
 
+    async def revalidate_paths(self, base, children):
+        entries, offset = [], 0
+        while True:
+            query = {'fields': 'id,name,type', 'limit': 1000}
+            if offset:
+                query['offset'] = offset
+            async with self.request(
+                'GET',
+                self.build_url('folders', base.identifier, 'items', **query),
+                expects=(200,),
+                throws=exceptions.ProviderError
+            ) as resp:
+                data = await resp.json()
+
+            entries.extend(data['entries'])
+            offset += len(data['entries'])
+            if not data['entries'] or offset >= data.get('total_count', 0):
+                break
+
+        # Keep the first match, as revalidate_path does
+        by_name, by_name_and_type = {}, {}
+        for entry in entries:
+            lower_name = entry['name'].lower()
+            by_name.setdefault(lower_name, entry)
+            by_name_and_type.setdefault((lower_name, entry['type'] == 'folder'), entry)
+
+        paths = []
+        for path, folder in children:
+            if folder is None:
+                item = by_name.get(path.lower())
+            else:
+                item = by_name_and_type.get((path.lower(), folder))
+
+            if item is None:
+                paths.append(base.child(path, _id=None, folder=folder))
+            else:
+                paths.append(base.child(path, _id=item['id'], folder=item['type'] == 'folder'))
+        return paths
+
     def can_duplicate_names(self):
         return False
 
@@ -2,12 +2,12 @@ import http
 import json
 import asyncio
 
-import aiohttp
 import oauthlib.oauth1
 
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.figshare import metadata
@@ -45,22 +45,41 @@ class BaseFigshareProvider(provider.BaseProvider):
         return (await super().make_request(method, signed_uri, *args, **kwargs))
 
     async def revalidate_path(self, base, path, folder=False):
-        wbpath = base
         assert base.is_dir
         path = path.strip('/')
 
         for entry in (await self.metadata(base)):
             if entry.name == path:
-                # base may when refering to a file will have a article id as well
-                # This handles that case so the resulting path is actually correct
-                names, ids = map(lambda x: getattr(entry, x).strip('/').split('/'), ('materialized_path', 'path'))
-                while names and ids:
-                    wbpath = wbpath.child(names.pop(0), _id=ids.pop(0))
-                wbpath._is_folder = entry.kind == 'folder'
-                return wbpath
+                return self._path_from_entry(base, entry)
 
         return base.child(path, folder=False)
 
+    async def revalidate_paths(self, base, children):
+        assert base.is_dir
+
+        found = {}
+        for entry in (await self.metadata(base)):
+            found.setdefault(entry.name, entry)
+
+        paths = []
+        for path, folder in children:
+            path = path.strip('/')
+            if path in found:
+                paths.append(self._path_from_entry(base, found[path]))
+            else:
+                paths.append(base.child(path, folder=False))
+        return paths
+
+    def _path_from_entry(self, base, entry):
+        wbpath = base
+        # base may when refering to a file will have a article id as well
+        # This handles that case so the resulting path is actually correct
+        names, ids = map(lambda x: getattr(entry, x).strip('/').split('/'), ('materialized_path', 'path'))
+        while names and ids:
+            wbpath = wbpath.child(names.pop(0), _id=ids.pop(0))
+        wbpath._is_folder = entry.kind == 'folder'
+        return wbpath
+
     def can_duplicate_names(self):
         return True
 
@@ -307,7 +326,7 @@ class FigshareArticleProvider(BaseFigshareProvider):
                 'Cannot download private files',
                 code=http.client.FORBIDDEN,
             )
-        resp = await aiohttp.request('GET', download_url)
+        resp = await connections.request('GET', download_url)
         return streams.ResponseStreamReader(resp)
 
     async def delete(self, path, **kwargs):
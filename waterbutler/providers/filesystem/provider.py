@@ -53,8 +53,7 @@ class FileSystemProvider(provider.BaseProvider):
         shutil.move(src_path.full_path, dest_path.full_path)
         return (await dest_provider.metadata(dest_path)), not exists
 
-    async def download(self, path, revision=None, **kwargs):
-        # TODO implement range requests
+    async def download(self, path, revision=None, range=None, **kwargs):
         if not os.path.exists(path.full_path):
             raise exceptions.DownloadError(
                 'Could not retrieve file \'{0}\''.format(path),
@@ -62,7 +61,16 @@ class FileSystemProvider(provider.BaseProvider):
             )
 
         file_pointer = open(path.full_path, 'rb')
-        return streams.FileStreamReader(file_pointer)
+        stream = streams.FileStreamReader(file_pointer, range=range)
+
+        if not stream.satisfiable:
+            stream.close()
+            raise exceptions.DownloadError(
+                'Requested range not satisfiable for \'{0}\''.format(path),
+                code=416,
+            )
+
+        return stream
 
     async def upload(self, stream, path, **kwargs):
         created = not (await self.exists(path))
@@ -1,9 +1,11 @@
 import copy
 import json
+import asyncio
 
 import furl
 
 from waterbutler.core import path
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
@@ -19,6 +21,16 @@ from waterbutler.providers.github.exceptions import GitHubUnsupportedRepoError
 
 GIT_EMPTY_SHA = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
 
+# Trees and blobs never change, so are shared by every request in the process.  They're keyed
+# by repo as well as sha, and every request fetches its repo first, with its own credentials.
+_OBJECTS = cache.ObjectCache(
+    settings.OBJECT_CACHE_MAX_SIZE,
+    spill_path=settings.OBJECT_CACHE_SPILL_PATH,
+    spill_max_size=settings.OBJECT_CACHE_SPILL_MAX_SIZE,
+)
+# Branch heads do change, they're cached per credentials for a few seconds
+_BRANCHES = cache.MemoryBackend(settings.BRANCH_CACHE_MAX_ENTRIES)
+
 
 class GitHubPathPart(path.WaterButlerPathPart):
     def increment_name(self, _id=None):
@@ -59,10 +71,19 @@ class GitHubProvider(provider.BaseProvider):
       a file that is larger than 1Mb will result in a error response directing you to the ``blob``
       endpoint.  A recursive tree fetch may be used instead.
 
-    * The tree endpoint truncates results after a large number of files.  It does not provide a way
-      to page through the tree.  Since move, copy, and folder delete operations rely on whole-tree
-      replacement, they cannot be reliably supported for large repos.  Attempting to use them will
-      throw a 501 Not Implemented error.
+    * The tree endpoint truncates recursive results after a large number of files.  It does not
+      provide a way to page through the tree, so a truncated tree is walked one folder at a time
+      instead.  Lookups only descend through the folders along the path, see
+      :func:`_find_tree_entry`.  Move and copy rely on whole-tree replacement, and fetch every
+      folder, see :func:`_walk_tree`.  A single folder too large to list still throws a 501 Not
+      Implemented error.
+
+    * The repo, branches, contents, and file histories are requested conditionally, see
+      :func:`BaseProvider.make_request`, as GitHub doesn't count a 304 against the rate limit.
+
+    * Trees and blobs are immutable, and are cached by sha for the life of the process.  Branch
+      heads are cached for ``settings.BRANCH_CACHE_TTL`` seconds, and forgotten as soon as this
+      provider moves one.  Writes made elsewhere may go unseen for that long.
     """
     NAME = 'github'
     BASE_URL = settings.BASE_URL
@@ -174,6 +195,9 @@ class GitHubProvider(provider.BaseProvider):
         data = await self.metadata(path, revision=revision)
         file_sha = path.identifier[1] or data.extra['fileSha']
 
+        if data.size is not None and int(data.size) <= settings.BLOB_CACHE_MAX_SIZE:
+            return streams.StringStream(await self._fetch_blob(file_sha))
+
         resp = await self.make_request(
             'GET',
             self.build_repo_url('git', 'blobs', file_sha),
@@ -208,6 +232,7 @@ class GitHubProvider(provider.BaseProvider):
                 )
                 data = await resp.json()
                 latest_sha = data['commit']['sha']
+                self._invalidate_branches()
         else:
             latest_sha = await self._get_latest_sha(ref=path.identifier[0])
 
@@ -239,6 +264,64 @@ class GitHubProvider(provider.BaseProvider):
             'size': stream.size,
         }, commit=commit), not exists
 
+    def can_batch_upload(self):
+        return True
+
+    async def upload_batch(self, files, path, message=None, **kwargs):
+        """Uploads every file from ``files`` into the folder ``path`` as a single commit.  Blobs
+        are created as files arrive, up to ``settings.BATCH_UPLOAD_CONCURRENCY`` at a time, then
+        one tree is built on top of the head of the branch, committed, and the branch moved to
+        the commit.  git has no empty folders, so nor does the upload.
+
+        :param files: An async iterator of ``(name, stream)`` pairs, see
+            :func:`BaseProvider.upload_batch`
+        :param GitHubPath path: The folder to upload into
+        :param str message: The commit message
+        """
+        assert self.name is not None
+        assert self.email is not None
+
+        exists = path.is_root or bool(await self.exists(path))
+        blobs = await self._create_blobs(files)
+
+        if not blobs:
+            if exists:
+                return GitHubFolderTreeMetadata({'path': path.path.strip('/')}), False
+            return (await self.create_folder(path, message=message)), True
+
+        branch = path.identifier[0]
+        latest_sha = await self._get_latest_sha(ref=branch)
+        tree = await self._create_tree({
+            'base_tree': latest_sha,
+            'tree': [{
+                'path': path.path + name,
+                'mode': '100644',
+                'type': 'blob',
+                'sha': blob['sha'],
+            } for name, blob, _ in blobs],
+        })
+
+        commit = await self._create_commit({
+            'tree': tree['sha'],
+            'parents': [latest_sha],
+            'committer': self.committer,
+            'message': message or settings.UPLOAD_FILES_MESSAGE,
+        })
+
+        await self._update_ref(commit['sha'], ref=branch)
+
+        folder = GitHubFolderTreeMetadata({'path': path.path.strip('/')}, commit=commit)
+        folder.children = [
+            GitHubFileTreeMetadata({
+                'path': path.path + name,
+                'sha': blob['sha'],
+                'size': size,
+            }, commit=commit)
+            for name, blob, size in blobs
+        ]
+
+        return folder, not exists
+
     async def delete(self, path, sha=None, message=None, branch=None,
                confirm_delete=0, **kwargs):
         """Delete file, folder, or provider root contents
@@ -316,6 +399,7 @@ class GitHubProvider(provider.BaseProvider):
         )
 
         data = await resp.json()
+        self._invalidate_branches()
 
         if resp.status in (422, 409):
             if resp.status == 409 or data.get('message') == 'Invalid request.\n\n"sha" wasn\'t supplied.':
@@ -352,6 +436,7 @@ class GitHubProvider(provider.BaseProvider):
             throws=exceptions.DeleteError,
         )
         await resp.release()
+        self._invalidate_branches()
 
     async def _delete_folder(self, path, message=None, **kwargs):
         branch_data = await self._fetch_branch(path.identifier[0])
@@ -451,6 +536,7 @@ class GitHubProvider(provider.BaseProvider):
             throws=exceptions.DeleteError,
         )
         await resp.release()
+        self._invalidate_branches()
 
     async def _delete_root_folder_contents(self, path, message=None, **kwargs):
         """Delete the contents of the root folder.
@@ -490,13 +576,25 @@ class GitHubProvider(provider.BaseProvider):
             expects=(200, ),
             throws=exceptions.DeleteError,
         )
+        self._invalidate_branches()
 
     async def _fetch_branch(self, branch):
+        if settings.BRANCH_CACHE_TTL > 0:
+            try:
+                return copy.deepcopy(_BRANCHES.get(self.metadata_cache.namespace, branch))
+            except KeyError:
+                pass
+
         resp = await self.make_request(
             'GET',
-            self.build_repo_url('branches', branch)
+            self.build_repo_url('branches', branch),
+            conditional=True,
         )
-        return (await resp.json())
+        data = await resp.json()
+
+        if resp.status == 200 and settings.BRANCH_CACHE_TTL > 0:
+            _BRANCHES.set(self.metadata_cache.namespace, branch, copy.deepcopy(data), settings.BRANCH_CACHE_TTL)
+        return data
 
     async def _fetch_contents(self, path, ref=None):
         url = furl.furl(self.build_repo_url('contents', path.path))
@@ -506,7 +604,8 @@ class GitHubProvider(provider.BaseProvider):
             'GET',
             url.url,
             expects=(200, ),
-            throws=exceptions.MetadataError
+            throws=exceptions.MetadataError,
+            conditional=True,
         )
         return (await resp.json())
 
@@ -515,11 +614,43 @@ class GitHubProvider(provider.BaseProvider):
             'GET',
             self.build_repo_url(),
             expects=(200, ),
-            throws=exceptions.MetadataError
+            throws=exceptions.MetadataError,
+            conditional=True,
         )
         return (await resp.json())
 
     async def _fetch_tree(self, sha, recursive=False):
+        """Fetches a tree, from the object cache if it's there.  Recursive trees too large for
+        GitHub to return are walked instead, see :func:`_walk_tree`.  Callers are free to modify
+        what is returned.
+        """
+        tree = await self._get_tree(sha, recursive=recursive)
+
+        if tree is None:
+            if not recursive:
+                raise GitHubUnsupportedRepoError
+            tree = await self._walk_tree(sha)
+
+        return tree
+
+    async def _get_tree(self, sha, recursive=False):
+        """Fetches a tree as GitHub returns it, or None if it was truncated.  The tree is cached as
+        the body of the response, and trees known to be truncated aren't asked for again.
+        """
+        key = ('tree', self.owner, self.repo, sha, bool(recursive))
+        truncated_key = ('truncated', ) + key[1:]
+        if self.is_sha(sha):
+            try:
+                return json.loads((await _OBJECTS.get(key)).decode('utf-8'))
+            except KeyError:
+                pass
+            try:
+                await _OBJECTS.get(truncated_key)
+            except KeyError:
+                pass
+            else:
+                return None
+
         url = furl.furl(self.build_repo_url('git', 'trees', sha))
         if recursive:
             url.args.update({'recursive': 1})
@@ -529,26 +660,108 @@ class GitHubProvider(provider.BaseProvider):
             expects=(200, ),
             throws=exceptions.MetadataError
         )
-        tree = await resp.json()
+        body = await resp.read()
+        tree = json.loads(body.decode('utf-8'))
 
         if tree['truncated']:
-            raise GitHubUnsupportedRepoError
+            if self.is_sha(sha):
+                await _OBJECTS.set(truncated_key, b'')
+            return None
+
+        if self.is_sha(sha):
+            await _OBJECTS.set(key, body)
 
         return tree
 
-    async def _search_tree_for_path(self, path, tree_sha, recursive=True):
-        """Search through the given tree for an entity matching the name and type of `path`.
+    async def _walk_tree(self, sha):
+        """Builds what a recursive fetch of the tree would return, one folder at a time, fetching
+        up to ``settings.TREE_WALK_CONCURRENCY`` folders at once.  The result is cached as if it
+        was the recursive tree.
         """
-        tree = await self._fetch_tree(tree_sha, recursive=True)
+        limit = asyncio.Semaphore(settings.TREE_WALK_CONCURRENCY)
+
+        async def walk(tree_sha, prefix):
+            async with limit:
+                tree = await self._fetch_tree(tree_sha)
+
+            items = [dict(item, path=prefix + item['path']) for item in tree['tree']]
+            subtrees = await asyncio.gather(*[
+                walk(item['sha'], item['path'] + '/')
+                for item in items
+                if item['type'] == 'tree'
+            ])
+
+            # Each folder is followed by its contents, as in a recursive tree
+            subtrees = iter(subtrees)
+            entries = []
+            for item in items:
+                entries.append(item)
+                if item['type'] == 'tree':
+                    entries.extend(next(subtrees))
+            return entries
+
+        tree = {'sha': sha, 'tree': await walk(sha, ''), 'truncated': False}
+
+        if self.is_sha(sha):
+            key = ('tree', self.owner, self.repo, sha, True)
+            await _OBJECTS.set(key, json.dumps(tree).encode('utf-8'))
 
-        if tree['truncated']:
-            raise GitHubUnsupportedRepoError
+        return tree
+
+    async def _find_tree_entry(self, tree_sha, path):
+        """The entry at ``path`` within a tree, as it appears in a recursive tree, or None.  Trees
+        too large for a recursive fetch are searched through the folders along ``path`` only.
+
+        :param str tree_sha: The sha of the tree to search
+        :param str path: A GitHub path, without leading or trailing slashes
+        :rtype: dict or None
+        """
+        tree = await self._get_tree(tree_sha, recursive=True)
+        if tree is not None:
+            return next((item for item in tree['tree'] if item['path'] == path), None)
+
+        entry = None
+        for name in path.split('/'):
+            if entry is not None:
+                if entry['type'] != 'tree':
+                    return None
+                tree_sha = entry['sha']
+
+            tree = await self._fetch_tree(tree_sha)
+            entry = next((item for item in tree['tree'] if item['path'] == name), None)
+            if entry is None:
+                return None
+
+        return dict(entry, path=path)
+
+    async def _fetch_blob(self, sha):
+        """Fetches the content of a blob, from the object cache if it's there"""
+        key = ('blob', self.owner, self.repo, sha)
+        try:
+            return (await _OBJECTS.get(key))
+        except KeyError:
+            pass
 
+        resp = await self.make_request(
+            'GET',
+            self.build_repo_url('git', 'blobs', sha),
+            headers={'Accept': 'application/vnd.github.v3.raw'},
+            expects=(200, ),
+            throws=exceptions.DownloadError,
+        )
+        content = await resp.read()
+
+        await _OBJECTS.set(key, content)
+        return content
+
+    async def _search_tree_for_path(self, path, tree_sha, recursive=True):
+        """Search through the given tree for an entity matching the name and type of `path`.
+        """
         implicit_type = 'tree' if path.endswith('/') else 'blob'
 
-        for entity in tree['tree']:
-            if entity['path'] == path.strip('/') and entity['type'] == implicit_type:
-                return entity
+        entity = await self._find_tree_entry(tree_sha, path.strip('/'))
+        if entity is not None and entity['type'] == implicit_type:
+            return entity
 
         raise exceptions.NotFoundError(str(path))
 
@@ -575,10 +788,7 @@ class GitHubProvider(provider.BaseProvider):
         return (await resp.json())
 
     async def _create_blob(self, stream):
-        blob_stream = streams.JSONStream({
-            'encoding': 'base64',
-            'content': streams.Base64EncodeStream(stream),
-        })
+        blob_stream = streams.Base64JSONStream(stream, fields={'encoding': 'base64'})
 
         resp = await self.make_request(
             'POST',
@@ -593,6 +803,68 @@ class GitHubProvider(provider.BaseProvider):
         )
         return (await resp.json())
 
+    def invalidate_metadata(self):
+        super().invalidate_metadata()
+        self._invalidate_branches()
+
+    def _invalidate_branches(self):
+        """Forget the cached branch heads, called whenever this provider moves one"""
+        _BRANCHES.invalidate(self.metadata_cache.namespace)
+
+    async def _create_blobs(self, files):
+        """Creates a blob from each file of a batch upload, up to
+        ``settings.BATCH_UPLOAD_CONCURRENCY`` at a time.  The next file is asked for while the
+        last ones are still uploading, unless one of them has failed.
+
+        :rtype: list of ``(name, blob, size)`` triples, in the order of ``files``
+        """
+        limit = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+        failed = asyncio.Future()
+        created = []
+
+        async def create(stream):
+            try:
+                return (await self._create_blob(stream))
+            except Exception as e:
+                if not failed.done():
+                    failed.set_result(e)
+                raise
+            finally:
+                limit.release()
+
+        try:
+            while True:
+                await limit.acquire()
+
+                # A file in a tar upload isn't handed out until the last has been read, which
+                # won't happen if its upload failed
+                following = asyncio.ensure_future(files.__anext__())
+                await asyncio.wait([following, failed], return_when=asyncio.FIRST_COMPLETED)
+                if failed.done():
+                    following.cancel()
+                    raise failed.result()
+
+                try:
+                    name, stream, *_ = following.result()
+                except StopAsyncIteration:
+                    break
+                created.append((name, stream.size, asyncio.ensure_future(create(stream))))
+
+            blobs = []
+            for name, size, blob in created:
+                blobs.append((name, await blob, size))
+            return blobs
+        except Exception:
+            for _, _, blob in created:
+                if not blob.done():
+                    blob.cancel()
+                elif not blob.cancelled():
+                    # Already raised, or superseded by the error being raised
+                    blob.exception()
+            if hasattr(files, 'close'):
+                files.close()
+            raise
+
     def _is_sha(self, ref):
         # sha1 is always 40 characters in length
         try:
@@ -641,6 +913,7 @@ class GitHubProvider(provider.BaseProvider):
             self.build_repo_url('commits', path=path.path, sha=revision or ref or path.identifier[0]),
             expects=(200, ),
             throws=exceptions.MetadataError,
+            conditional=True,
         )
 
         commits = await resp.json()
@@ -649,14 +922,9 @@ class GitHubProvider(provider.BaseProvider):
             raise exceptions.NotFoundError(str(path))
 
         latest = commits[0]
-        tree = await self._fetch_tree(latest['commit']['tree']['sha'], recursive=True)
+        data = await self._find_tree_entry(latest['commit']['tree']['sha'], path.path)
 
-        try:
-            data = next(
-                x for x in tree['tree']
-                if x['path'] == path.path
-            )
-        except StopIteration:
+        if data is None:
             raise exceptions.NotFoundError(str(path))
 
         if isinstance(data, list):
@@ -687,6 +955,7 @@ class GitHubProvider(provider.BaseProvider):
             expects=(200, ),
             throws=exceptions.ProviderError
         )
+        self._invalidate_branches()
         return (await resp.json())
 
     async def _do_intra_move_or_copy(self, src_path, dest_path, is_copy):
@@ -773,6 +1042,7 @@ class GitHubProvider(provider.BaseProvider):
             throws=exceptions.DeleteError,
         )
         await resp.release()
+        self._invalidate_branches()
 
         if dest_path.is_file:
             assert len(blobs) == 1, 'Destination file should have exactly one candidate'
@@ -14,4 +14,23 @@ COPY_MESSAGE = config.get('COPY_MESSAGE', 'Copied on behalf of WaterButler')
 DELETE_FILE_MESSAGE = config.get('DELETE_FILE_MESSAGE', 'File deleted on behalf of WaterButler')
 UPDATE_FILE_MESSAGE = config.get('UPDATE_FILE_MESSAGE', 'File updated on behalf of WaterButler')
 UPLOAD_FILE_MESSAGE = config.get('UPLOAD_FILE_MESSAGE', 'File uploaded on behalf of WaterButler')
+UPLOAD_FILES_MESSAGE = config.get('UPLOAD_FILES_MESSAGE', 'Files uploaded on behalf of WaterButler')
 DELETE_FOLDER_MESSAGE = config.get('DELETE_FOLDER_MESSAGE', 'Folder deleted on behalf of WaterButler')
+
+# Trees and blobs are cached by sha for the life of the process, see GitHubProvider._fetch_tree
+OBJECT_CACHE_MAX_SIZE = config.get('OBJECT_CACHE_MAX_SIZE', 64 * 1024 * 1024)
+# A directory for objects that don't fit in memory, None to not spill to disk
+OBJECT_CACHE_SPILL_PATH = config.get('OBJECT_CACHE_SPILL_PATH', None)
+OBJECT_CACHE_SPILL_MAX_SIZE = config.get('OBJECT_CACHE_SPILL_MAX_SIZE', 1024 * 1024 * 1024)
+# Larger blobs are streamed on download, never cached
+BLOB_CACHE_MAX_SIZE = config.get('BLOB_CACHE_MAX_SIZE', 1024 * 1024)
+
+# Seconds the head of a branch is cached for, 0 to always ask GitHub
+BRANCH_CACHE_TTL = config.get('BRANCH_CACHE_TTL', 10)
+BRANCH_CACHE_MAX_ENTRIES = config.get('BRANCH_CACHE_MAX_ENTRIES', 10000)
+
+# Folders fetched at once when walking a tree too large for a recursive fetch
+TREE_WALK_CONCURRENCY = config.get('TREE_WALK_CONCURRENCY', 8)
+
+# Blobs created at once by a batch upload
+BATCH_UPLOAD_CONCURRENCY = config.get('BATCH_UPLOAD_CONCURRENCY', 8)
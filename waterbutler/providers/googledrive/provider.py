@@ -103,6 +103,59 @@ class GoogleDriveProvider(provider.BaseProvider):
         _id, name, mime = list(map(parts[-1].__getitem__, ('id', 'title', 'mimeType')))
         return base.child(name, _id=_id, folder='folder' in mime)
 
+    async def revalidate_paths(self, base, children):
+        if base.identifier is None:
+            return await super().revalidate_paths(base, children)
+
+        async with self.request(
+            'GET',
+            self.build_url('files', q=self._build_query(base.identifier),
+                           fields='items(id,title,mimeType),nextPageToken', maxResults=1000),
+            expects=(200, ),
+            throws=exceptions.MetadataError,
+        ) as resp:
+            data = await resp.json()
+
+        # A truncated listing can't prove that a child doesn't exist
+        complete = 'nextPageToken' not in data
+        found = {}
+        for item in data['items']:
+            found.setdefault((item['title'], item['mimeType'] == self.FOLDER_MIME_TYPE), item)
+
+        paths = []
+        for name, folder in children:
+            path = await self._revalidate_from_listing(base, name, folder, found, complete)
+            paths.append(path)
+        return paths
+
+    async def _revalidate_from_listing(self, base, name, folder, found, complete):
+        """Resolve one child of ``base`` the same way :meth:`revalidate_path` does, using a
+        listing of ``base`` instead of querying for it by title.
+        """
+        if '/' in name.lstrip('/') and '%' not in name:
+            name = parse.quote(name.lstrip('/'), safe='')
+
+        if '/' in name.strip('/'):
+            # Multi-part paths need a lookup per part
+            return await self.revalidate_path(base, name, folder=folder)
+
+        is_folder = bool(folder) or name.endswith('/')
+        title = parse.unquote(name.strip('/'))
+
+        item = found.get((title, is_folder))
+        if item is None:
+            stripped, ext = os.path.splitext(title)
+            if ext in ('.gdoc', '.gdraw', '.gslides', '.gsheet'):
+                title = stripped
+                item = found.get((title, is_folder))
+
+        if item is None:
+            if not complete:
+                return await self.revalidate_path(base, name, folder=folder)
+            return base.child(title, _id=None, folder=is_folder)
+
+        return base.child(item['title'], _id=item['id'], folder='folder' in item['mimeType'])
+
     def can_duplicate_names(self):
         return True
 
@@ -0,0 +1,153 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import threading
+
+from waterbutler.providers.osfstorage import settings
+
+
+logger = logging.getLogger(__name__)
+
+SHA256_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+
+class CompleteFileCache:
+    """Uploads leave a copy of every file in ``settings.FILE_PATH_COMPLETE``, named after its
+    sha256.  As the name is the hash of the content, a download of a file that is still there can
+    be served from disk, instead of from the storage provider.
+
+    Each hit bumps the file's modification time, so :meth:`evict` can delete the least recently
+    used files once the directory grows past ``max_size``.  Files used within ``min_age`` seconds
+    are kept, whatever the size, as the parity and backup tasks still read them after an upload.
+
+    :param str path: The directory holding the complete files
+    :param int max_size: The size in bytes to keep the directory under, None for no limit
+    :param int min_age: Seconds since last use before a file may be deleted
+    :param int evict_interval: Seconds between two scans of the directory, see :meth:`trim`
+    """
+
+    def __init__(self, path, max_size=None, min_age=0, evict_interval=0):
+        self.path = path
+        self.max_size = max_size
+        self.min_age = min_age
+        self.evict_interval = evict_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._last_eviction = None
+        self._lock = threading.Lock()
+
+    def lookup(self, name):
+        """The local path of the file whose sha256 is ``name``, marked as just used, or None if
+        it isn't there.
+
+        :param str name: The name of the file within the storage provider
+        :rtype: str or None
+        """
+        path = None
+        if SHA256_NAME.match(name):
+            path = os.path.join(self.path, name)
+            try:
+                os.utime(path)
+            except OSError:
+                path = None
+
+        with self._lock:
+            if path is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return path
+
+    def add(self, src, name):
+        """Moves the file ``src`` into the directory as ``name``.  A move across devices is a
+        copy, so the file is moved under a temporary name first, then renamed, so that
+        :meth:`lookup` never finds a partial file.  Blocks on the file system.
+
+        :param str src: The path of the file to move
+        :param str name: The file's sha256
+        :rtype: str, the file's new path
+        """
+        path = os.path.join(self.path, name)
+        partial = os.path.join(self.path, '{}.{}.partial'.format(name, uuid.uuid4()))
+
+        shutil.move(src, partial)
+        os.rename(partial, path)
+        return path
+
+    def evict(self):
+        """Deletes the least recently used files until the directory is within ``max_size``.
+        Blocks on the file system, see :meth:`trim`.
+
+        :rtype: list of the paths deleted
+        """
+        if self.max_size is None:
+            return []
+
+        files, total = [], 0
+        for entry in os.scandir(self.path):
+            # Parity files and anything else in the directory belong to someone else
+            if not SHA256_NAME.match(entry.name):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        cutoff = time.time() - self.min_age
+        deleted = []
+        for mtime, size, path in sorted(files):
+            if total <= self.max_size or mtime > cutoff:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Deleted by another worker sharing the directory
+                pass
+            else:
+                deleted.append(path)
+            total -= size
+
+        with self._lock:
+            self.evictions += len(deleted)
+        if deleted:
+            logger.info('Evicted {} files from {}'.format(len(deleted), self.path))
+        return deleted
+
+    async def trim(self):
+        """Runs :meth:`evict` in the executor, at most once every ``evict_interval`` seconds."""
+        if self.max_size is None:
+            return
+
+        now = time.monotonic()
+        if self._last_eviction is not None and now - self._last_eviction < self.evict_interval:
+            return
+        self._last_eviction = now
+
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self.evict)
+        except OSError as e:
+            logger.warning('Could not evict files from {}: {}'.format(self.path, e))
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+cache = CompleteFileCache(
+    settings.FILE_PATH_COMPLETE,
+    max_size=settings.COMPLETE_CACHE_MAX_SIZE,
+    min_age=settings.COMPLETE_CACHE_MIN_AGE,
+    evict_interval=settings.COMPLETE_CACHE_EVICT_INTERVAL,
+)
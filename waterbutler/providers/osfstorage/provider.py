@@ -1,8 +1,7 @@
 import os
 import json
 import uuid
-import shutil
-import hashlib
+import asyncio
 
 from waterbutler.core import utils
 from waterbutler.core import signing
@@ -13,6 +12,7 @@ from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.utils import RequestHandlerContext
 
 from waterbutler.providers.osfstorage import settings
+from waterbutler.providers.osfstorage.cache import cache
 from waterbutler.providers.osfstorage.tasks import backup
 from waterbutler.providers.osfstorage.tasks import parity
 from waterbutler.providers.osfstorage.metadata import OsfStorageFileMetadata
@@ -100,7 +100,7 @@ class OSFStorageProvider(provider.BaseProvider):
         try:
             data = next(
                 x for x in
-                await self.metadata(base)
+                await self.cached_metadata(base)
                 if x.name == path and
                 x.kind == ('folder' if folder else 'file')
             )
@@ -109,6 +109,22 @@ class OSFStorageProvider(provider.BaseProvider):
         except StopIteration:
             return base.child(path, folder=folder)
 
+    async def revalidate_paths(self, base, children):
+        assert base.is_dir
+
+        found = {}
+        for data in await self.cached_metadata(base):
+            found.setdefault((data.name, data.kind), data)
+
+        paths = []
+        for path, folder in children:
+            data = found.get((path, 'folder' if folder else 'file'))
+            if data is None:
+                paths.append(base.child(path, folder=folder))
+            else:
+                paths.append(base.child(data.name, _id=data.path.strip('/'), folder=folder))
+        return paths
+
     def make_provider(self, settings):
         """Requests on different files may need to use different providers,
         instances, e.g. when different files lives in different containers
@@ -230,8 +246,17 @@ class OSFStorageProvider(provider.BaseProvider):
         ) as resp:
             data = await resp.json()
 
-        provider = self.make_provider(data['settings'])
         name = data['data'].pop('name')
+
+        if settings.COMPLETE_CACHE:
+            local_path = cache.lookup(os.path.basename(data['data']['path']))
+            if local_path is not None:
+                stream = self._download_local(local_path, kwargs.get('range'))
+                if stream is not None:
+                    stream.name = kwargs.get('displayName', name)
+                    return stream
+
+        provider = self.make_provider(data['settings'])
         data['data']['path'] = await provider.validate_path('/' + data['data']['path'])
         download_kwargs = {}
         download_kwargs.update(kwargs)
@@ -247,15 +272,17 @@ class OSFStorageProvider(provider.BaseProvider):
         local_pending_path = os.path.join(settings.FILE_PATH_PENDING, pending_name)
         remote_pending_path = await provider.validate_path('/' + pending_name)
 
-        stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
-        stream.add_writer('sha1', streams.HashStreamWriter(hashlib.sha1))
-        stream.add_writer('sha256', streams.HashStreamWriter(hashlib.sha256))
+        # Hashed and written to disk in the executor, as the upload streams through
+        spool = streams.HashSpoolWriter(local_pending_path, 'md5', 'sha1', 'sha256')
+        stream.add_writer('spool', spool)
 
-        with open(local_pending_path, 'wb') as file_pointer:
-            stream.add_writer('file', file_pointer)
+        try:
             await provider.upload(stream, remote_pending_path, check_created=False, fetch_metadata=False, **kwargs)
+        finally:
+            await spool.close()
 
-        complete_name = stream.writers['sha256'].hexdigest
+        hashes = spool.hexdigests
+        complete_name = hashes['sha256']
         local_complete_path = os.path.join(settings.FILE_PATH_COMPLETE, complete_name)
         remote_complete_path = await provider.validate_path('/' + complete_name)
 
@@ -270,9 +297,10 @@ class OSFStorageProvider(provider.BaseProvider):
 
         metadata = metadata.serialized()
 
-        # Due to cross volume movement in unix we leverage shutil.move which properly handles this case.
-        # http://bytes.com/topic/python/answers/41652-errno-18-invalid-cross-device-link-using-os-rename#post157964
-        shutil.move(local_pending_path, local_complete_path)
+        # Moving across volumes copies the file, which is done off the event loop and under a
+        # temporary name, as downloads may be served from the complete directory
+        await asyncio.get_event_loop().run_in_executor(None, cache.add, local_pending_path, complete_name)
+        await cache.trim()
 
         async with self.signed_request(
             'POST',
@@ -283,11 +311,7 @@ class OSFStorageProvider(provider.BaseProvider):
                 'user': self.auth['id'],
                 'settings': self.settings['storage'],
                 'metadata': metadata,
-                'hashes': {
-                    'md5': stream.writers['md5'].hexdigest,
-                    'sha1': stream.writers['sha1'].hexdigest,
-                    'sha256': stream.writers['sha256'].hexdigest,
-                },
+                'hashes': hashes,
                 'worker': {
                     'host': os.uname()[1],
                     # TODO: Include additional information
@@ -300,6 +324,9 @@ class OSFStorageProvider(provider.BaseProvider):
             created = response.status == 201
             data = await response.json()
 
+        # Listings of the folder cached by revalidate_path are now out of date
+        self.invalidate_metadata()
+
         if settings.RUN_TASKS and data.pop('archive', True):
             parity.main(
                 local_complete_path,
@@ -354,6 +381,7 @@ class OSFStorageProvider(provider.BaseProvider):
             params={'user': self.auth['id']},
             expects=(200, )
         )).release()
+        self.invalidate_metadata()
 
     async def metadata(self, path, **kwargs):
         if path.identifier is None:
@@ -390,9 +418,11 @@ class OSFStorageProvider(provider.BaseProvider):
             expects=(201, )
         ) as resp:
             resp_json = await resp.json()
-            # save new folder's id into the WaterButlerPath object. logs will need it later.
-            path._parts[-1]._id = resp_json['data']['path'].strip('/')
-            return OsfStorageFolderMetadata(resp_json['data'], str(path))
+
+        self.invalidate_metadata()
+        # save new folder's id into the WaterButlerPath object. logs will need it later.
+        path._parts[-1]._id = resp_json['data']['path'].strip('/')
+        return OsfStorageFolderMetadata(resp_json['data'], str(path))
 
     async def _item_metadata(self, path, revision=None):
         async with self.signed_request(
@@ -418,6 +448,26 @@ class OSFStorageProvider(provider.BaseProvider):
                 ret.append(OsfStorageFileMetadata(item, str(path.child(item['name']))))
         return ret
 
+    def _download_local(self, local_path, range=None):
+        """Streams a file from the complete directory, or returns None if it was deleted since
+        it was looked up.
+        """
+        try:
+            file_pointer = open(local_path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        stream = streams.FileStreamReader(file_pointer, range=range)
+
+        if not stream.satisfiable:
+            stream.close()
+            raise exceptions.DownloadError(
+                'Requested range not satisfiable for \'{0}\''.format(os.path.basename(local_path)),
+                code=416,
+            )
+
+        return stream
+
     def _create_paths(self):
         try:
             os.mkdir(settings.FILE_PATH_PENDING)
@@ -46,3 +46,12 @@ PARITY_REDUNDANCY = config.get('PARITY_REDUNDANCY', 5)
 PARITY_PROVIDER_NAME = config.get('PARITY_PROVIDER_NAME', 'cloudfiles')
 PARITY_PROVIDER_CREDENTIALS = config.get('PARITY_PROVIDER_CREDENTIALS', {})
 PARITY_PROVIDER_SETTINGS = config.get('PARITY_PROVIDER_SETTINGS', {})
+
+# Local read cache, serves downloads from FILE_PATH_COMPLETE when the file is there
+COMPLETE_CACHE = config.get('COMPLETE_CACHE', False)
+# Total size in bytes past which the least recently used files are deleted, None for no limit
+COMPLETE_CACHE_MAX_SIZE = config.get('COMPLETE_CACHE_MAX_SIZE', None)
+# Files used more recently than this many seconds are never deleted, the parity and backup
+# tasks read them after the upload
+COMPLETE_CACHE_MIN_AGE = config.get('COMPLETE_CACHE_MIN_AGE', 24 * 60 * 60)
+COMPLETE_CACHE_EVICT_INTERVAL = config.get('COMPLETE_CACHE_EVICT_INTERVAL', 60)
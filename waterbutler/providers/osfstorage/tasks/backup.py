@@ -3,11 +3,11 @@ import http
 import json
 import asyncio
 
-import aiohttp
 from boto.glacier.layer2 import Layer2
 from boto.glacier.exceptions import UnexpectedHTTPResponseError
 
 from waterbutler.core import signing
+from waterbutler.core import connections
 from waterbutler.core.utils import async_retry
 from waterbutler.providers.osfstorage import settings
 from waterbutler.providers.osfstorage.tasks import utils
@@ -55,7 +55,7 @@ def _push_archive_complete(self, version_id, callback_url, metadata):
                 'metadata': metadata,
             },
         )
-        future = aiohttp.request(
+        future = connections.request(
             'PUT',
             callback_url,
             data=json.dumps(data),
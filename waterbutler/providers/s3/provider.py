@@ -1,8 +1,14 @@
 import os
+import math
+import logging
+import base64
+import asyncio
 import hashlib
 import functools
+import itertools
 from urllib import parse
 
+import aiohttp
 import xmltodict
 
 import xml.sax.saxutils
@@ -27,6 +33,9 @@ from waterbutler.providers.s3.metadata import S3FolderKeyMetadata
 from waterbutler.providers.s3.metadata import S3FileMetadataHeaders
 
 
+logger = logging.getLogger(__name__)
+
+
 class S3Provider(provider.BaseProvider):
     """Provider for Amazon's S3 cloud storage service.
 
@@ -135,13 +144,16 @@ class S3Provider(provider.BaseProvider):
         await resp.release()
         return (await dest_provider.metadata(dest_path)), not exists
 
-    async def download(self, path, accept_url=False, version=None, range=None, **kwargs):
+    async def download(self, path, accept_url=False, version=None, range=None, parallel=False, **kwargs):
         """Returns a ResponseWrapper (Stream) for the specified path
         raises FileNotFoundError if the status from S3 is not 200
 
         :param str path: Path to the key you want to download
+        :param bool parallel: Fetch the object as ranged requests, several at once if it is larger
+            than ``settings.PARALLEL_DOWNLOAD_THRESHOLD``, see :meth:`_download_parallel`
         :param dict \*\*kwargs: Additional arguments that are ignored
-        :rtype: :class:`waterbutler.core.streams.ResponseStreamReader`
+        :rtype: :class:`waterbutler.core.streams.ResponseStreamReader` or
+            :class:`waterbutler.core.streams.ParallelRangeStreamReader`
         :raises: :class:`waterbutler.core.exceptions.DownloadError`
         """
         await self._check_region()
@@ -169,6 +181,11 @@ class S3Provider(provider.BaseProvider):
         if accept_url:
             return url()
 
+        if parallel and range is None:
+            stream = await self._download_parallel(url)
+            if stream is not None:
+                return stream
+
         resp = await self.make_request(
             'GET',
             url,
@@ -179,6 +196,91 @@ class S3Provider(provider.BaseProvider):
 
         return streams.ResponseStreamReader(resp)
 
+    async def _download_parallel(self, url):
+        """Fetch an object as ``settings.PARALLEL_DOWNLOAD_CHUNK_SIZE`` byte ranges.  The first
+        range is requested straight away and its Content-Range gives the size of the object, so
+        no HEAD is needed.  An object that fits in the first range is returned as is, one larger
+        than ``settings.PARALLEL_DOWNLOAD_THRESHOLD`` has its remaining ranges fetched
+        ``settings.PARALLEL_DOWNLOAD_CONCURRENCY`` at a time.  Of any other object, the rest is
+        streamed by a single request made alongside the first.
+
+        Returns None for an empty object, which has no range to request.
+        """
+        chunk_size = settings.PARALLEL_DOWNLOAD_CHUNK_SIZE
+        resp = await self.make_request(
+            'GET',
+            url,
+            range=(0, chunk_size - 1),
+            expects=(200, 206, 416),
+            throws=exceptions.DownloadError,
+        )
+
+        if resp.status == 416:
+            await resp.release()
+            return None
+
+        if resp.status == 200:
+            return streams.ResponseStreamReader(resp)
+
+        size = int(resp.headers['Content-Range'].rpartition('/')[2])
+        if size <= chunk_size:
+            return streams.ResponseStreamReader(resp)
+
+        etag = resp.headers['ETag'].replace('"', '')
+        content_type = resp.headers.get('Content-Type', 'application/octet-stream')
+
+        if size <= settings.PARALLEL_DOWNLOAD_THRESHOLD:
+            rest = self.make_request(
+                'GET',
+                url,
+                range=(chunk_size, size - 1),
+                headers={'If-Match': '"{}"'.format(etag)},
+                expects=(206, ),
+                throws=exceptions.DownloadError,
+            )
+            return streams.ChainedResponseStreamReader([resp, rest], size, content_type=content_type)
+
+        return streams.ParallelRangeStreamReader(
+            functools.partial(self._download_range, url, etag),
+            size,
+            chunk_size,
+            settings.PARALLEL_DOWNLOAD_CONCURRENCY,
+            content_type=content_type,
+            # The first range is already on its way
+            first=self._download_range(url, etag, 0, chunk_size, response=resp),
+        )
+
+    async def _download_range(self, url, etag, start, end, response=None):
+        """Fetch the bytes from ``start`` up to but not including ``end``.  The request is
+        conditional on ``etag`` so every range is guaranteed to come from the same object.
+        ``response`` is an already requested range, whose body is read instead.
+        """
+        resp = response
+        if resp is None:
+            resp = await self.make_request(
+                'GET',
+                url,
+                range=(start, end - 1),
+                headers={'If-Match': '"{}"'.format(etag)},
+                expects=(206, ),
+                throws=exceptions.DownloadError,
+            )
+
+        try:
+            data = await resp.read()
+        except Exception:
+            # Including cancellation, a half read response can't go back to the pool
+            resp.close()
+            raise
+
+        if len(data) != end - start:
+            raise exceptions.DownloadError(
+                'Expected {} bytes from range {}-{}, got {}'.format(end - start, start, end - 1, len(data)),
+                code=500,
+            )
+
+        return data
+
     async def upload(self, stream, path, conflict='replace', **kwargs):
         """Uploads the given stream to S3
 
@@ -190,6 +292,11 @@ class S3Provider(provider.BaseProvider):
         await self._check_region()
 
         path, exists = await self.handle_name_conflict(path, conflict=conflict)
+
+        if stream.size is not None and stream.size > settings.MULTIPART_THRESHOLD:
+            await self._multipart_upload(stream, path)
+            return (await self.metadata(path, **kwargs)), not exists
+
         stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
 
         headers = {'Content-Length': str(stream.size)}
@@ -221,6 +328,203 @@ class S3Provider(provider.BaseProvider):
         await resp.release()
         return (await self.metadata(path, **kwargs)), not exists
 
+    async def _multipart_upload(self, stream, path):
+        """Upload ``stream`` to ``path`` in parts, aborting the upload if any part cannot be sent.
+
+        Called from: func: upload if the stream is larger than ``settings.MULTIPART_THRESHOLD``
+
+        API docs: http://docs.aws.amazon.com/AmazonS3/latest/dev/mpuoverview.html
+        """
+        upload_id = await self._create_multipart_upload(path)
+
+        try:
+            parts = await self._upload_parts(stream, path, upload_id)
+            await self._complete_multipart_upload(path, upload_id, parts)
+        except Exception:
+            try:
+                await self._abort_multipart_upload(path, upload_id)
+            except Exception:
+                # Don't mask the original failure, S3 will expire the upload eventually
+                logger.exception('Failed to abort multipart upload {} of {}'.format(upload_id, path))
+            raise
+
+    async def _create_multipart_upload(self, path):
+        headers = {}
+        if self.encrypt_uploads:
+            headers['x-amz-server-side-encryption'] = 'AES256'
+
+        resp = await self.make_request(
+            'POST',
+            functools.partial(
+                self.bucket.new_key(path.path).generate_url,
+                settings.TEMP_URL_SECS,
+                'POST',
+                query_parameters={'uploads': ''},
+                headers=headers,
+            ),
+            skip_auto_headers={'CONTENT-TYPE'},
+            headers=headers,
+            expects=(200, ),
+            throws=exceptions.UploadError,
+        )
+        contents = await resp.read()
+        return xmltodict.parse(contents, strip_whitespace=False)['InitiateMultipartUploadResult']['UploadId']
+
+    async def _upload_parts(self, stream, path, upload_id):
+        """Read ``stream`` one part at a time and upload the parts concurrently.  At most
+        ``settings.MULTIPART_CONCURRENCY`` parts are held in memory; reading the next part waits
+        for an upload slot to free up.
+
+        :rtype: list of ``(part_number, etag)`` tuples
+        """
+        part_size = max(settings.MULTIPART_CHUNK_SIZE, math.ceil(stream.size / settings.MULTIPART_MAX_PARTS))
+        budget = asyncio.Semaphore(settings.MULTIPART_CONCURRENCY)
+        futures = []
+
+        try:
+            for part_number in itertools.count(1):
+                await budget.acquire()
+
+                # Stop reading as soon as any part has failed for good
+                for future in futures:
+                    if future.done() and future.exception():
+                        raise future.exception()
+
+                data = await self._read_part(stream, part_size)
+                if not data:
+                    budget.release()
+                    break
+
+                future = asyncio.ensure_future(self._upload_part(path, upload_id, part_number, data))
+                future.add_done_callback(lambda _: budget.release())
+                futures.append(future)
+
+                if len(data) < part_size:
+                    break
+
+            return (await asyncio.gather(*futures))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            # A part already on the wire could otherwise land after the upload is aborted
+            await asyncio.gather(*futures, return_exceptions=True)
+            raise
+
+    async def _read_part(self, stream, size):
+        chunks, remaining = [], size
+        while remaining:
+            chunk = await stream.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+
+    async def _upload_part(self, path, upload_id, part_number, data):
+        """Upload a single part, retrying it up to ``settings.MULTIPART_RETRIES`` times.  S3
+        verifies the part against its Content-MD5 and the returned ETag is checked against it.
+
+        :rtype: tuple ``(part_number, etag)``
+        """
+        # A part is megabytes long, hashing it on the event loop would stall every other request
+        md5 = await asyncio.get_event_loop().run_in_executor(None, hashlib.md5, data)
+        headers = {
+            'Content-Length': str(len(data)),
+            'Content-MD5': base64.b64encode(md5.digest()).decode('ascii'),
+        }
+        url = functools.partial(
+            self.bucket.new_key(path.path).generate_url,
+            settings.TEMP_URL_SECS,
+            'PUT',
+            query_parameters={'partNumber': str(part_number), 'uploadId': upload_id},
+            headers=headers,
+        )
+
+        for attempt in range(settings.MULTIPART_RETRIES + 1):
+            try:
+                resp = await self.make_request(
+                    'PUT', url,
+                    data=data,
+                    skip_auto_headers={'CONTENT-TYPE'},
+                    headers=headers,
+                    expects=(200, ),
+                    throws=exceptions.UploadError,
+                )
+                await resp.release()
+
+                etag = resp.headers['ETag'].replace('"', '')
+                if etag != md5.hexdigest():
+                    raise exceptions.UploadError(
+                        'Checksum mismatch uploading part {} of {}'.format(part_number, path),
+                        code=500,
+                    )
+                return part_number, etag
+            except (exceptions.UploadError, aiohttp.errors.ClientError, asyncio.TimeoutError):
+                if attempt == settings.MULTIPART_RETRIES:
+                    raise
+                await asyncio.sleep(settings.MULTIPART_RETRY_BACKOFF * (attempt + 1))
+
+    async def _complete_multipart_upload(self, path, upload_id, parts):
+        """Assemble the uploaded parts and check the combined ETag, which S3 computes as the MD5
+        of the concatenated binary part digests suffixed by the number of parts.
+        """
+        payload = '<?xml version="1.0" encoding="UTF-8"?>'
+        payload += '<CompleteMultipartUpload>'
+        payload += ''.join(
+            '<Part><PartNumber>{}</PartNumber><ETag>"{}"</ETag></Part>'.format(part_number, etag)
+            for part_number, etag in parts
+        )
+        payload += '</CompleteMultipartUpload>'
+        payload = payload.encode('utf-8')
+
+        headers = {'Content-Length': str(len(payload))}
+        resp = await self.make_request(
+            'POST',
+            functools.partial(
+                self.bucket.new_key(path.path).generate_url,
+                settings.TEMP_URL_SECS,
+                'POST',
+                query_parameters={'uploadId': upload_id},
+                headers=headers,
+            ),
+            data=payload,
+            skip_auto_headers={'CONTENT-TYPE'},
+            headers=headers,
+            expects=(200, ),
+            throws=exceptions.UploadError,
+        )
+        contents = await resp.read()
+
+        # S3 may report a failure in the body of a 200 response
+        parsed = xmltodict.parse(contents, strip_whitespace=False)
+        if 'Error' in parsed:
+            raise exceptions.UploadError(
+                'Failed to complete multipart upload of {}: {}'.format(path, parsed['Error'].get('Message')),
+                code=500,
+            )
+
+        expected = '{}-{}'.format(
+            hashlib.md5(b''.join(bytes.fromhex(etag) for _, etag in parts)).hexdigest(),
+            len(parts),
+        )
+        etag = parsed['CompleteMultipartUploadResult']['ETag'].replace('"', '')
+        if etag != expected:
+            raise exceptions.UploadError('Checksum mismatch uploading {}'.format(path), code=500)
+
+    async def _abort_multipart_upload(self, path, upload_id):
+        resp = await self.make_request(
+            'DELETE',
+            functools.partial(
+                self.bucket.new_key(path.path).generate_url,
+                settings.TEMP_URL_SECS,
+                'DELETE',
+                query_parameters={'uploadId': upload_id},
+            ),
+            expects=(204, ),
+            throws=exceptions.UploadError,
+        )
+        await resp.release()
+
     async def delete(self, path, confirm_delete=0, **kwargs):
         """Deletes the key at the specified path
 
@@ -7,3 +7,20 @@ config = settings.get('S3_PROVIDER_CONFIG', {})
 
 
 TEMP_URL_SECS = config.get('TEMP_URL_SECS', 100)
+
+# Uploads larger than MULTIPART_THRESHOLD bytes are sent as a multipart upload.  Parts are
+# MULTIPART_CHUNK_SIZE bytes, grown as needed to stay within S3's limit of 10,000 parts, and up to
+# MULTIPART_CONCURRENCY of them are held in memory and uploaded at once.
+MULTIPART_THRESHOLD = config.get('MULTIPART_THRESHOLD', 128 * 1024 ** 2)  # 128MB
+MULTIPART_CHUNK_SIZE = config.get('MULTIPART_CHUNK_SIZE', 64 * 1024 ** 2)  # 64MB
+MULTIPART_MAX_PARTS = config.get('MULTIPART_MAX_PARTS', 10000)
+MULTIPART_CONCURRENCY = config.get('MULTIPART_CONCURRENCY', 4)
+MULTIPART_RETRIES = config.get('MULTIPART_RETRIES', 3)
+MULTIPART_RETRY_BACKOFF = config.get('MULTIPART_RETRY_BACKOFF', 1)
+
+# Copies download the first PARALLEL_DOWNLOAD_CHUNK_SIZE bytes of an object, then the rest as further
+# ranges, PARALLEL_DOWNLOAD_CONCURRENCY at once, for objects larger than PARALLEL_DOWNLOAD_THRESHOLD
+# bytes, or with a single request otherwise
+PARALLEL_DOWNLOAD_THRESHOLD = config.get('PARALLEL_DOWNLOAD_THRESHOLD', 128 * 1024 ** 2)  # 128MB
+PARALLEL_DOWNLOAD_CHUNK_SIZE = config.get('PARALLEL_DOWNLOAD_CHUNK_SIZE', 16 * 1024 ** 2)  # 16MB
+PARALLEL_DOWNLOAD_CONCURRENCY = config.get('PARALLEL_DOWNLOAD_CONCURRENCY', 4)
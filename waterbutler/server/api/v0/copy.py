@@ -27,6 +27,10 @@ class CopyHandler(core.BaseCrossProviderHandler):
             )
 
             metadata, created = await tasks.wait_on_celery(result)
+
+            # The task wrote through providers in another process
+            self.source_provider.invalidate_metadata()
+            self.destination_provider.invalidate_metadata()
         else:
             metadata, created = (
                 await tasks.backgrounded(
@@ -99,6 +99,7 @@ class CRUDHandler(core.BaseProviderHandler):
     async def post(self):
         """Create a folder"""
         metadata = await self.provider.create_folder(**self.arguments)
+        self.provider.invalidate_metadata()
 
         self.set_status(201)
         self.write(metadata.serialized())
@@ -109,7 +110,10 @@ class CRUDHandler(core.BaseProviderHandler):
         """Upload a file."""
         self.writer.write_eof()
 
-        metadata, created = await self.uploader
+        try:
+            metadata, created = await self.uploader
+        finally:
+            self.provider.invalidate_metadata()
 
         if created:
             self.set_status(201)
@@ -126,7 +130,10 @@ class CRUDHandler(core.BaseProviderHandler):
     async def delete(self):
         """Delete a file."""
 
-        await self.provider.delete(**self.arguments)
+        try:
+            await self.provider.delete(**self.arguments)
+        finally:
+            self.provider.invalidate_metadata()
         self.set_status(int(http.client.NO_CONTENT))
 
         self._send_hook('delete', path=self.path)
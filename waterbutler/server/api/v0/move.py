@@ -28,6 +28,10 @@ class MoveHandler(core.BaseCrossProviderHandler):
 
             metadata, created = await tasks.wait_on_celery(resp)
 
+            # The task wrote through providers in another process
+            self.source_provider.invalidate_metadata()
+            self.destination_provider.invalidate_metadata()
+
         else:
             metadata, created = (
                 await tasks.backgrounded(
@@ -1,5 +1,4 @@
 import http
-import socket
 import asyncio
 import logging
 
@@ -10,7 +9,7 @@ from waterbutler.server import settings
 from waterbutler.server.api.v1 import core
 from waterbutler.server.auth import AuthHandler
 from waterbutler.core.log_payload import LogPayload
-from waterbutler.core.streams import RequestStreamReader
+from waterbutler.core.streams import BufferedRequestStreamReader
 from waterbutler.server.api.v1.provider.create import CreateMixin
 from waterbutler.server.api.v1.provider.metadata import MetadataMixin
 from waterbutler.server.api.v1.provider.movecopy import MoveCopyMixin
@@ -55,8 +54,8 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
         if method in self.POST_VALIDATORS:
             await getattr(self, self.POST_VALIDATORS[method])()
 
-        # The one special case
-        if method == 'put' and self.target_path.is_file:
+        # The special cases, uploads stream their body straight to the provider
+        if method == 'put' and (self.target_path.is_file or self.kind == 'batch'):
             await self.prepare_stream()
         else:
             self.stream = None
@@ -80,6 +79,8 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
 
     async def put(self, **_):
         """Defined in CreateMixin"""
+        if self.kind == 'batch':
+            return (await self.upload_batch())
         if self.target_path.is_file:
             return (await self.upload_file())
         return (await self.create_folder())
@@ -90,29 +91,36 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
     async def delete(self, **_):
         self.confirm_delete = int(self.get_query_argument('confirm_delete',
                                                           default=0))
-        await self.provider.delete(self.path,
-                                        confirm_delete=self.confirm_delete)
+        try:
+            await self.provider.delete(self.path,
+                                            confirm_delete=self.confirm_delete)
+        finally:
+            self.provider.invalidate_metadata()
         self.set_status(int(http.client.NO_CONTENT))
 
     async def data_received(self, chunk):
         """Note: Only called during uploads."""
         if self.stream:
-            self.writer.write(chunk)
-            await self.writer.drain()
+            await self.stream.write(chunk)
         else:
             self.body += chunk
 
     async def prepare_stream(self):
-        """Sets up an asyncio pipe from client to server
-        Only called on PUT when path is to a file
+        """Sets up an in-process pipe from client to server
+        Only called on PUT when path is to a file, or for a batch upload
         """
-        self.rsock, self.wsock = socket.socketpair()
-
-        self.reader, _ = await asyncio.open_unix_connection(sock=self.rsock)
-        _, self.writer = await asyncio.open_unix_connection(sock=self.wsock)
-
-        self.stream = RequestStreamReader(self.request, self.reader)
-        self.uploader = asyncio.ensure_future(self.provider.upload(self.stream, self.target_path))
+        self.stream = BufferedRequestStreamReader(self.request, max_buffer_size=settings.MAX_UPLOAD_BUFFER_SIZE)
+        if self.kind == 'batch':
+            self.uploader = asyncio.ensure_future(self.provider.upload_batch(self.batch_files(), self.target_path))
+        else:
+            self.uploader = asyncio.ensure_future(self.provider.upload(self.stream, self.target_path))
+        self.uploader.add_done_callback(self._abort_stream_on_failure)
+        self.uploader.add_done_callback(lambda _: self.provider.invalidate_metadata())
+
+    def _abort_stream_on_failure(self, uploader):
+        """If the upload dies early, stop buffering the rest of the request body"""
+        if uploader.cancelled() or uploader.exception() is not None:
+            self.stream.abort()
 
     def on_finish(self):
         status, method = self.get_status(), self.request.method.upper()
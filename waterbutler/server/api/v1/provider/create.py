@@ -1,3 +1,4 @@
+from waterbutler.core import streams
 from waterbutler.core import exceptions
 
 
@@ -9,14 +10,15 @@ class CreateMixin:
         one or more API calls to the provider. Requests with bodies that are too large can be
         rejected if we have not began to accept the body. Validation is as follows:
 
-        1. Pull kind from query params. It must be file, folder, or not included (which defaults to file)
+        1. Pull kind from query params. It must be file, folder, batch, or not included (which
+           defaults to file).  A batch upload's body is a tar archive of files to upload at once.
         2. Ensure that content length is present for file uploads
         3. Ensure that content length is either not present or 0 for folder creation requests
         """
         self.kind = self.get_query_argument('kind', default='file')
 
-        if self.kind not in ('file', 'folder'):
-            raise exceptions.InvalidParameters('Kind must be file, folder or unspecified (interpreted as file), not {}'.format(self.kind))
+        if self.kind not in ('file', 'folder', 'batch'):
+            raise exceptions.InvalidParameters('Kind must be file, folder, batch or unspecified (interpreted as file), not {}'.format(self.kind))
 
         length = self.request.headers.get('Content-Length')
 
@@ -39,6 +41,8 @@ class CreateMixin:
         1. If path is a folder, the name parameter must be present.
         2. If path is a file, the name parameter must be absent.
         3. If the entity being created is a folder, then path must be a folder as well.
+        4. A batch upload goes into the folder given as path, without a name parameter, and only
+           to providers that support it.
 
         Also checks to make sure V1 semantics are being respected.  If a PUT request is issued
         against a folder then we check to make sure that an entity with the same name does not
@@ -49,6 +53,16 @@ class CreateMixin:
 
         self.childs_name = self.get_query_argument('name', default=None)
 
+        if self.kind == 'batch':
+            if not self.path.is_dir:
+                raise exceptions.InvalidParameters('Path must be a folder (and end with a "/") for batch uploads')
+            if self.childs_name is not None:
+                raise exceptions.InvalidParameters("'name' parameter doesn't apply to batch uploads")
+            if not self.provider.can_batch_upload():
+                raise exceptions.InvalidParameters('Batch uploads are not supported by this provider', code=501)
+            self.target_path = self.path
+            return
+
         # handle newfile and newfolder naming conflicts
         if self.path.is_dir:
             if self.childs_name is None:
@@ -90,15 +104,27 @@ class CreateMixin:
 
     async def create_folder(self):
         self.metadata = await self.provider.create_folder(self.target_path)
+        self.provider.invalidate_metadata()
         self.set_status(201)
         self.write({'data': self.metadata.json_api_serialized(self.resource)})
 
     async def upload_file(self):
-        self.writer.write_eof()
+        self.stream.write_eof()
+
+        self.metadata, created = await self.uploader
+        if created:
+            self.set_status(201)
+
+        self.write({'data': self.metadata.json_api_serialized(self.resource)})
+
+    def batch_files(self):
+        """The files of a batch upload, read from the tar archive in the request body"""
+        return streams.TarStreamParser(self.stream)
+
+    async def upload_batch(self):
+        self.stream.write_eof()
 
         self.metadata, created = await self.uploader
-        self.writer.close()
-        self.wsock.close()
         if created:
             self.set_status(201)
 
@@ -4,7 +4,9 @@ import asyncio
 
 import tornado.httputil
 
+from waterbutler.core import streams
 from waterbutler.core import mime_types
+from waterbutler.core import exceptions
 from waterbutler.server import utils
 
 
@@ -32,6 +34,9 @@ class MetadataMixin:
         if 'zip' in self.request.query_arguments:
             return (await self.download_folder_as_zip())
 
+        if 'tar' in self.request.query_arguments:
+            return (await self.download_folder_as_tar())
+
         data = await self.provider.metadata(self.path)
         return self.write({'data': [x.json_api_serialized(self.resource) for x in data]})
 
@@ -112,6 +117,92 @@ class MetadataMixin:
             utils.make_disposition(zipfile_name + '.zip')
         )
 
-        result = await self.provider.zip(self.path)
+        # Listing the whole folder first delays the download, only do so if a range is asked for
+        result = await self.provider.zip(self.path, policy=self.zip_policy(), sized='Range' in self.request.headers)
+
+        if result.size is not None:
+            # Only archives of stored files, whose length is known up front, can be resumed
+            self.set_header('Accept-Ranges', 'bytes')
+
+            request_range = None
+            if 'Range' in self.request.headers:
+                request_range = tornado.httputil._parse_request_range(self.request.headers['Range'])
+
+            if request_range is not None:
+                start, end = request_range
+                if (start is not None and start >= result.size) or end == 0:
+                    self.set_status(416)
+                    self.set_header('Content-Range', 'bytes */{}'.format(result.size))
+                    return
+
+                start = start or 0
+                if start < 0:
+                    start = max(result.size + start, 0)
+                end = min(end or result.size, result.size)
+
+                result.select_range(start, end)
+
+            if result.partial:
+                self.set_status(206)
+                self.set_header('Content-Range', result.content_range)
+
+            self.set_header('Content-Length', str(result.size))
 
         await self.write_stream(result)
+
+    async def download_folder_as_tar(self):
+        level = self.compression_level(default=0)
+
+        tarfile_name = (self.path.name or '{}-archive'.format(self.provider.NAME)) + '.tar'
+        if level == 0:
+            self.set_header('Content-Type', 'application/x-tar')
+        else:
+            tarfile_name += '.gz'
+            self.set_header('Content-Type', 'application/gzip')
+        self.set_header('Content-Disposition', utils.make_disposition(tarfile_name))
+
+        result = await self.provider.tar(self.path, gzip=level != 0, level=level)
+
+        if result.size is not None:
+            self.set_header('Content-Length', str(result.size))
+
+        await self.write_stream(result)
+
+    def zip_policy(self):
+        """Builds the compression policy for a zipped folder from the ``compression`` query
+        argument.  Defaults to the settings.
+        """
+        level = self.compression_level()
+        if level is None:
+            return None
+
+        if level == 0:
+            return streams.ZipCompressionPolicy(store=True)
+
+        return streams.ZipCompressionPolicy(level=level)
+
+    def compression_level(self, default=None):
+        """The ``compression`` query argument of an archive download as a deflate level.  It is
+        either ``store``, the same as 0, ``gzip`` for the default level, or a level from 0 to 9.
+        """
+        compression = self.get_query_argument('compression', default=None)
+        if compression is None:
+            return default
+
+        if compression == 'store':
+            return 0
+
+        if compression == 'gzip':
+            return -1
+
+        try:
+            level = int(compression)
+        except ValueError:
+            level = None
+
+        if level is None or not 0 <= level <= 9:
+            raise exceptions.InvalidParameters(
+                'Compression must be store, gzip or a level from 0 to 9, not {}'.format(compression)
+            )
+
+        return level
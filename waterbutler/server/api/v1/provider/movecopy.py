@@ -97,6 +97,10 @@ class MoveCopyMixin:
                 *self.build_args()
             )
             metadata, created = await tasks.wait_on_celery(result)
+
+            # The task wrote through providers in another process
+            self.provider.invalidate_metadata()
+            self.dest_provider.invalidate_metadata()
         else:
             metadata, created = (
                 await tasks.backgrounded(
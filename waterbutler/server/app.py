@@ -9,8 +9,11 @@ from raven.contrib.tornado import AsyncSentryClient
 
 import waterbutler
 from waterbutler import settings
+from waterbutler.core import registry
+from waterbutler.core import connections
 from waterbutler.server.api import v0
 from waterbutler.server.api import v1
+from waterbutler.tasks import loops
 from waterbutler.server import handlers
 from waterbutler.server import settings as server_settings
 
@@ -36,6 +39,9 @@ def make_app(debug):
 def serve():
     tornado.platform.asyncio.AsyncIOMainLoop().install()
 
+    # Resolve provider plugins up front, rather than on the first request for each
+    registry.load()
+
     app = make_app(server_settings.DEBUG)
 
     ssl_options = None
@@ -54,4 +60,8 @@ def serve():
     )
 
     asyncio.get_event_loop().set_debug(server_settings.DEBUG)
-    asyncio.get_event_loop().run_forever()
+    try:
+        asyncio.get_event_loop().run_forever()
+    finally:
+        connections.close_connectors()
+        loops.pool.stop()
@@ -1,6 +1,10 @@
 import tornado.web
 
 import waterbutler
+from waterbutler.core import cache
+from waterbutler.core import transfer
+from waterbutler.core import ratelimit
+from waterbutler.tasks import loops
 
 
 class StatusHandler(tornado.web.RequestHandler):
@@ -9,5 +13,9 @@ class StatusHandler(tornado.web.RequestHandler):
         """List information about waterbutler status"""
         self.write({
             'status': 'up',
-            'version': waterbutler.__version__
+            'version': waterbutler.__version__,
+            'background_loops': loops.pool.stats,
+            'conditional_requests': cache.conditional.stats,
+            'rate_limits': ratelimit.stats(),
+            'folder_transfers': transfer.stats(),
         })
@@ -22,6 +22,8 @@ CORS_ALLOW_ORIGIN = config.get('CORS_ALLOW_ORIGIN', '*')
 
 CHUNK_SIZE = config.get('CHUNK_SIZE', 65536)  # 64KB
 MAX_BODY_SIZE = config.get('MAX_BODY_SIZE', int(4.9 * (1024 ** 3)))  # 4.9 GB
+# Upper bound on request body buffered in memory while waiting on a provider's upload
+MAX_UPLOAD_BUFFER_SIZE = config.get('MAX_UPLOAD_BUFFER_SIZE', 2 ** 20)  # 1MB
 
 AUTH_HANDLERS = config.get('AUTH_HANDLERS', [
     'osf',
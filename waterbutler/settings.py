@@ -75,6 +75,70 @@ DEBUG = get('DEBUG', True)
 REQUEST_LIMIT = get('REQUEST_LIMIT', 10)
 OP_CONCURRENCY = config.get('OP_CONCURRENCY', 5)
 
+# Provider metadata caching, see waterbutler.core.cache
+# The request tier lives as long as a single provider instance, the process-wide tier is shared
+# between them.  A TTL of 0 disables the tier.
+METADATA_CACHE_REQUEST_TTL = get('METADATA_CACHE_REQUEST_TTL', 60)
+METADATA_CACHE_TTL = get('METADATA_CACHE_TTL', 0)
+METADATA_CACHE_MAX_ENTRIES = get('METADATA_CACHE_MAX_ENTRIES', 10000)
+
+# Conditional requests, see waterbutler.core.cache.ConditionalCache
+# Responses carrying an ETag or Last-Modified are remembered for this long and requested again
+# with If-None-Match or If-Modified-Since.  A TTL of 0 disables conditional requests.
+CONDITIONAL_CACHE_TTL = get('CONDITIONAL_CACHE_TTL', 24 * 60 * 60)
+CONDITIONAL_CACHE_MAX_ENTRIES = get('CONDITIONAL_CACHE_MAX_ENTRIES', 1000)
+# Larger responses aren't remembered
+CONDITIONAL_CACHE_MAX_BODY_SIZE = get('CONDITIONAL_CACHE_MAX_BODY_SIZE', 256 * 1024)
+
+# Folder copies and moves, see waterbutler.core.transfer
+# Items failing with a connection error or one of these status codes are retried
+OP_RETRIES = get('OP_RETRIES', 3)
+OP_RETRY_BACKOFF = get('OP_RETRY_BACKOFF', 1)
+OP_RETRY_ON = set(get('OP_RETRY_ON', [408, 429, 500, 502, 503, 504]))
+
+# Zipped folder downloads, see waterbutler.core.utils.ZipStreamGenerator
+ZIP_PREFETCH = get('ZIP_PREFETCH', 4)
+ZIP_LISTING_CONCURRENCY = get('ZIP_LISTING_CONCURRENCY', 4)
+# Chunks at least this large are compressed off the event loop, for zip and tar.gz
+ZIP_EXECUTOR_THRESHOLD = get('ZIP_EXECUTOR_THRESHOLD', 64 * 1024)
+# Bytes compressed between sync flushes, 0 flushes after every chunk
+ZIP_FLUSH_BOUNDARY = get('ZIP_FLUSH_BOUNDARY', 1024 * 1024)
+# Deflate level, -1 being zlib's default and 0 storing every file uncompressed.  Also the
+# default gzip level of tar.gz downloads
+ZIP_COMPRESSION_LEVEL = get('ZIP_COMPRESSION_LEVEL', -1)
+# Files that are already compressed are stored as they are, by extension or mime type.  A mime
+# type ending in / matches the whole type
+ZIP_STORE_EXTENSIONS = get('ZIP_STORE_EXTENSIONS', [
+    '.7z', '.bz2', '.docx', '.flac', '.gif', '.gz', '.jpeg', '.jpg', '.m4a', '.mkv', '.mov',
+    '.mp3', '.mp4', '.ogg', '.png', '.pptx', '.rar', '.tgz', '.webm', '.webp', '.xlsx', '.xz',
+    '.zip',
+])
+ZIP_STORE_MIME_TYPES = get('ZIP_STORE_MIME_TYPES', [
+    'application/gzip', 'application/x-7z-compressed', 'application/x-bzip2',
+    'application/x-gzip', 'application/x-xz', 'application/zip', 'audio/flac', 'audio/mp4',
+    'audio/mpeg', 'audio/ogg', 'image/gif', 'image/jpeg', 'image/png', 'image/webp', 'video/',
+])
+
+# Uploads hashed off the event loop, see waterbutler.core.streams.HashSpoolWriter
+HASH_BLOCK_SIZE = get('HASH_BLOCK_SIZE', 1024 * 1024)
+# Bytes queued for hashing before the upload waits for it to catch up
+HASH_MAX_BUFFERED = get('HASH_MAX_BUFFERED', 8 * 1024 * 1024)
+
+# Outgoing connection pooling, see waterbutler.core.connections
+# A limit of None allows an unbounded number of connections per host
+CONNECTION_LIMIT_PER_HOST = get('CONNECTION_LIMIT_PER_HOST', None)
+CONNECTION_KEEPALIVE_TIMEOUT = get('CONNECTION_KEEPALIVE_TIMEOUT', 30)
+CONNECTION_USE_DNS_CACHE = get('CONNECTION_USE_DNS_CACHE', True)
+
+# Outgoing request rate limits, see waterbutler.core.ratelimit
+# Limits are tracked per provider, host, and set of credentials.  RATE_LIMITS may override the
+# defaults per provider, e.g. {"github": {"rate": 1.25, "burst": 20}}
+RATE_LIMITS = get('RATE_LIMITS', {})
+RATE_LIMIT_DEFAULT_RATE = get('RATE_LIMIT_DEFAULT_RATE', 10)  # requests per second
+RATE_LIMIT_DEFAULT_BURST = get('RATE_LIMIT_DEFAULT_BURST', 10)
+RATE_LIMIT_MAX_DELAY = get('RATE_LIMIT_MAX_DELAY', 60)  # seconds
+RATE_LIMIT_MAX_BUCKETS = get('RATE_LIMIT_MAX_BUCKETS', 10000)
+
 logging_config = get('LOGGING', DEFAULT_LOGGING_CONFIG)
 logging.config.dictConfig(logging_config)
 
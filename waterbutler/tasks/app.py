@@ -1,9 +1,16 @@
 from celery import Celery
+from celery.signals import worker_init
 from celery.signals import task_failure
+from celery.signals import task_postrun
+from celery.signals import worker_shutdown
 
 from raven import Client
 
 from waterbutler import settings
+from waterbutler.core import registry
+from waterbutler.core import connections
+from waterbutler.tasks import loops
+from waterbutler.tasks import notify
 from waterbutler.tasks import settings as tasks_settings
 
 
@@ -25,6 +32,25 @@ def register_signal(client):
     task_failure.connect(process_failure_signal, weak=False)
 
 
+@worker_init.connect
+def load_providers(**kwargs):
+    """Resolve provider plugins once, before the pool forks, instead of in every task"""
+    registry.load()
+
+
+@task_postrun.connect
+def notify_waiters(task_id=None, **kwargs):
+    """Wake up any request waiting on this task.  Results are stored by now"""
+    notify.notify(task_id)
+
+
+@worker_shutdown.connect
+def close_connections(**kwargs):
+    """Release any pooled connections opened by tasks running on this worker"""
+    connections.close_connectors()
+    loops.pool.stop()
+
+
 sentry_dsn = settings.get('SENTRY_DSN', None)
 if sentry_dsn:
     client = Client(sentry_dsn)
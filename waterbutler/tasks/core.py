@@ -6,6 +6,8 @@ import functools
 from celery.backends.base import DisabledBackend
 
 from waterbutler.tasks import app
+from waterbutler.tasks import loops
+from waterbutler.tasks import notify
 from waterbutler.tasks import settings
 from waterbutler.tasks import exceptions
 
@@ -30,19 +32,21 @@ def ensure_event_loop():
 def __coroutine_unwrapper(func):
     @functools.wraps(func)
     def wrapped(*args, **kwargs):
-        return ensure_event_loop().run_until_complete(func(*args, **kwargs))
+        return loops.pool.run(func(*args, **kwargs))
     wrapped.as_async = func
     return wrapped
 
 
 async def backgrounded(func, *args, **kwargs):
     """Runs the given function with the given arguments in
-    a background thread
+    the background.  Coroutine functions run on one of the
+    long lived background event loops, anything else in a
+    background thread
     """
-    loop = asyncio.get_event_loop()
     if asyncio.iscoroutinefunction(func):
-        func = __coroutine_unwrapper(func)
+        return (await asyncio.wrap_future(loops.pool.submit(func(*args, **kwargs))))
 
+    loop = asyncio.get_event_loop()
     return (await loop.run_in_executor(
         None,  # None uses the default executer, ThreadPoolExecuter
         functools.partial(func, *args, **kwargs)
@@ -98,31 +102,41 @@ def celery_task(func, *args, **kwargs):
     return task
 
 
-@backgroundify
 async def wait_on_celery(result, interval=None, timeout=None, basepath=None):
+    """Wait for a Celery task to finish, returning its result or raising its exception.  The
+    worker notifies us as soon as the task is done, see :mod:`waterbutler.tasks.notify`.  The
+    result is also polled every ``interval`` seconds, in case the notification never arrives.
+
+    :raises: :class:`waterbutler.tasks.exceptions.WaitTimeOutError` after ``timeout`` seconds
+    """
     timeout = timeout or settings.WAIT_TIMEOUT
     interval = interval or settings.WAIT_INTERVAL
     basepath = basepath or settings.ADHOC_BACKEND_PATH
 
+    loop = asyncio.get_event_loop()
     waited = 0
 
-    while True:
-        if isinstance(app.backend, DisabledBackend):
-            try:
-                with open(os.path.join(basepath, result.id), 'rb') as result_file:
-                    data = pickle.load(result_file)
-                if isinstance(data, Exception):
-                    raise data
-                return data
-            except FileNotFoundError:
-                pass
-        else:
-            if result.ready():
-                if result.failed():
-                    raise result.result
-                return result.result
-
-        if waited > timeout:
-            raise exceptions.WaitTimeOutError
-        await asyncio.sleep(interval)
-        waited += interval
+    with notify.Listener(result.id, loop=loop) as listener:
+        while True:
+            if isinstance(app.backend, DisabledBackend):
+                try:
+                    with open(os.path.join(basepath, result.id), 'rb') as result_file:
+                        data = pickle.load(result_file)
+                    if isinstance(data, Exception):
+                        raise data
+                    return data
+                except FileNotFoundError:
+                    pass
+            else:
+                # Result backends may block on the network
+                if (await loop.run_in_executor(None, result.ready)):
+                    if result.failed():
+                        raise result.result
+                    return result.result
+
+            if waited > timeout:
+                raise exceptions.WaitTimeOutError
+
+            started = loop.time()
+            await listener.wait(interval)
+            waited += loop.time() - started
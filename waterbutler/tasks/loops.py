@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import threading
+
+from waterbutler.tasks import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """An event loop running forever in its own daemon thread.  Coroutines submitted from any
+    other thread run on it, so connection pools and caches bound to the loop are reused from one
+    coroutine to the next, instead of being rebuilt on a fresh loop each time.
+
+    :param str name: The name of the loop's thread
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+        # Queue depth counters
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule ``coro`` on this loop.
+
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def is_current(self):
+        return threading.current_thread() is self.thread
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    @property
+    def stats(self):
+        return {
+            'name': self.name,
+            'pending': self.pending,
+            'submitted': self.submitted,
+            'completed': self.completed,
+        }
+
+
+class LoopPool:
+    """A fixed number of :class:`BackgroundLoop` s, each coroutine going to the one with the
+    least outstanding work.  Loops are started on first use.
+
+    :param int size: The number of loops
+    """
+
+    def __init__(self, size):
+        self.size = max(size, 1)
+        self.loops = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            while len(self.loops) < self.size:
+                self.loops.append(BackgroundLoop('waterbutler-loop-{}'.format(len(self.loops))))
+        return self.loops
+
+    def submit(self, coro):
+        """Schedule ``coro`` on the least busy loop.
+
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        loop = min(self.loops or self._start(), key=lambda loop: loop.pending)
+        return loop.submit(coro)
+
+    def run(self, coro):
+        """Run ``coro`` to completion on a background loop, blocking the calling thread until it
+        is done.  Must not be called from one of the pool's own loops, which would deadlock it.
+        """
+        if any(loop.is_current() for loop in self.loops):
+            raise RuntimeError('LoopPool.run called from within one of its own loops')
+        return self.submit(coro).result()
+
+    def stop(self):
+        with self._lock:
+            for loop in self.loops:
+                loop.stop()
+            self.loops = []
+
+    @property
+    def stats(self):
+        return [loop.stats for loop in self.loops]
+
+
+pool = LoopPool(settings.BACKGROUND_LOOPS)
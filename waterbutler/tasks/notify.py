@@ -0,0 +1,88 @@
+import os
+import socket
+import asyncio
+import logging
+
+from waterbutler.tasks import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def socket_path(task_id, basepath=None):
+    return os.path.join(basepath or settings.WAIT_NOTIFY_PATH, 'wb-{}.sock'.format(task_id))
+
+
+def notify(task_id, basepath=None):
+    """Tell whoever is waiting on ``task_id`` that it has finished, by sending a datagram to the
+    unix socket they bound for it.  Best effort: if nothing is listening, or the waiter is on
+    another host, they will find out at their next poll instead.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.sendto(b'done', socket_path(task_id, basepath))
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+class Listener:
+    """Listens for the completion of a single task, see :func:`notify`.  The socket is only
+    bound while the listener is open, so check for a result after opening it to avoid missing a
+    task that finished first.
+
+    :param str task_id: The id of the task to listen for
+    :param str basepath: The folder to bind the socket in
+    """
+
+    def __init__(self, task_id, basepath=None, loop=None):
+        self.path = socket_path(task_id, basepath)
+        self.loop = loop or asyncio.get_event_loop()
+        self.sock = None
+        self.event = asyncio.Event(loop=self.loop)
+
+    def __enter__(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            sock.bind(self.path)
+        except OSError as e:
+            # Waiting falls back to polling
+            logger.warning('Unable to listen for task completion on {}: {!r}'.format(self.path, e))
+            sock.close()
+            return self
+
+        self.sock = sock
+        self.loop.add_reader(sock.fileno(), self._on_readable)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.sock is None:
+            return
+
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _on_readable(self):
+        try:
+            self.sock.recv(64)
+        except OSError:
+            return
+        self.event.set()
+
+    async def wait(self, timeout):
+        """Wait up to ``timeout`` seconds for a notification, returns whether one arrived"""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout, loop=self.loop)
+        except asyncio.TimeoutError:
+            return False
+
+        self.event.clear()
+        return True
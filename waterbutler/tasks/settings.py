@@ -22,6 +22,11 @@ BROKER_URL = config.get(
 WAIT_TIMEOUT = config.get('WAIT_TIMEOUT', 15)
 WAIT_INTERVAL = config.get('WAIT_INTERVAL', 0.5)
 ADHOC_BACKEND_PATH = config.get('ADHOC_BACKEND_PATH', '/tmp')
+# Workers signal task completion over a unix socket in this folder, on the same host
+WAIT_NOTIFY_PATH = config.get('WAIT_NOTIFY_PATH', ADHOC_BACKEND_PATH)
+
+# Coroutines run by backgrounded() and by Celery tasks share this many long lived event loops
+BACKGROUND_LOOPS = config.get('BACKGROUND_LOOPS', 1)
 
 CELERY_CREATE_MISSING_QUEUES = config.get('CELERY_CREATE_MISSING_QUEUES', False)
 CELERY_DEFAULT_QUEUE = config.get('CELERY_DEFAULT_QUEUE', 'waterbutler')